@@ -0,0 +1,43 @@
+"""Benchmark the size dispatch of the backend of the primitives."""
+
+import sys
+import timeit
+
+import numpy as np
+import scipy.linalg
+
+sys.path.append('..')
+from mpys.backend import Backend, use_backend
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+def time_per_call(f, number):
+    """Best time of a call to f, in microseconds."""
+    return 1e6*min(timeit.repeat(f, number=number, repeat=3))/number
+
+
+if __name__ == '__main__':
+    # Contractions of named states, without their repeated tensors.
+    for name in ['GHZ', 'AKLT']:
+        psi = Mps(100, name)
+        psi.A = [np.array(A) for A in psi.A]
+        for small_tensor in [0, 64]:
+            with use_backend(Backend(small_tensor=small_tensor)):
+                t = time_per_call(lambda: contract(psi, psi), 20)
+            print('{}, small_tensor = {:2d}: {:.0f} us/contraction'
+                  .format(name, small_tensor, t))
+
+    # Decompositions of matrices of shape (2n, n).
+    for n in [2, 8, 16, 32, 64]:
+        M = np.random.rand(2*n, n)
+        number = max(20000//n**2, 5)
+        print('n = {:2d}: qr numpy {:.0f} us, scipy {:.0f} us; svd numpy '
+              '{:.0f} us, scipy {:.0f} us'.format(
+                  n, time_per_call(lambda: np.linalg.qr(M), number),
+                  time_per_call(lambda: scipy.linalg.qr(
+                      M, mode='economic', check_finite=False), number),
+                  time_per_call(lambda: np.linalg.svd(
+                      M, full_matrices=False), number),
+                  time_per_call(lambda: scipy.linalg.svd(
+                      M, full_matrices=False, check_finite=False), number)))
@@ -0,0 +1,38 @@
+"""Benchmark the variational compression of sums of MPS against the
+truncation with SVDs."""
+
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append('..')
+from mpys.compression import direct_sum, linear_combination
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+def random_state(L, D):
+    """Random normalized state of bond dimension D."""
+    bonds = [min(D, 2**min(i, L-i)) for i in range(L+1)]
+    return Mps.from_tensors([np.random.rand(bonds[i], 2, bonds[i+1]) - 0.5
+                             for i in range(L)])
+
+
+if __name__ == '__main__':
+    L = 40
+    for n, D_psi, D in [(4, 16, 8), (8, 32, 8), (8, 32, 16)]:
+        psis = [random_state(L, D_psi) for _ in range(n)]
+        psi = Mps.from_tensors(direct_sum(psis))
+        t_svd = min(timeit.repeat(
+            lambda: Mps.from_tensors(direct_sum(psis), D), number=1,
+            repeat=3))
+        t_fit = min(timeit.repeat(
+            lambda: linear_combination(psis, D=D, sweeps=2), number=1,
+            repeat=3))
+        svd = Mps.from_tensors(direct_sum(psis), D)
+        fit = linear_combination(psis, D=D, sweeps=2, normalize=True)
+        print('{} states of D = {}, sum of D = {} -> {}: SVD {:.4f} s '
+              '(fidelity {:.4f}), fit {:.4f} s (fidelity {:.4f})'.format(
+                  n, D_psi, n*D_psi, D, t_svd, abs(contract(psi, svd))**2,
+                  t_fit, abs(contract(psi, fit))**2))
@@ -0,0 +1,27 @@
+"""Benchmark 'contract_many' against a loop over 'contract'."""
+
+import sys
+import timeit
+
+sys.path.append('..')
+from mpys.mps import Mps
+from mpys.mps_ops import contract, contract_many
+
+
+def loop_contract(psis, phis):
+    """Compute all the overlaps with one 'contract' call per pair."""
+    return [[contract(psi, phi) for phi in phis] for psi in psis]
+
+
+if __name__ == '__main__':
+    L = 20
+    for n in [4, 16, 64]:
+        psis = [Mps(L, 'random') for _ in range(n)]
+        phis = [Mps(L, 'random') for _ in range(n)]
+        t_loop = min(timeit.repeat(lambda: loop_contract(psis, phis),
+                                   number=1, repeat=3))
+        t_batch = min(timeit.repeat(lambda: contract_many(psis, phis),
+                                    number=1, repeat=3))
+        print('L = {}, {}x{} pairs: loop {:.4f} s, batched {:.4f} s, '
+              'speedup {:.1f}x'.format(L, n, n, t_loop, t_batch,
+                                       t_loop/t_batch))
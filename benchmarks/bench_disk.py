@@ -0,0 +1,33 @@
+"""Benchmark the peak memory of sweeps over states stored on disk."""
+
+import sys
+import time
+import tracemalloc
+
+sys.path.append('..')
+from mpys.mps import Mps
+
+
+def measure(f):
+    """Time and peak of the memory allocated by f."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    f()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak/2**20
+
+
+if __name__ == '__main__':
+    L = 200
+    for D in [64, 256]:
+        for window in [None, 4]:
+            psi = Mps.random(L, D, seed=0)
+            if window is not None:
+                psi.to_disk(window=window)
+            t_norm, m_norm = measure(psi.norm)
+            t_B, m_B = measure(lambda: psi.B)
+            print('D = {:3d}, window = {}: norm {:.2f} s, {:.0f} MB; '
+                  'right canonical form {:.2f} s, {:.0f} MB'.format(
+                      D, window, t_norm, m_norm, t_B, m_B))
@@ -0,0 +1,43 @@
+"""Benchmark the enlargement of the bond dimension."""
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('..')
+from mpys.mps import Mps
+
+
+def ghz(L, shared=True):
+    """GHZ state of length L, optionally with a copy of each tensor."""
+    psi = Mps(L, 'GHZ')
+    if not shared:
+        psi._set_tensors([np.array(T) for T in psi.A],
+                         [np.array(T) for T in psi.B])
+    return psi
+
+
+def time_enlarge(L, new_D, shared=True, **kwargs):
+    """Return the best time of enlarging D of a GHZ state of length L."""
+    times = []
+    for _ in range(5):
+        psi = ghz(L, shared)
+        start = time.perf_counter()
+        psi.enlarge_D(new_D, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    modes = [{}, {'only_changed': True}, {'contiguous': True}]
+    for shared in [True, False]:
+        for L in [100, 1000, 10000]:
+            for kwargs in modes:
+                try:
+                    t = time_enlarge(L, 16, shared, **kwargs)
+                except TypeError:
+                    continue
+                print('L = {:5d}, D = 2 -> 16, {}, {}: {:.4f} s'.format(
+                    L, 'shared' if shared else 'copies',
+                    kwargs or 'default', t))
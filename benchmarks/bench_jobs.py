@@ -0,0 +1,41 @@
+"""Benchmark a scan of overlaps evaluated serially and by a JobRunner."""
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.append('..')
+from mpys.backend import blas_threads
+from mpys.jobs import JobRunner
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+def random_state(L, D):
+    """Random normalized state with bond dimension D."""
+    tensors = [np.random.rand(1 if i == 0 else D, 2, 1 if i == L-1 else D)
+               for i in range(L)]
+    return Mps.from_tensors(tensors)
+
+
+if __name__ == '__main__':
+    L = 40
+    for D in [32, 128]:
+        states = [random_state(L, D) for _ in range(8)]
+        pairs = [(psi, phi) for psi in states for phi in states]
+        with blas_threads(1):
+            start = time.perf_counter()
+            serial = [contract(psi, phi) for psi, phi in pairs]
+            t_serial = time.perf_counter() - start
+        for workers in [2, 4]:
+            with JobRunner(workers) as runner:
+                # Start the workers before timing.
+                runner.map(abs, range(workers))
+                start = time.perf_counter()
+                results = runner.map(contract, *zip(*pairs), chunksize=4)
+                t_pool = time.perf_counter() - start
+            assert np.allclose(results, serial)
+            print('D = {:3d}, {} overlaps: serial {:.3f} s, {} workers '
+                  '{:.3f} s'.format(D, len(pairs), t_serial, workers,
+                                    t_pool))
@@ -0,0 +1,41 @@
+"""Benchmark the files of MPS against pickles of the tensors."""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append('..')
+from mpys.mps import Mps
+from mpys.mps_io import load_mps, save_mps
+
+
+if __name__ == '__main__':
+    L = 100
+    with tempfile.TemporaryDirectory() as folder:
+        for D in [64, 256]:
+            psi = Mps(L, 'random')
+            psi.enlarge_D(D)
+            path = os.path.join(folder, 'psi.mps')
+            start = time.perf_counter()
+            save_mps(psi, path)
+            t_save = time.perf_counter() - start
+            start = time.perf_counter()
+            phi = load_mps(path)
+            np.sum(phi.A[L//2])
+            t_open = time.perf_counter() - start
+            start = time.perf_counter()
+            with open(path + '.pkl', 'wb') as f:
+                pickle.dump((list(psi.A), list(psi.B)), f)
+            t_pickle = time.perf_counter() - start
+            start = time.perf_counter()
+            with open(path + '.pkl', 'rb') as f:
+                A, B = pickle.load(f)
+            t_unpickle = time.perf_counter() - start
+            print('D = {:3d}, {:.0f} MB: save {:.3f} s (pickle {:.3f} s), '
+                  'open and read a site {:.4f} s (unpickle {:.3f} s)'
+                  .format(D, os.path.getsize(path)/2**20, t_save, t_pickle,
+                          t_open, t_unpickle))
@@ -0,0 +1,34 @@
+"""Benchmark the random states against a loop of QRs over the sites."""
+
+import sys
+import time
+
+import numpy as np
+from scipy.linalg import qr
+
+sys.path.append('..')
+from mpys.mps import Mps
+
+
+def random_loop(L, D, d=2):
+    """Random left canonical tensors built site by site."""
+    A = []
+    for i in range(L):
+        shape = (min(D, d**min(i, L-i, 20)), d,
+                 min(D, d**min(i+1, L-i-1, 20)))
+        M = np.random.rand(shape[0]*d, shape[2])
+        Q, _ = qr(M, mode='economic')
+        A.append(np.reshape(Q, shape))
+    return A
+
+
+if __name__ == '__main__':
+    for L, D in [(100, 16), (1000, 16), (100, 128), (100, 256)]:
+        start = time.perf_counter()
+        random_loop(L, D)
+        t_loop = time.perf_counter() - start
+        start = time.perf_counter()
+        Mps.random(L, D, seed=0)
+        t_batch = time.perf_counter() - start
+        print('L = {:4d}, D = {:3d}: loop {:.4f} s, batched {:.4f} s'
+              .format(L, D, t_loop, t_batch))
@@ -0,0 +1,52 @@
+"""Benchmark the sparse and dense contractions of sparse MPS tensors.
+
+Prints the time per site of the dense and sparse paths of 'contract'
+for tensors with a given fraction of nonzero entries, to find the
+crossover that sets 'mps_ops.SPARSE_SIZE' and 'mps_ops.SPARSE_DENSITY'.
+"""
+
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.append('..')
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+def sparse_state(L, d, D, density):
+    """State with random tensors of shape (D, d, D) and given density."""
+    psi = Mps(L, 'random', d=d)
+    tensors = []
+    for i in range(L):
+        shape = (1 if i == 0 else D, d, 1 if i == L-1 else D)
+        T = np.random.rand(*shape)
+        T[np.random.rand(*shape) > density] = 0
+        tensors.append(T)
+    psi.A = tensors
+    return psi
+
+
+if __name__ == '__main__':
+    L = 10
+    for d in [2, 3]:
+        for D in [32, 128, 256, 512]:
+            line = 'd = {}, D = {:3d}:'.format(d, D)
+            for density in [0.001, 0.01, 0.05]:
+                psi = sparse_state(L, d, D, density)
+                times = [min(timeit.repeat(
+                    lambda: contract(psi, psi, sparse=sparse), number=3,
+                    repeat=3))/(3*L) for sparse in [False, True]]
+                line += ' density {}: dense {:.1e} s, sparse {:.1e} s;'.format(
+                    density, *times)
+            print(line)
+    # The named states after enlarging the bond dimension.
+    for D in [64, 256, 512]:
+        psi = Mps(40, 'pairs')
+        psi.enlarge_D(D)
+        times = [min(timeit.repeat(lambda: contract(psi, psi, sparse=sparse),
+                                   number=3, repeat=3))/(3*40)
+                 for sparse in [False, True]]
+        print('pairs, D = {:3d}: dense {:.1e} s, sparse {:.1e} s'.format(
+            D, *times))
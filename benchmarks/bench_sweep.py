@@ -0,0 +1,53 @@
+"""Benchmark a sweep over a state on disk with and without pipelining."""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append('..')
+from mpys.environment import grow_left
+from mpys.mps import Mps
+from mpys.mps_io import load_mps, save_mps
+from mpys.sweep import SweepExecutor, touch
+
+
+def run(phi, executor):
+    """Norm sweep of phi, with a measurement of each environment."""
+    envs = [np.ones((1, 1))]
+
+    def step(i, A):
+        envs.append(grow_left(envs[-1], A, A))
+
+    def measure(i):
+        return np.linalg.eigvalsh(envs[i+1])[-1]
+
+    if executor is None:
+        for i in range(phi.L):
+            step(i, touch(phi.A[i]))
+            measure(i)
+    else:
+        executor.sweep(range(phi.L), step, load=lambda i: touch(phi.A[i]),
+                       measure=measure)
+    return envs[-1][0, 0]
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'psi.mps')
+        for D in [128, 512]:
+            save_mps(Mps.random(40, D, seed=0), path)
+            for pipelined in [False, True]:
+                # The tensors are read from the file on each run.
+                phi = load_mps(path)
+                start = time.perf_counter()
+                if pipelined:
+                    with SweepExecutor() as executor:
+                        run(phi, executor)
+                else:
+                    run(phi, None)
+                print('D = {:3d}, pipelined = {}: {:.3f} s'.format(
+                    D, pipelined, time.perf_counter() - start))
+                del phi
@@ -0,0 +1,23 @@
+"""Benchmark the TEBD steps with batched and threaded layers."""
+
+import sys
+
+import numpy as np
+
+sys.path.append('..')
+from mpys.mpo import nearest_neighbour_terms
+from mpys.mps import Mps
+from mpys.tebd import bond_hamiltonians, tebd
+
+
+if __name__ == '__main__':
+    for L, D in [(50, 16), (50, 32), (200, 32)]:
+        bonds = bond_hamiltonians(L, *nearest_neighbour_terms('Heisenberg'))
+        for workers in [None, 2, 4]:
+            psi = Mps(L, 'random')
+            # The first steps grow the bond dimension up to D.
+            info = tebd(psi, bonds, 0.05, 20, D, workers=workers)
+            print('L = {:3d}, D = {:3d}, workers = {}: {:.4f} s/step, '
+                  'error {:.2e}'.format(L, D, workers,
+                                        np.median(info.times[-5:]),
+                                        info.errors[-1]))
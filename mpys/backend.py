@@ -0,0 +1,342 @@
+"""Backends of the numerical primitives.
+
+The contractions and decompositions of the library go through the
+functions 'einsum', 'qr', 'rq', 'svd', 'eigh', 'eigsh' and 'eigs' of
+this module, which pass each call to the current 'Backend'. The backend
+picks the implementation by the size of the tensors:
+
+- Contractions of tiny tensors, like those of the named states with
+  D <= 4, call the C implementation of 'np.einsum' directly, skipping
+  the argument parsing of 'np.einsum' and the plan cache of 'paths'.
+- Larger contractions use the cached plans of 'paths.einsum', or
+  'opt_einsum' if the backend is created with contraction='opt_einsum'
+  and it is installed.
+- Small matrices are decomposed with 'numpy.linalg', which has less
+  overhead, and larger ones with 'scipy.linalg', whose LAPACK drivers
+  are faster (see 'benchmarks/bench_backend.py').
+- The few eigenpairs of large operators, as the effective Hamiltonians
+  of DMRG or the transfer matrices of uniform states, are computed
+  with the iterative solvers of 'scipy.sparse.linalg', and those of
+  operators with few more eigenvalues than requested with dense ones.
+
+The backend can also fix the number of BLAS threads while it is active.
+"""
+
+from collections import namedtuple
+from contextlib import contextmanager
+import importlib
+import os
+
+import numpy as np
+import scipy.linalg
+import scipy.sparse.linalg
+
+from mpys import paths
+
+try:
+    import opt_einsum
+except ImportError:
+    opt_einsum = None
+
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+# Contractions whose operands have at most this number of entries run
+# with the C implementation of 'np.einsum'.
+SMALL_TENSOR = 64
+# Matrices with at most this number of entries are decomposed with
+# 'numpy.linalg'.
+SMALL_MATRIX = 2**9
+# Environment variables with the number of threads of the BLAS and
+# OpenMP libraries.
+BLAS_VARIABLES = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                  'MKL_NUM_THREADS', 'BLIS_NUM_THREADS',
+                  'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+Calls = namedtuple('Calls', ['small', 'large'])
+
+
+def _load_c_einsum():
+    """Return the C implementation of 'np.einsum'.
+
+    It is private to NumPy and has moved between versions, so if it
+    cannot be imported 'np.einsum' is used instead.
+    """
+    for module in ['numpy._core.multiarray', 'numpy.core.multiarray']:
+        try:
+            return importlib.import_module(module).c_einsum
+        except (ImportError, AttributeError):
+            pass
+    return np.einsum
+
+
+c_einsum = _load_c_einsum()
+
+
+class Backend(object):
+    """Implementations of the numerical primitives.
+
+    Attributes:
+        contraction (str): implementation of the large contractions,
+            'numpy' (the cached plans of 'paths') or 'opt_einsum'.
+        threads (int or None): number of BLAS threads while the backend
+            is active. If None, the number is not changed.
+        small_tensor (int): contractions whose operands have at most
+            this number of entries use the fast path.
+        small_matrix (int): matrices with at most this number of
+            entries are decomposed with 'numpy.linalg'.
+
+    """
+
+    def __init__(self, contraction='numpy', threads=None,
+                 small_tensor=SMALL_TENSOR, small_matrix=SMALL_MATRIX):
+        """Initialize a backend.
+
+        Raises:
+            ImportError: if contraction is 'opt_einsum' and it is not
+                installed.
+        """
+        if contraction == 'opt_einsum' and opt_einsum is None:
+            raise ImportError('opt_einsum is not installed.')
+        if contraction not in ('numpy', 'opt_einsum'):
+            raise NameError('The contraction backend was not found.')
+        self.contraction = contraction
+        self.threads = threads
+        self.small_tensor = small_tensor
+        self.small_matrix = small_matrix
+        self._expressions = {}
+        self._calls = {'small': 0, 'large': 0}
+
+    def einsum(self, subscripts, *operands, optimize=True):
+        """Contract tensors, as 'paths.einsum'."""
+        if all(op.size <= self.small_tensor for op in operands):
+            self._calls['small'] += 1
+            return c_einsum(subscripts, *operands)
+        self._calls['large'] += 1
+        if self.contraction == 'numpy' or not optimize:
+            return paths.einsum(subscripts, *operands, optimize=optimize)
+        key = (subscripts,) + tuple(op.shape for op in operands)
+        expression = self._expressions.get(key)
+        if expression is None:
+            expression = opt_einsum.contract_expression(subscripts, *key[1:])
+            self._expressions[key] = expression
+        return expression(*operands)
+
+    def qr(self, M):
+        """Economic QR decomposition M = Q R."""
+        if M.size <= self.small_matrix:
+            return np.linalg.qr(M)
+        return scipy.linalg.qr(M, mode='economic', check_finite=False)
+
+    def rq(self, M):
+        """Economic RQ decomposition M = R Q, with orthonormal rows of Q."""
+        if M.size <= self.small_matrix:
+            # With J the reversal of the rows, J M^T = Q' R' gives
+            # M = (J R'^T J) (J Q'^T).
+            Q, R = np.linalg.qr(M[::-1].T)
+            return R.T[::-1, ::-1], Q.T[::-1]
+        return scipy.linalg.rq(M, mode='economic', check_finite=False)
+
+    def svd(self, M):
+        """Economic SVD M = U S Vh."""
+        if M.size <= self.small_matrix:
+            try:
+                return np.linalg.svd(M, full_matrices=False)
+            except np.linalg.LinAlgError:
+                pass
+        try:
+            return scipy.linalg.svd(M, full_matrices=False,
+                                    check_finite=False)
+        except np.linalg.LinAlgError:
+            # The divide and conquer driver may not converge.
+            return scipy.linalg.svd(M, full_matrices=False,
+                                    check_finite=False,
+                                    lapack_driver='gesvd')
+
+    def eigh(self, M):
+        """Eigenvalues, in increasing order, and eigenvectors of a
+        hermitian matrix."""
+        if M.size <= self.small_matrix:
+            return np.linalg.eigh(M)
+        return scipy.linalg.eigh(M, check_finite=False)
+
+    def eigsh(self, A, k=1, **kwargs):
+        """Some eigenpairs of a hermitian operator, with the Lanczos
+        method.
+
+        Args:
+            A (LinearOperator or matrix): operator.
+            k (int, opt): number of eigenpairs.
+            kwargs: options of 'scipy.sparse.linalg.eigsh', as 'which',
+                'v0' or 'tol'.
+
+        Returns:
+            (ndarray, ndarray): eigenvalues and eigenvectors, as
+                'scipy.sparse.linalg.eigsh'.
+        """
+        return scipy.sparse.linalg.eigsh(A, k=k, **kwargs)
+
+    def eigs(self, A, k=1, which='LM', return_eigenvectors=True,
+             **kwargs):
+        """Some eigenpairs of a general operator, with the Arnoldi
+        method.
+
+        The iterative solver needs more than k+1 eigenvalues, so
+        smaller operators are diagonalized densely, and then all their
+        eigenpairs are returned.
+
+        Args:
+            A (LinearOperator or matrix): operator.
+            k (int, opt): number of eigenpairs.
+            which (str, opt): eigenvalues to find, as in
+                'scipy.sparse.linalg.eigs'. Ignored by the dense path.
+            return_eigenvectors (bool, opt): if False, only return the
+                eigenvalues.
+            kwargs: other options of 'scipy.sparse.linalg.eigs'.
+
+        Returns:
+            (ndarray, ndarray): eigenvalues and eigenvectors, or only
+                the eigenvalues.
+        """
+        n = A.shape[0]
+        if n <= k + 1:
+            M = scipy.sparse.linalg.aslinearoperator(A).matmat(np.eye(n))
+            if return_eigenvectors:
+                return np.linalg.eig(M)
+            return np.linalg.eigvals(M)
+        return scipy.sparse.linalg.eigs(
+            A, k=k, which=which, return_eigenvectors=return_eigenvectors,
+            **kwargs)
+
+    def calls(self):
+        """Return the number of small and large contractions."""
+        return Calls(self._calls['small'], self._calls['large'])
+
+
+_current = Backend()
+# Limits of the BLAS threads of the current backend, and its
+# environment variables.
+_limits = None
+_environment = None
+
+
+def get_backend():
+    """Return the current backend."""
+    return _current
+
+
+def set_backend(backend):
+    """Make a backend the current one.
+
+    If the backend fixes the number of BLAS threads, the limit is set
+    with 'threadpoolctl', if it is installed, and in the environment
+    variables, which only affect the BLAS libraries loaded afterwards,
+    e.g. by new processes. Both are restored when another backend is
+    set.
+
+    Args:
+        backend (Backend or str): backend, or the name of the
+            implementation of the large contractions of a new one.
+
+    Returns:
+        (Backend): the previous backend.
+    """
+    global _current, _limits, _environment
+    if isinstance(backend, str):
+        backend = Backend(backend)
+    previous = _current
+    if _limits is not None:
+        _limits.restore_original_limits()
+        _limits = None
+    if _environment is not None:
+        _environment.__exit__(None, None, None)
+        _environment = None
+    if backend.threads is not None:
+        _environment = blas_environment(backend.threads)
+        _environment.__enter__()
+        if threadpoolctl is not None:
+            _limits = threadpoolctl.threadpool_limits(backend.threads)
+    _current = backend
+    return previous
+
+
+@contextmanager
+def use_backend(backend):
+    """Use a backend inside a 'with' block."""
+    previous = set_backend(backend)
+    try:
+        yield get_backend()
+    finally:
+        set_backend(previous)
+
+
+@contextmanager
+def blas_threads(threads):
+    """Limit the number of threads of the BLAS libraries.
+
+    With 'threadpoolctl' the limit applies to the libraries already
+    loaded. Without it, only the environment variables are set, which
+    only affect the libraries loaded afterwards, e.g. by new processes.
+
+    Args:
+        threads (int): maximum number of threads.
+    """
+    with blas_environment(threads):
+        if threadpoolctl is None:
+            yield
+        else:
+            with threadpoolctl.threadpool_limits(threads):
+                yield
+
+
+@contextmanager
+def blas_environment(threads):
+    """Set the BLAS environment variables, and restore them on exit."""
+    old = {var: os.environ.get(var) for var in BLAS_VARIABLES}
+    os.environ.update({var: str(threads) for var in BLAS_VARIABLES})
+    try:
+        yield
+    finally:
+        for var, value in old.items():
+            if value is None:
+                del os.environ[var]
+            else:
+                os.environ[var] = value
+
+
+def einsum(subscripts, *operands, optimize=True):
+    """Contract tensors with the current backend, as 'paths.einsum'."""
+    return _current.einsum(subscripts, *operands, optimize=optimize)
+
+
+def qr(M):
+    """Economic QR decomposition with the current backend."""
+    return _current.qr(M)
+
+
+def rq(M):
+    """Economic RQ decomposition with the current backend."""
+    return _current.rq(M)
+
+
+def svd(M):
+    """Economic SVD with the current backend."""
+    return _current.svd(M)
+
+
+def eigh(M):
+    """Hermitian eigendecomposition with the current backend."""
+    return _current.eigh(M)
+
+
+def eigsh(A, k=1, **kwargs):
+    """Some eigenpairs of a hermitian operator with the current
+    backend."""
+    return _current.eigsh(A, k, **kwargs)
+
+
+def eigs(A, k=1, **kwargs):
+    """Some eigenpairs of a general operator with the current backend."""
+    return _current.eigs(A, k, **kwargs)
@@ -0,0 +1,114 @@
+"""MPS with a conserved U(1) or Z2 charge, stored in blocks."""
+
+import numpy as np
+
+from mpys.blocks import (BlockTensor, charge_basis, infer_charges,
+                         left_canonical_blocks, right_canonical_blocks)
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+class BlockMps(object):
+    """Class for MPS whose tensors are block-sparse (see 'mpys.blocks').
+
+    Attributes:
+        L (int): length of the MPS.
+        d (int): physical dimension.
+        D (int): maximum bond dimension.
+        symmetry (str): 'U1' or 'Z2'.
+        charges (list of ints): charge of each physical index.
+        A (list of BlockTensors): left canonical tensors.
+        B (list of BlockTensors): right canonical tensors.
+
+    'mps_ops.contract' accepts BlockMps, and contracts them block by
+    block.
+
+    """
+
+    def __init__(self, psi, symmetry='U1', charges=None, tol=1e-12):
+        """Initialize a BlockMps from a dense Mps.
+
+        The bonds of psi are rotated to bases of definite charge (see
+        'blocks.charge_basis'), and their charges are inferred from the
+        tensors.
+
+        Args:
+            psi (Mps): dense state, which must conserve the charge.
+            symmetry (str, opt): 'U1' or 'Z2'.
+            charges (list of ints, opt): charge of each physical index.
+                By default 0, 1, ..., d-1 for U(1), which is the
+                magnetization up to a constant in the basis of
+                increasing S^z, and their parities for Z2.
+            tol (float, opt): entries of the tensors of psi smaller than
+                tol times the largest one are considered zero.
+
+        Raises:
+            ValueError: if psi does not conserve the charge.
+        """
+        if symmetry == 'U1':
+            modulus = 0
+        elif symmetry == 'Z2':
+            modulus = 2
+        else:
+            raise NameError('The symmetry was not found.')
+        if charges is None:
+            charges = [s % modulus if modulus else s
+                       for s in range(psi.d)]
+        self.L = psi.L
+        self.d = psi.d
+        self.symmetry = symmetry
+        self.charges = list(charges)
+        A = charge_basis(psi.A, self.charges, modulus)
+        bonds = infer_charges(A, self.charges, modulus, tol)
+        A = [BlockTensor.from_dense(M, (bonds[i], self.charges, bonds[i+1]),
+                                    modulus)
+             for i, M in enumerate(A)]
+        # The tensors of psi.A are left canonical, but some sectors may
+        # be dropped, so we canonicalize them again.
+        self.B, _ = right_canonical_blocks(left_canonical_blocks(A))
+        self.A = left_canonical_blocks(self.B)
+        self.D = max(T.shape[2] for T in self.B)
+
+    def to_mps(self):
+        """Compute the dense Mps of the state."""
+        return Mps.from_tensors([T.to_dense(self.charges) for T in self.B],
+                                normalize=False)
+
+    def norm(self):
+        """Compute the norm of the state."""
+        return np.real(contract(self, self))
+
+    def truncate_D(self, D):
+        """Truncate the bond dimension to the given one.
+
+        As in 'Mps.truncate_D', but the SVDs act on each sector of the
+        bonds, and the D largest singular values of all the sectors of
+        each bond are kept.
+
+        Args:
+            D (int): new bond dimension.
+
+        Returns:
+            (float): discarded weight, i.e., the sum of the squares of
+                the discarded singular values of all bonds.
+        """
+        if D >= self.D:
+            return 0.
+        norm2 = _norm2(self.A[-1])
+        B, discarded = right_canonical_blocks(self.A, D)
+        norm = np.sqrt(_norm2(B[0]))
+        B[0].blocks = {k: b/norm for k, b in B[0].blocks.items()}
+        self.B = B
+        self.A = left_canonical_blocks(B)
+        self.D = max(T.shape[2] for T in B)
+        return discarded/norm2
+
+    @property
+    def nbytes(self):
+        """Number of bytes of the blocks of 'A' and 'B'."""
+        return sum(T.nbytes for T in self.A) + sum(T.nbytes for T in self.B)
+
+
+def _norm2(T):
+    """Sum of the squares of the entries of a block tensor."""
+    return sum(np.linalg.norm(block)**2 for block in T.blocks.values())
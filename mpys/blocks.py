@@ -0,0 +1,370 @@
+"""Block-sparse site tensors of MPS with a conserved charge.
+
+If the state conserves an abelian charge, U(1) like the magnetization
+or Z2 like the parity, each index of a site tensor M[i, s, j] carries a
+charge and the tensor is zero unless q(j) = q(i) + q(s), modulo 2 for
+Z2. Grouping the indices of each leg in sectors of equal charge, only
+the blocks (q(i), q(s), q(j)) that satisfy the rule are stored.
+
+The contractions, QR and SVD decompositions act block by block: a QR
+or an SVD of a site is split into one independent decomposition per
+sector of the bond, so both the memory and the number of operations
+shrink roughly by the number of sectors.
+"""
+
+import collections
+import numpy as np
+from scipy.linalg import qr
+
+from mpys.backend import einsum
+from mpys.linalg import conj, svd_truncate
+
+
+class BlockTensor(object):
+    """Site tensor of an MPS stored in blocks of fixed charge.
+
+    Attributes:
+        blocks (dict): block of each combination of charges, with keys
+            (q_left, q_physical, q_right) and values the ndarrays of
+            the block, with shapes (dims[0][q_left],
+            dims[1][q_physical], dims[2][q_right]).
+        dims (tuple of dicts): dimension of each sector of the left,
+            physical and right legs.
+
+    The dense tensor orders the sectors of the bonds by increasing
+    charge. The physical leg keeps the order given by its charges.
+
+    """
+
+    def __init__(self, blocks, dims):
+        """Initialize a block tensor.
+
+        Args:
+            blocks (dict): blocks of the tensor.
+            dims (tuple of dicts): dimension of the sectors of each leg.
+        """
+        self.blocks = blocks
+        self.dims = tuple(dims)
+
+    @classmethod
+    def from_dense(cls, T, charges, modulus=0):
+        """Extract the blocks of a dense tensor.
+
+        Args:
+            T (ndarray): dense tensor T[i, s, j].
+            charges (tuple of lists): charge of each index of the left,
+                physical and right legs. The indices with charge None
+                are dropped.
+            modulus (int, opt): 0 for U(1) charges, or n for Z_n
+                charges.
+
+        Returns:
+            (BlockTensor): the tensor. The entries outside of the
+                blocks, which must be zero, are dropped.
+        """
+        positions = [_sectors(q) for q in charges]
+        blocks = {}
+        for ql, rows in positions[0].items():
+            for qs, phys in positions[1].items():
+                qr = fuse(ql, qs, modulus)
+                if qr not in positions[2]:
+                    continue
+                block = T[np.ix_(rows, phys, positions[2][qr])]
+                if np.any(block):
+                    blocks[(ql, qs, qr)] = block
+        dims = [{q: len(p) for q, p in pos.items()} for pos in positions]
+        return cls(blocks, dims)
+
+    def to_dense(self, charges):
+        """Dense tensor T[i, s, j].
+
+        Args:
+            charges (list): charge of each physical index.
+
+        Returns:
+            (ndarray): dense tensor, with the sectors of the bonds in
+                order of increasing charge.
+        """
+        offsets = [_offsets(self.dims[0]), _offsets(self.dims[2])]
+        phys = _sectors(charges)
+        shape = (sum(self.dims[0].values()), len(charges),
+                 sum(self.dims[2].values()))
+        T = np.zeros(shape, self.dtype)
+        for (ql, qs, qr), block in self.blocks.items():
+            m, n = offsets[0][ql], offsets[1][qr]
+            T[m:m+np.shape(block)[0], phys[qs], n:n+np.shape(block)[2]] = \
+                block
+        return T
+
+    @property
+    def shape(self):
+        """Shape of the dense tensor."""
+        return tuple(sum(d.values()) for d in self.dims)
+
+    @property
+    def dtype(self):
+        """Common dtype of the blocks."""
+        if not self.blocks:
+            return np.dtype(np.float64)
+        return np.result_type(*self.blocks.values())
+
+    @property
+    def nbytes(self):
+        """Number of bytes of the blocks."""
+        return sum(block.nbytes for block in self.blocks.values())
+
+
+def infer_charges(tensors, charges, modulus=0, tol=1e-12):
+    """Infer the charges of the bonds of an MPS from its dense tensors.
+
+    The left bond of the first site has charge 0, and the charge of
+    each index j of the right bond of a site is q(i) + q(s) for every
+    nonzero entry M[i, s, j]. The indices whose entries all vanish get
+    the charge None.
+
+    Args:
+        tensors (list of ndarrays): tensors of the MPS.
+        charges (list of ints): charge of each physical index.
+        modulus (int, opt): 0 for U(1) charges, or n for Z_n charges.
+        tol (float, opt): entries smaller than tol times the largest
+            entry of the tensor are considered zero.
+
+    Returns:
+        (list of lists): charges of each bond, the bond i being the one
+            at the left of site i.
+
+    Raises:
+        ValueError: if the tensors do not conserve the charge.
+    """
+    bonds = [[0]*np.shape(tensors[0])[0]]
+    for M in tensors:
+        nonzero = np.abs(M) > tol*np.max(np.abs(M))
+        right = []
+        for j in range(np.shape(M)[2]):
+            found = {fuse(bonds[-1][i], charges[s], modulus)
+                     for i, s in zip(*np.nonzero(nonzero[:, :, j]))
+                     if bonds[-1][i] is not None}
+            if len(found) > 1:
+                raise ValueError('The tensors do not conserve the '
+                                 + 'charge.')
+            right.append(found.pop() if found else None)
+        bonds.append(right)
+    return bonds
+
+
+def charge_basis(tensors, charges, modulus=0):
+    """Rotate the bonds of a left canonical MPS to bases of fixed charge.
+
+    If the state conserves the charge, the charge of the sites at the
+    left of a bond is an operator on the bond, which we diagonalize.
+    This is needed when the bonds mix charges, e.g. in the basis of
+    degenerate singular values of a truncation.
+
+    Args:
+        tensors (list of ndarrays): left canonical tensors of the MPS.
+        charges (list of ints): charge of each physical index.
+        modulus (int, opt): 0 for U(1) charges, or 2 for Z2 charges.
+
+    Returns:
+        (list of ndarrays): tensors of the same state whose bond indices
+            have definite charges.
+    """
+    tensors = list(tensors)
+    if modulus == 2:
+        # Parity operator, whose eigenvalues are +1 and -1.
+        phys = np.diag((-1.)**np.array(charges))
+        Q = np.ones((1, 1))
+    else:
+        phys = np.diag(np.array(charges, dtype=float))
+        Q = np.zeros((1, 1))
+    for i in range(len(tensors)-1):
+        M = tensors[i]
+        if modulus == 2:
+            Q = einsum('mli,mn,lk,nkj->ij', conj(M), Q, phys, M)
+        else:
+            Q = (einsum('mli,mn,nlj->ij', conj(M), Q, M)
+                 + einsum('mli,lk,mkj->ij', conj(M), phys, M))
+        vals, U = np.linalg.eigh(Q)
+        tensors[i] = einsum('isj,jk->isk', M, U)
+        tensors[i+1] = einsum('ij,jsk->isk', conj(U).T, tensors[i+1])
+        Q = np.diag(vals)
+    return tensors
+
+
+def fuse(q1, q2, modulus=0):
+    """Charge of two indices together, for U(1) (modulus 0) or Z_n."""
+    if modulus:
+        return (q1 + q2) % modulus
+    return q1 + q2
+
+
+def grow_left_blocks(L, M, N):
+    """Add a site to a left environment of <psi|phi>, block by block.
+
+    Args:
+        L (dict): left environment, with one matrix L[q][m, n] for each
+            charge q of the bond.
+        M (BlockTensor): tensor of the bra, which is complex conjugated.
+        N (BlockTensor): tensor of the ket.
+
+    Returns:
+        (dict): left environment of the next site.
+    """
+    result = {}
+    for key, block in M.blocks.items():
+        other = N.blocks.get(key)
+        if other is None or key[0] not in L:
+            continue
+        E = np.tensordot(np.tensordot(L[key[0]], conj(block), ([0], [0])),
+                         other, ([0, 1], [0, 1]))
+        if key[2] in result:
+            result[key[2]] = result[key[2]] + E
+        else:
+            result[key[2]] = E
+    return result
+
+
+def left_canonical_blocks(tensors):
+    """Compute the left canonical form of a block MPS with QRs by sector.
+
+    Args:
+        tensors (list of BlockTensors): tensors of the MPS.
+
+    Returns:
+        (list of BlockTensors): left canonical tensors. The norm of the
+            state is carried by the last tensor.
+    """
+    A = []
+    # Matrix of each sector of the bond carried to the next site.
+    R = None
+    for i, T in enumerate(tensors):
+        if R is not None:
+            T = _absorb_left(R, T)
+        if i == len(tensors) - 1:
+            A.append(T)
+            break
+        blocks = {}
+        R = {}
+        dims = {}
+        for q, keys in _group(T.blocks, 2).items():
+            M = np.concatenate([np.reshape(T.blocks[k], (-1, T.dims[2][q]))
+                                for k in keys], axis=0)
+            Q, R[q] = qr(M, mode='economic')
+            dims[q] = np.shape(Q)[1]
+            start = 0
+            for k in keys:
+                Dl, d, _ = np.shape(T.blocks[k])
+                blocks[k] = np.reshape(Q[start:start+Dl*d], (Dl, d, -1))
+                start += Dl*d
+        A.append(BlockTensor(blocks, (T.dims[0], T.dims[1], dims)))
+    return A
+
+
+def right_canonical_blocks(A, D=None):
+    """Compute the right canonical form with SVDs by sector.
+
+    The singular values of all the sectors of a bond are truncated
+    together, keeping the D largest ones.
+
+    Args:
+        A (list of BlockTensors): left canonical tensors, the last one
+            carrying the norm.
+        D (int, opt): maximum bond dimension. If None, no singular
+            value is discarded.
+
+    Returns:
+        B (list of BlockTensors): right canonical tensors. The norm of
+            the state is carried by the first tensor.
+        discarded (float): sum of the squares of the discarded singular
+            values.
+    """
+    L = len(A)
+    discarded = 0.
+    B = [None]*L
+    C = A[-1]
+    for i in reversed(range(1, L)):
+        sectors = {}
+        for ql, keys in _group(C.blocks, 0).items():
+            M = np.concatenate([np.reshape(C.blocks[k], (C.dims[0][ql], -1))
+                                for k in keys], axis=1)
+            sectors[ql] = (keys, svd_truncate(M, min(np.shape(M))))
+        # The D largest singular values of all the sectors are kept.
+        S_all = np.concatenate([usv[1] for _, usv in sectors.values()])
+        n_kept = len(S_all) if D is None else min(D, len(S_all))
+        threshold = np.sort(S_all)[::-1][n_kept-1] if n_kept else np.inf
+        budget = n_kept - np.sum(S_all > threshold)
+        blocks = {}
+        US = {}
+        dims = {}
+        for ql in sorted(sectors):
+            keys, (U, S, Vh, _) = sectors[ql]
+            k = int(np.sum(S > threshold))
+            ties = min(int(np.sum(S == threshold)), budget)
+            k += ties
+            budget -= ties
+            discarded += np.sum(S[k:]**2)
+            if k == 0:
+                continue
+            dims[ql] = k
+            US[ql] = U[:, :k]*S[:k]
+            start = 0
+            for key in keys:
+                _, d, Dr = np.shape(C.blocks[key])
+                blocks[key] = np.reshape(Vh[:k, start:start+d*Dr],
+                                         (k, d, Dr))
+                start += d*Dr
+        B[i] = BlockTensor(blocks, (dims, C.dims[1], C.dims[2]))
+        C = _absorb_right(A[i-1], US)
+    B[0] = C
+    return B, discarded
+
+
+def _absorb_left(R, T):
+    """Multiply the blocks of T by the matrices R[q] on the left bond."""
+    blocks = {}
+    dims = {}
+    for (ql, qs, qr), block in T.blocks.items():
+        if ql not in R:
+            continue
+        blocks[(ql, qs, qr)] = np.tensordot(R[ql], block, ([1], [0]))
+        dims[ql] = np.shape(R[ql])[0]
+    return BlockTensor(blocks, (dims, T.dims[1], T.dims[2]))
+
+
+def _absorb_right(T, US):
+    """Multiply the blocks of T by the matrices US[q] on the right bond."""
+    blocks = {}
+    dims = {}
+    for (ql, qs, qr), block in T.blocks.items():
+        if qr not in US:
+            continue
+        blocks[(ql, qs, qr)] = np.tensordot(block, US[qr], ([2], [0]))
+        dims[qr] = np.shape(US[qr])[1]
+    return BlockTensor(blocks, (T.dims[0], T.dims[1], dims))
+
+
+def _group(blocks, leg):
+    """Group the keys of the blocks by the charge of a leg."""
+    groups = collections.defaultdict(list)
+    for key in sorted(blocks):
+        groups[key[leg]].append(key)
+    return groups
+
+
+def _sectors(charges):
+    """Positions of the indices of each charge, ignoring None."""
+    sectors = collections.defaultdict(list)
+    for i, q in enumerate(charges):
+        if q is not None:
+            sectors[q].append(i)
+    return dict(sectors)
+
+
+def _offsets(dims):
+    """Offset of each sector of a bond, in order of increasing charge."""
+    offsets = {}
+    n = 0
+    for q in sorted(dims):
+        offsets[q] = n
+        n += dims[q]
+    return offsets
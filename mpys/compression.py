@@ -0,0 +1,189 @@
+"""Sums of MPS and their variational compression.
+
+The sum of MPS of bond dimensions D_1, D_2, ... is an MPS of bond
+dimension D_1 + D_2 + ..., whose tensors are block diagonal. Instead of
+truncating it with a sweep of SVDs of that size, 'compress' fits an MPS
+of the target bond dimension D by alternating least squares: in mixed
+canonical form the best tensor of a site is the local vector of the
+linear form <x|b>, so each step only contracts the environments, whose
+cost is linear in the bond dimension of the sum times D**2.
+
+The sweeps can run in a 'SweepExecutor', which reads the tensors of a
+state on disk ahead of the steps.
+"""
+
+import numpy as np
+
+from mpys.backend import qr, rq
+from mpys.environment import Environment
+from mpys.linear_form import LinearForm
+from mpys.mps import Mps
+from mpys.mps_ops import contract_many
+from mpys.storage import result_type
+from mpys.sweep import prefetch
+
+
+def direct_sum(psis, coefficients=None):
+    """Tensors of the linear combination sum_k c_k |psi_k>.
+
+    Args:
+        psis (list of Mps or lists of ndarrays): states. For an Mps we
+            use its left canonical tensors 'A'.
+        coefficients (list of numbers, opt): coefficients c_k. By
+            default all are 1.
+
+    Returns:
+        (list of ndarrays): tensors of the sum, whose bond dimensions
+            are the sums of the bond dimensions of the states.
+    """
+    tensors = [list(getattr(psi, 'A', psi)) for psi in psis]
+    L = len(tensors[0])
+    if any(len(T) != L for T in tensors):
+        raise ValueError('The input MPS do not have matching size.')
+    if coefficients is None:
+        coefficients = [1.]*len(tensors)
+    dtype = np.result_type(*[T[0] for T in tensors], *coefficients)
+    # The coefficients multiply the last tensor, which carries the norm
+    # of left canonical states.
+    last = [c*T[-1] for c, T in zip(coefficients, tensors)]
+    if L == 1:
+        return [np.sum(last, axis=0).astype(dtype)]
+
+    result = [np.concatenate([T[0] for T in tensors], axis=2).astype(dtype)]
+    for i in range(1, L-1):
+        shapes = [np.shape(T[i]) for T in tensors]
+        M = np.zeros((sum(s[0] for s in shapes), shapes[0][1],
+                      sum(s[2] for s in shapes)), dtype)
+        m = n = 0
+        for T, (Dl, _, Dr) in zip(tensors, shapes):
+            M[m:m+Dl, :, n:n+Dr] = T[i]
+            m += Dl
+            n += Dr
+        result.append(M)
+    result.append(np.concatenate(last, axis=0).astype(dtype))
+    return result
+
+
+def linear_combination(psis, coefficients=None, D=None, **kwargs):
+    """Compute the linear combination sum_k c_k |psi_k> of MPS.
+
+    Args:
+        psis (list of Mps): states.
+        coefficients (list of numbers, opt): coefficients c_k. By
+            default all are 1.
+        D (int, opt): maximum bond dimension of the result. If given,
+            the sum is compressed variationally, see 'compress', which
+            receives the other keyword arguments, as 'seed' for the
+            initial guess.
+
+    Returns:
+        (Mps): the linear combination, not normalized.
+    """
+    tensors = direct_sum(psis, coefficients)
+    if D is None:
+        return Mps.from_tensors(tensors, normalize=False)
+    # The norm of the sum from the overlaps of the states is cheaper than
+    # the contraction of the sum with itself.
+    c = np.ones(len(psis)) if coefficients is None else np.array(coefficients)
+    G = contract_many(psis)
+    norm2 = np.real(np.conj(c) @ G @ c)
+    phi, _ = compress(tensors, D, norm2=norm2, **kwargs)
+    return phi
+
+
+def compress(psi, D, x0=None, sweeps=10, tol=1e-10, normalize=False,
+             norm2=None, seed=None, executor=None):
+    """Fit an MPS of bond dimension D to a state by least squares.
+
+    Each sweep goes from left to right and back, replacing the tensor
+    of each site by the one that minimizes || |x> - |psi> || with the
+    other sites fixed. The environments of <x|psi> are cached in a
+    'LinearForm', so each step only contracts one site.
+
+    Args:
+        psi (Mps or list of ndarrays): state to compress, which does
+            not need to be normalized or canonical.
+        D (int): bond dimension of the result.
+        x0 (Mps, opt): initial guess. By default a random state.
+        sweeps (int, opt): maximum number of sweeps.
+        tol (float, opt): the sweeps stop when the error changes less
+            than tol in a sweep.
+        normalize (bool, opt): if True, normalize the result.
+        norm2 (float, opt): squared norm of psi, if it is known. By
+            default it is computed, which costs as much as an SVD
+            sweep of psi.
+        seed (int or np.random.Generator, opt): seed of the random
+            initial guess, as in 'np.random.default_rng'.
+        executor (SweepExecutor, opt): executor of the sweeps, whose
+            threads read the tensors of psi ahead of the steps when
+            they are on disk, as those of 'load_mps' or 'DiskTensors'.
+            By default the sweeps only run in the calling thread.
+
+    Returns:
+        phi (Mps): compressed state.
+        errors (list of floats): relative error
+            || |phi> - |psi> ||**2/|| |psi> ||**2 after each sweep.
+    """
+    # Storage objects are kept, so that a state on disk is read site by
+    # site.
+    b = getattr(psi, 'A', psi)
+    L = len(b)
+    if norm2 is None:
+        norm2 = np.real(Environment(b, b).overlap())
+    if x0 is None:
+        x0 = _random_guess(b, D, np.random.default_rng(seed))
+    F = LinearForm(b, x0)
+
+    def right_step(i, loaded=None):
+        M = F.vector(i)
+        Dl, d, Dr = np.shape(M)
+        Q, _ = qr(np.reshape(M, (Dl*d, Dr)))
+        F.update(i, np.reshape(Q, (Dl, d, -1)))
+
+    def left_step(i, loaded=None):
+        M = F.vector(i)
+        Dl, d, Dr = np.shape(M)
+        _, Q = rq(np.reshape(M, (Dl, d*Dr)))
+        F.update(i, np.reshape(Q, (-1, d, Dr)))
+
+    errors = []
+    for _ in range(sweeps):
+        _sweep(executor, range(L-1), right_step, b)
+        _sweep(executor, reversed(range(1, L)), left_step, b)
+        # The best tensor of site 0 carries the norm of the fit, and
+        # || |x> - |psi> ||**2 = <psi|psi> - <x|x>.
+        C = F.vector(0)
+        F.update(0, C)
+        errors.append(max(float(1 - np.linalg.norm(C)**2/norm2), 0.))
+        if len(errors) > 1 and abs(errors[-2] - errors[-1]) < tol:
+            break
+    return Mps.from_tensors(F.x, normalize=normalize), errors
+
+
+def _sweep(executor, sites, step, b):
+    """Run the steps of a sweep, in the executor if there is one, which
+    reads the tensors of b ahead of them."""
+    if executor is None:
+        for i in sites:
+            step(i)
+    else:
+        executor.sweep(sites, step, load=lambda i: prefetch(b, i))
+
+
+def _random_guess(b, D, rng):
+    """Random right canonical tensors with bond dimension D for a fit."""
+    L = len(b)
+    d = np.shape(b[0])[1]
+    dtype = result_type(b)
+    # Bond i, at the left of site i, cannot exceed d**i, d**(L-i) nor
+    # the bond of the state.
+    bonds = [min(D, d**min(i, L-i), np.shape(b[i])[0] if i < L else 1)
+             for i in range(L+1)]
+    tensors = []
+    for i in range(L):
+        shape = (bonds[i], d, bonds[i+1])
+        M = rng.random(shape) - 0.5
+        if dtype.kind == 'c':
+            M = M + 1j*(rng.random(shape) - 0.5)
+        tensors.append(M.astype(dtype))
+    return Mps.from_tensors(tensors)
@@ -0,0 +1,123 @@
+"""Two-site DMRG algorithm for ground states of MPOs."""
+
+import numpy as np
+
+from mpys.backend import eigh, eigsh, einsum
+from mpys.linalg import svd_truncate
+from mpys.mps import Mps
+from mpys.quadratic_form import QuadraticForm
+
+# Effective Hamiltonians with at most this dimension are diagonalized
+# with a dense eigensolver.
+DENSE_DIMENSION = 64
+
+
+def dmrg(H, psi, D, sweeps=10, tol=1e-10, lanczos_tol=0):
+    """Find the ground state of an MPO with the two-site DMRG algorithm.
+
+    Each step optimizes the tensor of two neighbouring sites with the
+    Lanczos algorithm applied to the effective Hamiltonian, which is
+    never built as a matrix. The Lanczos algorithm starts from the
+    current two-site tensor, so once the sweeps approach convergence
+    it only needs a few iterations.
+
+    Args:
+        H (Mpo): Hamiltonian.
+        psi (Mps): initial state, which is replaced by the ground
+            state.
+        D (int): maximum bond dimension.
+        sweeps (int, opt): maximum number of sweeps, each one going from
+            left to right and back.
+        tol (float, opt): the sweeps stop when the energy changes less
+            than tol in a sweep.
+        lanczos_tol (float, opt): tolerance of the Lanczos algorithm. 0
+            means machine precision.
+
+    Returns:
+        energies (list of floats): energy after each sweep. The last
+            one is the ground state energy.
+    """
+    if (psi.L != H.L) or (psi.d != H.d):
+        raise ValueError('The MPO and the MPS do not have matching '
+                         + 'size or dimension.')
+    L = psi.L
+    if L < 2:
+        raise ValueError('DMRG needs at least two sites.')
+    # Mixed canonical state, which starts with the right canonical
+    # tensors. The quadratic form keeps the environments of <psi|H|psi>.
+    Q = QuadraticForm(H, psi)
+    x = Q.x
+
+    energies = []
+    for _ in range(sweeps):
+        # Sweep from left to right.
+        for i in range(L-1):
+            theta = einsum('isj,jtk->istk', x[i], x[i+1])
+            E, theta = _minimize(Q, i, theta, lanczos_tol)
+            A, C = _split(theta, D, absorb='right')
+            Q.update(i, A)
+            Q.update(i+1, C)
+        # Sweep from right to left.
+        for i in reversed(range(L-1)):
+            theta = einsum('isj,jtk->istk', x[i], x[i+1])
+            E, theta = _minimize(Q, i, theta, lanczos_tol)
+            C, B = _split(theta, D, absorb='left')
+            Q.update(i, C)
+            Q.update(i+1, B)
+        energies.append(float(E))
+        if len(energies) > 1 and abs(energies[-2] - energies[-1]) < tol:
+            break
+
+    phi = Mps.from_tensors(x)
+    # Take the state of phi, whose left canonical form is not computed
+    # yet.
+    psi._replace(phi)
+    return energies
+
+
+def _minimize(Q, i, theta, tol):
+    """Find the lowest eigenpair of a two-site effective Hamiltonian.
+
+    Args:
+        Q (QuadraticForm): the form <psi|H|psi>.
+        i (int): first site of the two-site tensor.
+        theta (ndarray): two-site tensor theta[i, s, t, j], used as the
+            initial vector of the Lanczos algorithm.
+        tol (float): tolerance of the Lanczos algorithm.
+
+    Returns:
+        (float, ndarray): lowest eigenvalue and its normalized
+            eigenvector as a two-site tensor.
+    """
+    shape = np.shape(theta)
+    if theta.size <= DENSE_DIMENSION:
+        vals, vecs = eigh(Q.matrix(i, sites=2))
+        return vals[0], np.reshape(vecs[:, 0], shape)
+    vals, vecs = eigsh(Q.operator(i, sites=2), k=1, which='SA',
+                       v0=np.ravel(theta), tol=tol)
+    return vals[0], np.reshape(vecs[:, 0], shape)
+
+
+def _split(theta, D, absorb):
+    """Split a two-site tensor with a truncated SVD.
+
+    Args:
+        theta (ndarray): two-site tensor theta[i, s, t, j].
+        D (int): maximum bond dimension.
+        absorb (str): 'right' to return a left canonical tensor and the
+            center tensor at the right, 'left' to return the center
+            tensor at the left and a right canonical tensor.
+
+    Returns:
+        (ndarray, ndarray): tensors of the two sites.
+    """
+    Dl, d1, d2, Dr = np.shape(theta)
+    M = np.reshape(theta, (Dl*d1, d2*Dr))
+    U, S, Vh, _ = svd_truncate(M, D)
+    S = S/np.linalg.norm(S)
+    if absorb == 'right':
+        Vh = S[:, None]*Vh
+    else:
+        U = U*S
+    return (np.reshape(U, (Dl, d1, len(S))),
+            np.reshape(Vh, (len(S), d2, Dr)))
@@ -0,0 +1,211 @@
+"""Environments of MPS contractions.
+
+The left environment at site i is the contraction of <psi|phi> over
+the sites at the left of i, with indices L[m, n], m (n) being the bond
+of psi (phi). The right environment at site i is the contraction over
+the sites i, i+1, ... , L-1, with indices R[m, n].
+
+The environments of a sandwich <psi|O|phi> with an MPO O have three
+layers, with indices L[m, a, n] and R[m, a, n], 'a' being the bond of
+the MPO.
+"""
+
+import numpy as np
+
+from mpys.backend import einsum
+from mpys.linalg import conj
+
+
+def grow_left(L, M, N, W=None):
+    """Add a site to a left environment.
+
+    Args:
+        L (ndarray): left environment with indices L[m, n], or
+            L[m, a, n] if there is an MPO.
+        M (ndarray): tensor of the bra at the site, which is complex
+            conjugated.
+        N (ndarray): tensor of the ket at the site.
+        W (ndarray, opt): tensor of the MPO at the site.
+
+    Returns:
+        (ndarray): left environment of the next site.
+    """
+    if W is None:
+        return einsum('mn,mli,nlj->ij', L, conj(M), N)
+    return einsum('man,msi,astb,ntj->ibj', L, conj(M), W, N)
+
+
+def grow_right(R, M, N, W=None):
+    """Add a site to a right environment.
+
+    Args:
+        R (ndarray): right environment with indices R[i, j], or
+            R[i, b, j] if there is an MPO.
+        M (ndarray): tensor of the bra at the site, which is complex
+            conjugated.
+        N (ndarray): tensor of the ket at the site.
+        W (ndarray, opt): tensor of the MPO at the site.
+
+    Returns:
+        (ndarray): right environment of the previous site.
+    """
+    if W is None:
+        return einsum('mli,nlj,ij->mn', conj(M), N, R)
+    return einsum('msi,astb,ntj,ibj->man', conj(M), W, N, R)
+
+
+class Environment(object):
+    """Cached left and right environments of the overlap <psi|phi>, or
+    of the sandwich <psi|O|phi> with an MPO O.
+
+    The environments are computed when needed and kept until a site
+    they depend on changes. After changing the tensor of site i of
+    either state, call 'update(i)': the environments that do not
+    depend on site i stay valid, so the new overlap only needs the
+    contraction of the sites that changed.
+
+    Attributes:
+        psi (Mps or list of ndarrays): bra state, or its tensors.
+        phi (Mps or list of ndarrays): ket state, or its tensors.
+        mpo (Mpo or list of ndarrays): operator in the middle, or its
+            tensors. None for overlaps.
+        L (int): length of the states.
+
+    """
+
+    def __init__(self, psi, phi, mpo=None):
+        """Initialize the environments of two states.
+
+        Args:
+            psi (Mps or list of ndarrays): bra state. For an Mps we use
+                its left canonical tensors 'A'.
+            phi (Mps or list of ndarrays): ket state.
+            mpo (Mpo or list of ndarrays, opt): operator between the
+                states.
+        """
+        self.psi = psi
+        self.phi = phi
+        self.mpo = mpo
+        self.L = len(self.bra)
+        if self.L != len(self.ket):
+            raise ValueError('The input MPS do not have matching size.')
+        self._left = [None]*(self.L+1)
+        self._right = [None]*(self.L+1)
+        dtype = np.result_type(self.bra[0], self.ket[0])
+        shape = (1, 1) if mpo is None else (1, 1, 1)
+        self._left[0] = np.ones(shape, dtype)
+        self._right[self.L] = np.ones(shape, dtype)
+        # The left environments 0, ..., _left_valid and the right ones
+        # _right_valid, ..., L are up to date.
+        self._left_valid = 0
+        self._right_valid = self.L
+        # Last site that changed, where we close the contraction.
+        self._last = 0
+
+    @property
+    def bra(self):
+        """Tensors of the bra state."""
+        return getattr(self.psi, 'A', self.psi)
+
+    @property
+    def ket(self):
+        """Tensors of the ket state."""
+        return getattr(self.phi, 'A', self.phi)
+
+    def _op(self, i):
+        """Tensor of the MPO at site i, or None."""
+        if self.mpo is None:
+            return None
+        return getattr(self.mpo, 'W', self.mpo)[i]
+
+    def update(self, i):
+        """Invalidate the environments that depend on site i.
+
+        Args:
+            i (int): site whose tensor changed in the bra or the ket.
+        """
+        self._left_valid = min(self._left_valid, i)
+        self._right_valid = max(self._right_valid, i+1)
+        self._last = i
+
+    def left(self, i):
+        """Left environment of site i, i.e., of the sites 0, ..., i-1."""
+        bra, ket = self.bra, self.ket
+        while self._left_valid < i:
+            j = self._left_valid
+            self._left[j+1] = grow_left(self._left[j], bra[j], ket[j],
+                                        self._op(j))
+            self._left_valid += 1
+        return self._left[i]
+
+    def right(self, i):
+        """Right environment of site i, i.e., of the sites i, ..., L-1."""
+        bra, ket = self.bra, self.ket
+        while self._right_valid > i:
+            j = self._right_valid - 1
+            self._right[j] = grow_right(self._right[j+1], bra[j], ket[j],
+                                        self._op(j))
+            self._right_valid -= 1
+        return self._right[i]
+
+    def overlap(self):
+        """Compute <psi|phi>, or <psi|O|phi>, reusing the valid
+        environments.
+
+        The contraction is closed at the last site that changed, so
+        when the changes move site by site along the chain, as in a
+        sweep, each new overlap only contracts O(1) sites.
+
+        Returns:
+            (float): the value of <psi|phi> or <psi|O|phi>.
+        """
+        i = self._last
+        return np.sum(self.left(i)*self.right(i))
+
+
+class EnvironmentForm(object):
+    """Base class of the forms of a variable MPS x with cached
+    environments.
+
+    A variational algorithm changes the tensors of x one site at a
+    time with 'update', and the local quantities of the next sites
+    only need the environments that did not change plus the
+    contraction of the sites that moved, so a sweep never recomputes
+    the whole chain.
+
+    Attributes:
+        x (list of ndarrays): tensors of the variable state.
+        L (int): length of the state.
+
+    """
+
+    def __init__(self, x, env):
+        """Initialize a form.
+
+        Args:
+            x (list of ndarrays): tensors of the variable state.
+            env (Environment): environments of the form, with x as bra.
+        """
+        self.x = x
+        self._env = env
+        self.L = env.L
+
+    def value(self):
+        """Compute the value of the form."""
+        return self._env.overlap()
+
+    def update(self, i, M):
+        """Change the tensor of x at site i.
+
+        Args:
+            i (int): site.
+            M (ndarray): new tensor.
+        """
+        self.x[i] = M
+        self._env.update(i)
+
+    def local_shape(self, i, sites=1):
+        """Shape of the local tensor of x at site i."""
+        if sites == 1:
+            return np.shape(self.x[i])
+        return (np.shape(self.x[i])[:2] + np.shape(self.x[i+1])[1:])
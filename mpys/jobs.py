@@ -0,0 +1,326 @@
+"""Parallel evaluation of independent MPS jobs in a pool of processes.
+
+Parameter scans run many independent constructions, contractions and
+sweeps, which a single interpreter evaluates one after the other. A
+'JobRunner' sends them to a pool of worker processes. The tensors of
+the states do not go through pickle: each state is copied into a
+shared memory segment, and the workers build their states from views
+of it. The states returned by the jobs come back the same way.
+
+Each worker runs with a fixed number of BLAS threads, by default one,
+so that the workers do not oversubscribe the cores. The workers start
+with the BLAS environment variables set to that number, before they
+import NumPy, and the limit is also set with 'threadpoolctl' if it is
+installed.
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from mpys.backend import blas_environment
+from mpys.mps import Mps
+from mpys.storage import PackedTensors, packed_offsets
+
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+# Handle of an Mps stored in a shared memory segment. The tensors of
+# 'A' are followed by those of 'B', with the given shapes.
+SharedMps = namedtuple('SharedMps', ['name', 'L', 'd', 'D', 'dtype',
+                                     'shapes'])
+
+# Segments attached by a worker that could not be closed yet, since
+# views of their buffers were still alive.
+_attached = []
+# Active thread limits of a worker.
+_limits = None
+
+
+class JobRunner(object):
+    """Pool of processes that evaluates independent MPS jobs.
+
+    A job is any picklable function, e.g. 'Mps', 'Mps.norm' or
+    'mps_ops.contract', or a function defined at the top level of a
+    module. The arguments of the jobs that are 'Mps' are sent through
+    shared memory, and so are the 'Mps' returned by the jobs. Other
+    arguments and results are pickled.
+
+    The states passed to 'submit' or 'map' are copied to shared memory
+    for that call, once each, and the copies are freed when its jobs
+    finish. A state sent to many calls can be copied once with 'share',
+    and its handle passed instead. The workers receive read-only views
+    of the tensors.
+
+    Usage:
+        with JobRunner(workers=4) as runner:
+            norms = runner.map(Mps.norm, states)
+
+    """
+
+    def __init__(self, workers=None, threads=1, mp_context='spawn'):
+        """Initialize a pool of processes.
+
+        Args:
+            workers (int, opt): number of processes. By default, the
+                number of cores divided by threads.
+            threads (int, opt): number of BLAS threads of each process.
+            mp_context (str, opt): start method of the processes.
+        """
+        if workers is None:
+            workers = max((os.cpu_count() or 1)//threads, 1)
+        self.workers = workers
+        self.threads = threads
+        # The workers share the resource tracker of this process, which
+        # releases the segments that are not unlinked.
+        resource_tracker.ensure_running()
+        # The workers inherit the environment when they start, and the
+        # executor starts them on demand, so they are started here.
+        with blas_environment(threads):
+            self._executor = ProcessPoolExecutor(
+                workers, multiprocessing.get_context(mp_context),
+                initializer=_init_worker, initargs=(threads,))
+            wait([self._executor.submit(os.getpid)
+                  for _ in range(workers)])
+        # Segments of the copies made by 'share'.
+        self._shared = []
+
+    def share(self, psi):
+        """Copy a state to shared memory until the runner is closed.
+
+        The copy is a snapshot: later changes of psi do not reach it.
+
+        Args:
+            psi (Mps): state.
+
+        Returns:
+            (SharedMps): handle of the shared copy, which can be passed
+                to the jobs instead of psi.
+        """
+        handle, shm = _to_shared(psi)
+        self._shared.append(shm)
+        return handle
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule the job fn(*args, **kwargs).
+
+        Returns:
+            (Future): future of the result of the job.
+        """
+        shared = {}
+        args, kwargs = _share_arguments(args, kwargs, shared)
+        try:
+            job = self._executor.submit(_run, fn, args, kwargs)
+        except BaseException:
+            _free(shared)
+            raise
+        future = Future()
+        job.add_done_callback(lambda job: _receive(job, future, shared))
+        return future
+
+    def map(self, fn, *iterables, chunksize=1):
+        """Evaluate a job for each element of the iterables.
+
+        Args:
+            fn (callable): job.
+            iterables (iterables): arguments of the jobs, as in 'map'.
+            chunksize (int, opt): number of jobs sent to a worker at
+                once. Larger chunks lower the cost of the communication
+                of many small jobs.
+
+        Returns:
+            (list): results of the jobs, in order.
+        """
+        shared = {}
+        chunks = []
+        try:
+            jobs = [_share_arguments(args, {}, shared)[0]
+                    for args in zip(*iterables)]
+            for k in range(0, len(jobs), chunksize):
+                chunks.append(self._executor.submit(
+                    _run_batch, fn, jobs[k:k+chunksize]))
+            return [_from_result(result) for chunk in chunks
+                    for result in chunk.result()]
+        finally:
+            # The segments are freed once no job can attach them.
+            wait(chunks)
+            _free(shared)
+
+    def close(self):
+        """Shut down the workers and free the shared memory."""
+        self._executor.shutdown()
+        for shm in self._shared:
+            shm.close()
+            shm.unlink()
+        self._shared = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _share_arguments(args, kwargs, shared):
+    """Replace the Mps in the arguments of a job by their handles.
+
+    Args:
+        args (tuple): positional arguments of the job.
+        kwargs (dict): keyword arguments of the job.
+        shared (dict): copies of the states of a call, by the id of the
+            state. A state already in it is not copied again.
+    """
+    def share(a):
+        if not isinstance(a, Mps):
+            return a
+        if id(a) not in shared:
+            handle, shm = _to_shared(a)
+            # Keep a alive so that its id is not reused during the call.
+            shared[id(a)] = (a, handle, shm)
+        return shared[id(a)][1]
+
+    return (tuple(share(a) for a in args),
+            {k: share(a) for k, a in kwargs.items()})
+
+
+def _free(shared):
+    """Free the copies of the states of a call."""
+    for _, _, shm in shared.values():
+        shm.close()
+        shm.unlink()
+    shared.clear()
+
+
+def _init_worker(threads):
+    """Limit the BLAS threads of a worker for its whole life."""
+    global _limits
+    if threadpoolctl is not None:
+        _limits = threadpoolctl.threadpool_limits(threads)
+
+
+def _run(fn, args, kwargs):
+    """Run a job in a worker, and detach its segments when it ends."""
+    try:
+        return _evaluate(fn, args, kwargs)
+    finally:
+        _detach()
+
+
+def _evaluate(fn, args, kwargs):
+    """Evaluate a job with the states of its handles."""
+    segments = {}
+    args = [_attach(a, segments) if isinstance(a, SharedMps) else a
+            for a in args]
+    kwargs = {k: _attach(a, segments) if isinstance(a, SharedMps) else a
+              for k, a in kwargs.items()}
+    _attached.extend(segments.values())
+    result = fn(*args, **kwargs)
+    if isinstance(result, Mps):
+        handle, shm = _to_shared(result)
+        # The segment lives until the parent unlinks it.
+        shm.close()
+        return handle
+    return result
+
+
+def _detach():
+    """Close the segments attached by the jobs of a worker.
+
+    A segment can only be closed once no view of its buffer is alive. A
+    result of a job may still hold one until it is sent, so the segments
+    that cannot be closed yet are closed after a later job.
+    """
+    for shm in list(_attached):
+        try:
+            shm.close()
+        except BufferError:
+            continue
+        _attached.remove(shm)
+
+
+def _run_batch(fn, jobs):
+    """Run a batch of jobs in a worker."""
+    return [_run(fn, args, {}) for args in jobs]
+
+
+def _receive(job, future, shared):
+    """Pass the result of a job to the future returned by 'submit'."""
+    _free(shared)
+    try:
+        future.set_result(_from_result(job.result()))
+    except BaseException as error:
+        future.set_exception(error)
+
+
+def _from_result(result):
+    """Copy a state returned by a worker out of shared memory."""
+    if not isinstance(result, SharedMps):
+        return result
+    shm = shared_memory.SharedMemory(name=result.name)
+    try:
+        psi = _build(result, _buffer(result, shm).copy())
+    finally:
+        shm.close()
+        shm.unlink()
+    return psi
+
+
+def _to_shared(psi):
+    """Copy the tensors of a state into a new shared memory segment.
+
+    Returns:
+        handle (SharedMps): handle of the copy.
+        shm (SharedMemory): segment, which the caller has to close.
+    """
+    tensors = list(psi.A) + list(psi.B)
+    shapes = [tuple(np.shape(T)) for T in tensors]
+    dtype = np.result_type(*tensors)
+    offsets = packed_offsets(shapes)
+    shm = shared_memory.SharedMemory(
+        create=True, size=max(int(offsets[-1])*dtype.itemsize, 1))
+    handle = SharedMps(shm.name, psi.L, psi.d, psi.D, dtype.str, shapes)
+    data = _buffer(handle, shm)
+    for k, T in enumerate(tensors):
+        data[offsets[k]:offsets[k+1]] = np.ravel(T)
+    return handle, shm
+
+
+def _attach(handle, segments):
+    """Build in a worker the state of a handle, without copying it.
+
+    Args:
+        handle (SharedMps): handle of the state.
+        segments (dict): segments attached by the job, by name.
+    """
+    if handle.name not in segments:
+        segments[handle.name] = shared_memory.SharedMemory(name=handle.name)
+    data = _buffer(handle, segments[handle.name])
+    data.flags.writeable = False
+    return _build(handle, data)
+
+
+def _buffer(handle, shm):
+    """1D array with the tensors of a handle in a segment."""
+    size = int(sum(np.prod(shape) for shape in handle.shapes))
+    return np.ndarray(size, np.dtype(handle.dtype), buffer=shm.buf)
+
+
+def _build(handle, data):
+    """Create an Mps whose tensors are views of a buffer."""
+    L = handle.L
+    offsets = packed_offsets(handle.shapes)
+    psi = Mps.__new__(Mps)
+    psi.L = L
+    psi.d = handle.d
+    psi.D = handle.D
+    psi.dtype = data.dtype
+    psi._set_tensors(
+        PackedTensors.from_buffer(data, handle.shapes[:L], offsets[:L+1]),
+        PackedTensors.from_buffer(data[offsets[L]:], handle.shapes[L:]))
+    return psi
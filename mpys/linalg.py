@@ -0,0 +1,62 @@
+"""Linear algebra routines used by the MPS algorithms."""
+
+import numpy as np
+from scipy.linalg import svd, qr
+
+from mpys import backend
+
+
+def conj(T):
+    """Complex conjugate of a tensor, without copying real tensors."""
+    if np.iscomplexobj(T):
+        return np.conj(T)
+    return T
+
+
+def svd_truncate(M, D, randomized=False, oversampling=10, n_iter=2,
+                 rng=None):
+    """Compute the SVD of a matrix keeping its D largest singular values.
+
+    Args:
+        M (ndarray): matrix to decompose.
+        D (int): maximum number of singular values that we keep.
+        randomized (bool, opt): if True, use a randomized SVD whose
+            cost scales with D instead of with the size of M.
+        oversampling (int, opt): number of extra random vectors used
+            in the randomized SVD.
+        n_iter (int, opt): number of power iterations of the
+            randomized SVD.
+        rng (np.random.Generator, opt): random number generator of the
+            randomized SVD.
+
+    Returns:
+        U (ndarray): left singular vectors, with shape (m, k).
+        S (ndarray): the k <= D largest singular values.
+        Vh (ndarray): right singular vectors, with shape (k, n).
+        discarded (float): sum of the squares of the discarded singular
+            values.
+
+    """
+    k = min(D, *np.shape(M))
+    if randomized and k + oversampling < min(np.shape(M)):
+        U, S, Vh = _randomized_svd(M, k, oversampling, n_iter, rng)
+        discarded = np.linalg.norm(M)**2 - np.sum(S**2)
+        return U, S, Vh, max(discarded, 0.)
+
+    U, S, Vh = backend.svd(M)
+    discarded = np.sum(S[k:]**2)
+    return U[:, :k], S[:k], Vh[:k, :], discarded
+
+
+def _randomized_svd(M, k, oversampling, n_iter, rng):
+    """Randomized SVD of M with rank k (Halko, Martinsson, Tropp)."""
+    if rng is None:
+        rng = np.random.default_rng()
+    Omega = rng.standard_normal((np.shape(M)[1], k + oversampling))
+    Omega = Omega.astype(np.finfo(M.dtype).dtype)
+    Q, _ = qr(M @ Omega, mode='economic')
+    for _ in range(n_iter):
+        Q, _ = qr(M.conj().T @ Q, mode='economic')
+        Q, _ = qr(M @ Q, mode='economic')
+    Ub, S, Vh = svd(Q.conj().T @ M, full_matrices=False)
+    return (Q @ Ub)[:, :k], S[:k], Vh[:k, :]
@@ -1,6 +1,57 @@
-# Linear form class.
+"""Linear form class."""
 
+from mpys.backend import einsum
+from mpys.environment import Environment, EnvironmentForm
 
-class LinearForm(object):
-    """Class of linear forms."""
-    pass
+
+class LinearForm(EnvironmentForm):
+    """Class of linear forms <x|b> of a variable MPS x.
+
+    The linear form keeps the environments of <x|b> cached, see
+    'EnvironmentForm'; 'value' computes <x|b>.
+
+    Attributes:
+        b (list of ndarrays or storage object): tensors of the fixed
+            state, which are read when they are needed.
+        x (list of ndarrays): tensors of the variable state.
+        L (int): length of the states.
+
+    """
+
+    def __init__(self, b, x):
+        """Initialize a linear form.
+
+        Args:
+            b (Mps or list of ndarrays): fixed state. For an Mps we use
+                its left canonical tensors 'A'.
+            x (Mps or list of ndarrays): initial variable state. For an
+                Mps we use its right canonical tensors 'B', so that a
+                sweep can start at site 0.
+        """
+        self.b = getattr(b, 'A', b)
+        x = list(getattr(x, 'B', x))
+        EnvironmentForm.__init__(self, x, Environment(x, self.b))
+
+    def vector(self, i, sites=1):
+        """Local vector of the linear form at site i.
+
+        The local vector is the derivative of <x|b> with respect to the
+        complex conjugate of the tensor of x at site i, or of the two
+        site tensor of x at sites i and i+1.
+
+        Args:
+            i (int): site.
+            sites (int, opt): 1 or 2, number of sites of the local
+                tensor.
+
+        Returns:
+            (ndarray): local vector v[m, s, i], or v[m, s, t, i] with
+                two sites, with the shape of the local tensor.
+        """
+        if sites == 1:
+            return einsum('mn,nsj,ij->msi', self._env.left(i), self.b[i],
+                          self._env.right(i+1))
+        elif sites == 2:
+            return einsum('mn,nsk,ktj,ij->msti', self._env.left(i),
+                          self.b[i], self.b[i+1], self._env.right(i+2))
+        raise ValueError('The local tensor must have 1 or 2 sites.')
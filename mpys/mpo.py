@@ -1,7 +1,255 @@
 """MPO class."""
 
+import numpy as np
+
+from mpys.backend import einsum
+from mpys.linalg import svd_truncate
+from mpys.mps import Mps
+
+
+def spin_operators(d):
+    """Spin operators of a spin (d-1)/2.
+
+    Args:
+        d (int): physical dimension.
+
+    Returns:
+        Sz, Sp, Sm (ndarrays): the operators S^z, S^+ and S^-, in the
+            basis of increasing S^z used by the 'AKLT' Mps.
+    """
+    s = (d - 1)/2
+    m = np.arange(d) - s
+    Sz = np.diag(m)
+    Sp = np.diag(np.sqrt(s*(s+1) - m[:-1]*(m[:-1]+1)), k=-1)
+    return Sz, Sp, Sp.T
+
+
+def nearest_neighbour_fsa(d, terms, onsite=None):
+    """Finite state automaton of a nearest-neighbour Hamiltonian.
+
+    The Hamiltonian is sum_i sum_k O_k(i) P_k(i+1) + sum_i h(i). The
+    automaton starts at state 0, where it stays writing identities
+    until it writes either an O_k, moving to state k, or the onsite
+    term h, moving to the final state. From state k it writes P_k and
+    moves to the final state, where it stays writing identities.
+
+    Args:
+        d (int): physical dimension.
+        terms (list of tuples): pairs of operators (O_k, P_k).
+        onsite (ndarray, opt): onsite term h.
+
+    Returns:
+        n_states (int): number of states of the automaton.
+        transitions (list of tuples): transitions (a, b, op) from state
+            a to state b writing the operator op.
+    """
+    n_states = len(terms) + 2
+    final = n_states - 1
+    transitions = [(0, 0, np.eye(d)), (final, final, np.eye(d))]
+    for k, (O, P) in enumerate(terms, start=1):
+        transitions.append((0, k, O))
+        transitions.append((k, final, P))
+    if onsite is not None:
+        transitions.append((0, final, onsite))
+    return n_states, transitions
+
+
+def nearest_neighbour_terms(name, J=1., h=0.):
+    """Terms of the nearest-neighbour Hamiltonians of 'Mpo'.
+
+    Args:
+        name (str): 'Ising', 'Heisenberg' or 'AKLT', see 'Mpo'.
+        J (float, opt): coupling between neighbours.
+        h (float, opt): external field.
+
+    Returns:
+        d (int): physical dimension.
+        terms (list of tuples): pairs of operators (O_k, P_k) of the
+            interaction sum_k O_k(i) P_k(i+1).
+        onsite (ndarray or None): onsite term.
+    """
+    if name == 'Ising':
+        d = 2
+        X = np.array([[0., 1.], [1., 0.]])
+        Z = np.diag([1., -1.])
+        return d, [(-J*Z, Z)], -h*X
+    elif name == 'Heisenberg':
+        d = 2
+        Sz, Sp, Sm = spin_operators(d)
+        return d, _exchange_terms(J, Sz, Sp, Sm), -h*Sz
+    elif name == 'AKLT':
+        d = 3
+        Sz, Sp, Sm = spin_operators(d)
+        terms = _exchange_terms(1., Sz, Sp, Sm)
+        # (S*S)**2 = sum_kl O_k O_l (x) P_k P_l.
+        terms = ([(J*O, P) for O, P in terms]
+                 + [(J*O1 @ O2/3, P1 @ P2)
+                    for O1, P1 in terms for O2, P2 in terms])
+        return d, terms, None
+    raise NameError('The name of the operator was not found.')
+
 
 class Mpo(object):
-    """Class for matrix product operators (MPO)."""
+    """Class for matrix product operators (MPO).
+
+    Attributes:
+        L (int): length of the MPO.
+        d (int): physical dimension.
+        D (int): bond dimension.
+        W (list of ndarrays): tensors that define the MPO at each site,
+            with indices W[i, s, t, j]: 's' is contracted with the bra
+            and 't' with the ket.
+
+    """
+
+    def __init__(self, L, name=None, J=1., h=0., dtype=np.float64):
+        """Initialize an MPO object.
+
+        Args:
+            L (int): length of the MPO.
+            name (str, opt): name of the operator that we initialize.
+                It can be:
+                - 'Ising': -J sum Z(i) Z(i+1) - h sum X(i), for d = 2.
+                - 'Heisenberg': J sum S(i)*S(i+1) - h sum S^z(i), for
+                  spin 1/2.
+                - 'AKLT': J sum [S(i)*S(i+1) + (S(i)*S(i+1))**2/3], for
+                  spin 1.
+                - 'identity': the identity, for d = 2.
+            J (float, opt): coupling between neighbours.
+            h (float, opt): external field.
+            dtype (np.dtype, opt): dtype of the tensors.
+        """
+        if name == 'identity':
+            d = 2
+            fsa = (1, [(0, 0, np.eye(d))])
+        else:
+            d, terms, onsite = nearest_neighbour_terms(name, J, h)
+            fsa = nearest_neighbour_fsa(d, terms, onsite)
+        self._set_fsa(L, d, *fsa, dtype=dtype)
+
+    @classmethod
+    def from_fsa(cls, L, d, n_states, transitions, dtype=np.float64):
+        """Create an MPO from a finite state automaton.
+
+        Each transition (a, b, op) writes the operator op at a site
+        while the automaton moves from state a to state b. The MPO is
+        the sum of all the strings of operators written by the paths
+        that start at state 0 at the left edge and end at the state
+        n_states-1 at the right edge.
+
+        Args:
+            L (int): length of the MPO.
+            d (int): physical dimension.
+            n_states (int): number of states of the automaton, which is
+                the bond dimension of the MPO.
+            transitions (list of tuples): transitions (a, b, op).
+            dtype (np.dtype, opt): dtype of the tensors.
+
+        Returns:
+            (Mpo): the MPO.
+        """
+        mpo = cls.__new__(cls)
+        mpo._set_fsa(L, d, n_states, transitions, dtype)
+        return mpo
+
+    @classmethod
+    def from_tensors(cls, tensors):
+        """Create an MPO from its tensors W[i, s, t, j]."""
+        mpo = cls.__new__(cls)
+        mpo.W = list(tensors)
+        mpo.L = len(mpo.W)
+        mpo.d = np.shape(mpo.W[0])[1]
+        mpo.D = max(np.shape(W)[3] for W in mpo.W)
+        return mpo
+
+    def _set_fsa(self, L, d, n_states, transitions, dtype):
+        """Build the tensors of the MPO from a finite state automaton."""
+        W = np.zeros((n_states, d, d, n_states), dtype)
+        for a, b, op in transitions:
+            W[a, :, :, b] += op
+        self.L = L
+        self.d = d
+        self.D = n_states
+        if L == 1:
+            self.W = [W[:1, :, :, -1:]]
+        else:
+            self.W = ([W[:1]] + [W]*(L-2) + [W[..., -1:]])
+
+    def to_matrix(self):
+        """Compute the dense matrix of the MPO. Only for small L."""
+        M = np.ones((1, 1, 1))
+        for W in self.W:
+            M = einsum('sta,axyb->sxtyb', M, W)
+            shape = np.shape(M)
+            M = np.reshape(M, (shape[0]*shape[1], shape[2]*shape[3],
+                               shape[4]))
+        return M[:, :, 0]
+
+    def apply(self, psi, D=None, method='exact', normalize=False,
+              D_zipup=None):
+        """Apply the MPO to an Mps.
+
+        Args:
+            psi (Mps): state.
+            D (int, opt): maximum bond dimension of the result. If
+                None, the result is not truncated.
+            method (str, opt): 'exact' builds the tensors of bond
+                dimension psi.D*self.D and then truncates them with a
+                canonical sweep. 'zipup' truncates at each site while
+                sweeping through the chain, so the result is never
+                stored with bond dimension psi.D*self.D, and then
+                truncates to D with a canonical sweep.
+            normalize (bool, opt): if True, normalize the result.
+            D_zipup (int, opt): bond dimension kept during the zip-up
+                sweep. By default 2*D, since the truncations of the
+                zip-up are not optimal.
+
+        Returns:
+            (Mps): the state self|psi>.
+        """
+        if (psi.L != self.L) or (psi.d != self.d):
+            raise ValueError('The MPO and the MPS do not have matching '
+                             + 'size or dimension.')
+        if method == 'exact':
+            tensors = []
+            for W, M in zip(self.W, psi.A):
+                N = einsum('astb,itj->aisbj', W, M)
+                shape = np.shape(N)
+                tensors.append(np.reshape(N, (shape[0]*shape[1], shape[2],
+                                              shape[3]*shape[4])))
+        elif method == 'zipup':
+            if D_zipup is None and D is not None:
+                D_zipup = 2*D
+            tensors = self._zipup(psi, D_zipup)
+        else:
+            raise ValueError('The method was not found.')
+        return Mps.from_tensors(tensors, D, normalize)
+
+    def _zipup(self, psi, D):
+        """Apply the MPO sweeping from left to right with truncations.
+
+        The state is taken in right canonical form, so the truncations
+        at each bond are close to optimal. The tensors of the result
+        are left canonical, except for the last one.
+        """
+        tensors = []
+        # Carry of the sweep, with indices C[k, a, i] for the bonds of
+        # the result, of the MPO and of psi.
+        C = np.ones((1, 1, 1), np.result_type(self.W[0], psi.B[0]))
+        for n, (W, M) in enumerate(zip(self.W, psi.B)):
+            T = einsum('kai,astb,itj->ksbj', C, W, M)
+            k, s, b, j = np.shape(T)
+            if n == self.L - 1:
+                tensors.append(np.reshape(T, (k, s, b*j)))
+                break
+            T = np.reshape(T, (k*s, b*j))
+            U, S, Vh, _ = svd_truncate(T, min(np.shape(T)) if D is None
+                                       else D)
+            tensors.append(np.reshape(U, (k, s, len(S))))
+            C = np.reshape(S[:, None]*Vh, (len(S), b, j))
+        return tensors
+
 
-    pass
+def _exchange_terms(J, Sz, Sp, Sm):
+    """Terms (O_k, P_k) of J*S(i)*S(j) = sum_k O_k(i) P_k(j)."""
+    return [(J*Sz, Sz), (J*Sp, Sm/2), (J*Sm, Sp/2)]
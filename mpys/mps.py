@@ -1,9 +1,262 @@
 """MPS class."""
 
+import os
+
 import numpy as np
-from scipy.linalg import qr, rq
+from scipy.linalg import qr
 
+from mpys import backend
+from mpys.backend import einsum
+from mpys.linalg import svd_truncate
 from mpys.mps_ops import contract
+from mpys.storage import (DiskTensors, PackedTensors, SharedTensors, like,
+                          result_type, site_slots)
+
+# Tensors with at most this number of entries are decomposed with a
+# single stacked QR per shape when we create random states. Larger
+# ones are faster one by one with scipy (see
+# 'benchmarks/bench_random_mps.py').
+STACKED_QR_SIZE = 2**14
+
+
+def _left_canonical(tensors):
+    """Compute the left canonical tensors of an MPS with a QR sweep.
+
+    Args:
+        tensors (list of ndarrays or DiskTensors): tensors of the MPS.
+
+    Returns:
+        (list of ndarrays or DiskTensors): left canonical tensors,
+            stored on disk if the tensors are. The norm of the state is
+            carried by the last tensor.
+    """
+    L = len(tensors)
+    A = like(tensors)
+    R = np.ones((1, 1), result_type(tensors))
+    for i, M in enumerate(tensors):
+        M = einsum('ij,jsk->isk', R, M)
+        if i == L - 1:
+            A[i] = M
+            break
+        shape = np.shape(M)
+        M = np.reshape(M, (shape[0]*shape[1], shape[2]))
+        Q, R = backend.qr(M)
+        A[i] = np.reshape(Q, (shape[0], shape[1], np.shape(Q)[1]))
+    return A
+
+
+def _right_canonical_rq(tensors):
+    """Compute the right canonical tensors of an MPS with an RQ sweep.
+
+    Args:
+        tensors (list of ndarrays or DiskTensors): tensors of the MPS.
+
+    Returns:
+        (list of ndarrays or DiskTensors): right canonical tensors,
+            stored on disk if the tensors are. The norm of the state is
+            carried by the first tensor.
+    """
+    L = len(tensors)
+    B = like(tensors)
+    R = np.ones((1, 1), result_type(tensors))
+    for i in reversed(range(L)):
+        M = einsum('isj,jk->isk', tensors[i], R)
+        if i == 0:
+            B[0] = M
+            break
+        shape = np.shape(M)
+        M = np.reshape(M, (shape[0], shape[1]*shape[2]))
+        R, Q = backend.rq(M)
+        B[i] = np.reshape(Q, (np.shape(Q)[0], shape[1], shape[2]))
+    return B
+
+
+def _random_left_canonical(L, d, D, dtype, rng):
+    """Create random left canonical tensors with bond dimension D.
+
+    The tensors are the Q factors of the QR decompositions of random
+    matrices. Small sites with the same shape, like all the bulk sites
+    when D is small, are decomposed together with a single stacked QR,
+    which avoids the overhead of a call per site.
+
+    Args:
+        L (int): length of the MPS.
+        d (int): physical dimension.
+        D (int): maximum bond dimension.
+        dtype (np.dtype): dtype of the tensors.
+        rng (np.random.Generator): random number generator.
+
+    Returns:
+        (list of ndarrays): tensors of a normalized state.
+    """
+    # Bond i, at the left of site i, cannot exceed d**i nor d**(L-i).
+    bits = int(D).bit_length()
+    bonds = [min(D, d**min(i, L-i, bits)) for i in range(L+1)]
+    shapes = [(bonds[i], d, bonds[i+1]) for i in range(L)]
+    real = np.finfo(dtype).dtype
+    A = [None]*L
+    for shape in dict.fromkeys(shapes):
+        sites = [i for i in range(L) if shapes[i] == shape]
+        size = (len(sites), shape[0]*d, shape[2])
+        M = rng.random(size, dtype=real) - 0.5
+        if dtype.kind == 'c':
+            M = M + 1j*(rng.random(size, dtype=real) - 0.5)
+        if np.prod(shape) <= STACKED_QR_SIZE:
+            Q, _ = np.linalg.qr(M)
+        else:
+            Q = [qr(Mi, mode='economic', overwrite_a=True)[0] for Mi in M]
+        for i, Qi in zip(sites, Q):
+            A[i] = np.reshape(Qi, shape)
+    return A
+
+
+def _move_center(tensors, i, step):
+    """Move the orthogonality center of a mixed canonical form.
+
+    Args:
+        tensors (list of ndarrays): tensors of the mixed canonical
+            form with center at site i, modified in place.
+        i (int): site of the center.
+        step (int): +1 to move the center to site i+1, -1 to move it
+            to site i-1.
+    """
+    M = tensors[i]
+    Dl, d, Dr = np.shape(M)
+    if step == 1:
+        Q, R = backend.qr(np.reshape(M, (Dl*d, Dr)))
+        tensors[i] = np.reshape(Q, (Dl, d, -1))
+        tensors[i+1] = einsum('ij,jsk->isk', R, tensors[i+1])
+    else:
+        R, Q = backend.rq(np.reshape(M, (Dl, d*Dr)))
+        tensors[i] = np.reshape(Q, (-1, d, Dr))
+        tensors[i-1] = einsum('isj,jk->isk', tensors[i-1], R)
+
+
+def _shift_center(tensors, center, k):
+    """Move the center of a mixed canonical form from a site to site k.
+
+    Returns:
+        (list of ndarrays): tensors of the new mixed canonical form. The
+            given tensors are not modified.
+    """
+    tensors = list(tensors)
+    step = 1 if k > center else -1
+    for i in range(center, k, step):
+        _move_center(tensors, i, step)
+    return tensors
+
+
+def _pad_tensors(tensors, bonds, contiguous=False, only_changed=False):
+    """Pad with zeros the tensors of an MPS to the given bond dimensions.
+
+    Args:
+        tensors (list of ndarrays): tensors of the MPS.
+        bonds (list of ints): new dimension of each bond. Bonds that
+            are already larger keep their dimension.
+        contiguous (bool, opt): if True, the padded tensors are packed
+            in a single preallocated buffer (see 'PackedTensors').
+        only_changed (bool, opt): if True, return the same tensor
+            object for the tensors whose shape does not change.
+
+    Returns:
+        (list of ndarrays, PackedTensors or SharedTensors): padded
+            tensors. If not contiguous, sites that shared a tensor
+            share the padded one, and 'SharedTensors' stay shared.
+    """
+    if contiguous:
+        return _pad_packed(tensors, bonds)
+    old = [np.shape(T)[0] for T in tensors] + [np.shape(tensors[-1])[2]]
+    bonds = [max(b, o) for b, o in zip(bonds, old)]
+    shapes = [(bonds[i], np.shape(T)[1], bonds[i+1])
+              for i, T in enumerate(tensors)]
+    dtype = result_type(tensors)
+    padded = like(tensors)
+    # Padded tensors of the tensors that are repeated along the chain.
+    # The tensors read from disk are new objects, so they are not.
+    done = {}
+    on_disk = isinstance(tensors, DiskTensors)
+    for i, (T, shape) in enumerate(zip(tensors, shapes)):
+        if only_changed and np.shape(T) == shape:
+            padded[i] = T
+            continue
+        if (id(T), shape) in done:
+            padded[i] = done[(id(T), shape)]
+            continue
+        M = np.zeros(shape, dtype=dtype)
+        M[:np.shape(T)[0], :, :np.shape(T)[2]] = T
+        padded[i] = M
+        if not on_disk:
+            done[(id(T), shape)] = M
+    if isinstance(tensors, SharedTensors):
+        return SharedTensors(padded)
+    return padded
+
+
+def _pad_packed(tensors, bonds):
+    """Pad tensors with zeros into a single buffer, as '_pad_tensors'.
+
+    The shapes are computed with arrays, and the consecutive sites with
+    the same old and new shapes are copied into the buffer with a
+    single assignment, which broadcasts the tensor if all the sites
+    hold the same one. For 'SharedTensors' only the distinct tensors
+    are read.
+    """
+    if isinstance(tensors, SharedTensors):
+        old = np.array([np.shape(T) for T in tensors.tensors],
+                       dtype=np.int64)[tensors.slots]
+    else:
+        old = np.array([np.shape(T) for T in tensors], dtype=np.int64)
+    bonds = np.maximum(bonds, np.append(old[:, 0], old[-1, 2]))
+    new = np.stack([bonds[:-1], old[:, 1], bonds[1:]], axis=1)
+    padded = PackedTensors.zeros(new, result_type(tensors))
+
+    slots = site_slots(tensors)
+    change = np.any((old[1:] != old[:-1]) | (new[1:] != new[:-1]), axis=1)
+    starts = np.flatnonzero(np.append(True, change)).tolist()
+    ends = starts[1:] + [len(old)]
+    offsets = padded.offsets
+    for i, j in zip(starts, ends):
+        if np.all(slots[i:j] == slots[i]):
+            T = tensors[i]
+        else:
+            T = np.stack(tensors[i:j])
+        block = padded.data[offsets[i]:offsets[j]].reshape(
+            (j - i,) + tuple(new[i]))
+        block[:, :old[i, 0], :, :old[i, 2]] = T
+    return padded
+
+
+def _right_canonical(A, D=None, randomized=False):
+    """Compute the right canonical tensors of an MPS with an SVD sweep.
+
+    Args:
+        A (list of ndarrays or DiskTensors): left canonical tensors of
+            the MPS, the last one carrying the norm.
+        D (int, opt): maximum bond dimension. If None, no singular
+            value is discarded.
+        randomized (bool, opt): if True, use randomized SVDs.
+
+    Returns:
+        B (list of ndarrays or DiskTensors): right canonical tensors,
+            stored on disk if A is. The norm of the state is carried by
+            the first tensor.
+        discarded (float): sum of the squares of the discarded singular
+            values.
+    """
+    L = len(A)
+    discarded = 0.
+    B = like(A)
+    C = A[-1]
+    for i in reversed(range(1, L)):
+        shape = np.shape(C)
+        M = np.reshape(C, (shape[0], shape[1]*shape[2]))
+        U, S, Vh, eps = svd_truncate(M, min(np.shape(M)) if D is None
+                                     else D, randomized=randomized)
+        discarded += eps
+        B[i] = np.reshape(Vh, (len(S), shape[1], shape[2]))
+        C = einsum('isj,jk->isk', A[i-1], U*S)
+    B[0] = C
+    return B, discarded
 
 
 class Mps(object):
@@ -13,14 +266,30 @@ class Mps(object):
         L (int): length of the MPS.
         d (int): physical dimension.
         D (int): maximum bond dimension.
+        dtype (np.dtype): dtype of the tensors.
         A (list of ndarrays): left canonical tensors that define the MPS
             at each site.
         B (list of ndarrays): right canonical tensors that define the
             MPS at each site.
 
+    'A' and 'B' can also be stored with the classes of 'mpys.storage',
+    which behave as lists of tensors.
+
+    The canonical forms are computed when they are first used, from the
+    form that is already known, and then cached. The mixed canonical
+    form of 'mixed' keeps track of its orthogonality center, so moving
+    the center by one site costs a single QR. Assigning 'A' or 'B'
+    drops the other forms, which are then computed from the new one.
+
     """
 
-    def __init__(self, L, name=None, d=None):
+    # Cached canonical forms, None until they are computed.
+    _A = None
+    _B = None
+    _mixed = None
+    _center = None
+
+    def __init__(self, L, name=None, d=None, dtype=np.float64):
         """Initialize an MPS object.
 
         Args:
@@ -29,69 +298,74 @@ class Mps(object):
                 Examples are: 'GHZ', 'AKLT', 'random', 'pairs', and
                 'mixed'.
             d (int, opt): physical dimension (only for the random case).
+            dtype (np.dtype, opt): dtype of the tensors: np.float32,
+                np.float64, np.complex64 or np.complex128.
         """
         self.L = L
-        self.A = []
-        self.B = []
+        self.dtype = np.dtype(dtype)
+        A = []
+        B = []
         if name == 'GHZ':
             self.d = 2
             self.D = 2
-            M = np.zeros((2, 2, 2), np.float64)
+            M = np.zeros((2, 2, 2), dtype)
             M[0, 0, 0] = 1
             M[1, 1, 1] = 1
-            Ai = np.zeros((1, 2, 2), np.float64)
+            Ai = np.zeros((1, 2, 2), dtype)
             Ai[0, 0, 0] = 1
             Ai[0, 1, 1] = 1
-            Bi = np.zeros((1, 2, 2), np.float64)
+            Bi = np.zeros((1, 2, 2), dtype)
             Bi[0, 0, 0] = 1/np.sqrt(2)
             Bi[0, 1, 1] = 1/np.sqrt(2)
-            Af = np.zeros((2, 2, 1), np.float64)
+            Af = np.zeros((2, 2, 1), dtype)
             Af[0, 0, 0] = 1/np.sqrt(2)
             Af[1, 1, 0] = 1/np.sqrt(2)
-            Bf = np.zeros((2, 2, 1), np.float64)
+            Bf = np.zeros((2, 2, 1), dtype)
             Bf[0, 0, 0] = 1
             Bf[1, 1, 0] = 1
             for i in range(L):
                 if i == 0:
-                    self.A.append(Ai)
-                    self.B.append(Bi)
+                    A.append(Ai)
+                    B.append(Bi)
                 elif i == L-1:
-                    self.A.append(Af)
-                    self.B.append(Bf)
+                    A.append(Af)
+                    B.append(Bf)
                 else:
-                    self.A.append(M)
-                    self.B.append(M)
+                    A.append(M)
+                    B.append(M)
+            self._set_tensors(SharedTensors(A), SharedTensors(B))
 
         elif name == 'AKLT':
             self.d = 3
             self.D = 2
-            M = np.zeros((2, 3, 2), np.float64)
+            M = np.zeros((2, 3, 2), dtype)
             M[1, 0, 0] = -np.sqrt(2/3)
             M[0, 1, 0] = -np.sqrt(1/3)
             M[1, 1, 1] = np.sqrt(1/3)
             M[0, 2, 1] = np.sqrt(2/3)
-            Ai = np.zeros((1, 3, 2), np.float64)
+            Ai = np.zeros((1, 3, 2), dtype)
             Ai[0, 0, 0] = 1
             Ai[0, 2, 1] = 1
-            Bi = np.zeros((1, 3, 2), np.float64)
+            Bi = np.zeros((1, 3, 2), dtype)
             Bi[0, 0, 0] = 1/np.sqrt(2)
             Bi[0, 2, 1] = 1/np.sqrt(2)
-            Af = np.zeros((2, 3, 1), np.float64)
+            Af = np.zeros((2, 3, 1), dtype)
             Af[0, 0, 0] = 1/np.sqrt(2)
             Af[1, 2, 0] = 1/np.sqrt(2)
-            Bf = np.zeros((2, 3, 1), np.float64)
+            Bf = np.zeros((2, 3, 1), dtype)
             Bf[0, 0, 0] = 1
             Bf[1, 2, 0] = 1
             for i in range(L):
                 if i == 0:
-                    self.A.append(Ai)
-                    self.B.append(Bi)
+                    A.append(Ai)
+                    B.append(Bi)
                 elif i == L-1:
-                    self.A.append(Af)
-                    self.B.append(Bf)
+                    A.append(Af)
+                    B.append(Bf)
                 else:
-                    self.A.append(M)
-                    self.B.append(M)
+                    A.append(M)
+                    B.append(M)
+            self._set_tensors(SharedTensors(A), SharedTensors(B))
 
         elif name == 'random':
             if d is None:
@@ -99,107 +373,319 @@ class Mps(object):
             self.d = d
             self.D = 2
 
-            # Create a left-canonical MPS.
-            for i in range(L):
-                if i == 0:
-                    shape = (1, d, 2)
-                elif i == L-1:
-                    shape = (2, d, 1)
-                else:
-                    shape = (2, d, 2)
-                M = np.random.rand(*shape)
-                M = np.reshape(M, (shape[0]*shape[1], shape[2]))
-                Q, _ = qr(M, mode='economic')
-                Q = np.reshape(Q, shape)
-                self.A.append(Q)
-
-            # Write the MPS in right-canonical form.
-            self.B = []
-            R = np.ones((1, 1))
-            for i in reversed(range(L)):
-                if i == 0:
-                    shape = (1, d, 2)
-                elif i == L-1:
-                    shape = (2, d, 1)
-                else:
-                    shape = (2, d, 2)
-                M = self.A[i]
-                M = np.einsum('isj,jk->isk', M, R)
-                M = np.reshape(M, (shape[0], shape[1]*shape[2]))
-                R, Q = rq(M, mode='economic')
-                Q = np.reshape(Q, shape)
-                self.B.append(Q)
-            self.B.reverse()
+            # The seed is drawn from the global generator, so that
+            # 'np.random.seed' makes the state reproducible.
+            seed = np.random.randint(2**32, dtype=np.uint32)
+            rng = np.random.default_rng(seed)
+            # The right canonical tensors are computed when used.
+            self.A = _random_left_canonical(L, d, 2, self.dtype, rng)
 
         elif name == 'pairs':
             self.d = 2
             self.D = 2
             # Left canonical tensors.
             # Even sites.
-            Me = np.zeros((1, 2, 2), np.float64)
+            Me = np.zeros((1, 2, 2), dtype)
             Me[0, 0, 0] = 1
             Me[0, 1, 1] = 1
             # Odd sites.
-            Mo = np.zeros((2, 2, 1), np.float64)
+            Mo = np.zeros((2, 2, 1), dtype)
             Mo[1, 0, 0] = np.sqrt(1/2)
             Mo[0, 1, 0] = np.sqrt(1/2)
             # Unpaired sites.
-            Mu = np.zeros((1, 2, 1), np.float64)
+            Mu = np.zeros((1, 2, 1), dtype)
             Mu[0, 0, 0] = 1/np.sqrt(2)
             Mu[0, 1, 0] = 1/np.sqrt(2)
             for i in range(L):
                 if i%2 == 1:  # Odd sites.
-                    self.A.append(Mo)
+                    A.append(Mo)
                 else:  # Even sites.
                     if i != L-1:
-                        self.A.append(Me)
+                        A.append(Me)
                     else:
-                        self.A.append(Mu)
+                        A.append(Mu)
             # Right canonical tensors.
             # Even sites.
-            Me = np.zeros((1, 2, 2), np.float64)
+            Me = np.zeros((1, 2, 2), dtype)
             Me[0, 0, 0] = np.sqrt(1/2)
             Me[0, 1, 1] = np.sqrt(1/2)
             # Odd sites.
-            Mo = np.zeros((2, 2, 1), np.float64)
+            Mo = np.zeros((2, 2, 1), dtype)
             Mo[1, 0, 0] = 1
             Mo[0, 1, 0] = 1
             # Unpaired sites.
-            Mu = np.zeros((1, 2, 1), np.float64)
+            Mu = np.zeros((1, 2, 1), dtype)
             Mu[0, 0, 0] = 1/np.sqrt(2)
             Mu[0, 1, 0] = 1/np.sqrt(2)
             for i in range(L):
                 if i%2 == 1:  # Odd sites.
-                    self.B.append(Mo)
+                    B.append(Mo)
                 else:  # Even sites.
                     if i != L-1:
-                        self.B.append(Me)
+                        B.append(Me)
                     else:
-                        self.B.append(Mu)
+                        B.append(Mu)
+            self._set_tensors(SharedTensors(A), SharedTensors(B))
 
         elif name == 'mixed':
             self.d = 2
             self.D = 1
-            M = np.zeros((1, 2, 1), np.float64)
+            M = np.zeros((1, 2, 1), dtype)
             M[0, 0, 0] = 1/np.sqrt(2)
             M[0, 1, 0] = 1/np.sqrt(2)
             for i in range(L):
-                self.A.append(M)
-                self.B.append(M)
+                A.append(M)
+                B.append(M)
+            self._set_tensors(SharedTensors(A), SharedTensors(B))
 
         else:
             raise NameError('The name of the state was not found.')
 
+    @classmethod
+    def from_tensors(cls, tensors, D=None, normalize=True,
+                     randomized=False):
+        """Create an Mps from the tensors of an arbitrary MPS.
+
+        The tensors are brought to left and right canonical form, and
+        optionally truncated to a maximum bond dimension.
+
+        Args:
+            tensors (list of ndarrays): tensors with indices M[i, s, j].
+            D (int, opt): maximum bond dimension. If None, the state is
+                not truncated.
+            normalize (bool, opt): if True, normalize the state. If
+                False, the norm of the state is carried by the last
+                tensor of 'A' and the first tensor of 'B'.
+            randomized (bool, opt): if True, truncate with randomized
+                SVDs.
+
+        Returns:
+            (Mps): the state.
+        """
+        psi = cls.__new__(cls)
+        psi.L = len(tensors)
+        psi.d = np.shape(tensors[0])[1]
+        psi.dtype = result_type(tensors)
+        B, _ = _right_canonical(_left_canonical(tensors), D, randomized)
+        if normalize:
+            B[0] = B[0]/np.linalg.norm(B[0])
+        psi.B = B
+        psi.D = max(np.shape(B_i)[2] for B_i in B)
+        return psi
+
+    @property
+    def A(self):
+        """Left canonical tensors, computed when first used."""
+        if self._A is None:
+            self._A = self._canonical(self.L-1, self._B)
+        return self._A
+
+    @A.setter
+    def A(self, tensors):
+        self._set_tensors(A=tensors)
+
+    @property
+    def B(self):
+        """Right canonical tensors, computed when first used."""
+        if self._B is None:
+            self._B = self._canonical(0, self._A)
+        return self._B
+
+    @B.setter
+    def B(self, tensors):
+        self._set_tensors(B=tensors)
+
+    def _set_tensors(self, A=None, B=None):
+        """Replace the canonical forms of the state.
+
+        The forms that are not given, and the mixed canonical form, are
+        dropped, and computed from the given ones when used. If both
+        are given, they must describe the same state.
+        """
+        self._A = A
+        self._B = B
+        self._mixed = None
+        self._center = None
+
+    def _replace(self, psi):
+        """Make this object hold the state psi, e.g. the result of an
+        algorithm that works on a new Mps."""
+        self.L = psi.L
+        self.d = psi.d
+        self.D = psi.D
+        self.dtype = psi.dtype
+        self._set_tensors(psi._A, psi._B)
+        self._mixed = psi._mixed
+        self._center = psi._center
+
+    @property
+    def center(self):
+        """Orthogonality center of the cached mixed canonical form."""
+        return self._center if self._mixed is not None else None
+
+    def mixed(self, k):
+        """Compute the mixed canonical form with center at site k.
+
+        The form is A[0], ..., A[k-1], C, B[k+1], ..., B[L-1], where C
+        carries the norm of the state. It is obtained from the cached
+        form whose center is closest to k, moving the center one site
+        at a time with a QR, and it is cached for the next calls.
+
+        Args:
+            k (int): site of the orthogonality center.
+
+        Returns:
+            (list of ndarrays): tensors of the mixed canonical form.
+                The tensors must not be modified in place.
+        """
+        k = k % self.L
+        # A is a mixed canonical form with center at L-1, and B one
+        # with center at 0.
+        known = [(self._center, self._mixed), (self.L-1, self._A),
+                 (0, self._B)]
+        center, tensors = min(
+            [(c, T) for c, T in known if T is not None],
+            key=lambda item: abs(item[0] - k))
+        tensors = _shift_center(tensors, center, k)
+        self._mixed = tensors
+        self._center = k
+        return tensors
+
+    def _canonical(self, k, known):
+        """Compute the canonical form with center at site k (0 or L-1).
+
+        The form is computed from the cached mixed canonical form if
+        there is one, which stays cached, and otherwise with a sweep
+        from the known form. A form computed from packed tensors is
+        also packed.
+        """
+        if self._mixed is not None:
+            tensors = _shift_center(self._mixed, self._center, k)
+        elif k == 0:
+            tensors = _right_canonical_rq(known)
+        else:
+            tensors = _left_canonical(known)
+        if isinstance(known, PackedTensors):
+            tensors = PackedTensors(tensors)
+        return tensors
+
+    @classmethod
+    def random(cls, L, D, d=2, dtype=np.float64, seed=None):
+        """Create a random normalized MPS with bond dimension D.
+
+        The tensors are random left canonical tensors, i.e., random
+        isometries, and the bond i, at the left of site i, has
+        dimension min(D, d**i, d**(L-i)). The right canonical tensors
+        are computed when they are first used.
+
+        Args:
+            L (int): length of the MPS.
+            D (int): bond dimension.
+            d (int, opt): physical dimension.
+            dtype (np.dtype, opt): dtype of the tensors.
+            seed (int or np.random.Generator, opt): seed of the random
+                numbers, as in 'np.random.default_rng'.
+
+        Returns:
+            (Mps): the state.
+        """
+        psi = cls.__new__(cls)
+        psi.L = L
+        psi.d = d
+        psi.dtype = np.dtype(dtype)
+        psi.A = _random_left_canonical(L, d, D, psi.dtype,
+                                       np.random.default_rng(seed))
+        psi.D = max(np.shape(A)[2] for A in psi.A)
+        return psi
+
+    def pack(self):
+        """Pack the tensors of 'A' and 'B' into contiguous buffers.
+
+        After packing, 'A' and 'B' are 'PackedTensors' objects whose
+        elements are views of a single buffer each. They can be
+        indexed and iterated like the lists of tensors. The forms that
+        are not computed yet are packed when they are computed.
+        """
+        if self._A is not None and not isinstance(self._A, PackedTensors):
+            self._A = PackedTensors(self._A)
+        if self._B is not None and not isinstance(self._B, PackedTensors):
+            self._B = PackedTensors(self._B)
+
+    def unpack(self):
+        """Store the tensors of 'A' and 'B' back in lists."""
+        if isinstance(self._A, PackedTensors):
+            self._A = self._A.tolist()
+        if isinstance(self._B, PackedTensors):
+            self._B = self._B.tolist()
+
+    def is_packed(self):
+        """Return True if the tensors are packed in contiguous buffers."""
+        known = self._A if self._A is not None else self._B
+        return isinstance(known, PackedTensors)
+
+    def to_disk(self, folder=None, window=4):
+        """Store the tensors of 'A' and 'B' in files (see 'DiskTensors').
+
+        Only 'window' tensors of each form stay in memory. The sweeps
+        over the sites, like 'contract', the computation of the
+        canonical forms, 'truncate_D' and 'enlarge_D', read the
+        tensors in order and write their results to disk, so their
+        memory does not grow with L. The mixed canonical forms of
+        'mixed' are kept in memory.
+
+        Args:
+            folder (str, opt): folder of the files, with the subfolders
+                'A' and 'B'. By default, temporary folders.
+            window (int, opt): maximum number of tensors of each form
+                in memory.
+        """
+        for name in ['A', 'B']:
+            tensors = getattr(self, '_' + name)
+            if tensors is None or isinstance(tensors, DiskTensors):
+                continue
+            path = None if folder is None else os.path.join(folder, name)
+            setattr(self, '_' + name, DiskTensors(tensors, path, window))
+        self._mixed = None
+
     def norm(self):
         """Compute the norm of the state."""
-        norm = contract(self, self)
+        norm = np.real(contract(self, self))
         return norm
 
-    def truncate_D(self, D):
-        """Truncate the bond dimension a the given one."""
-        pass
+    def truncate_D(self, D, randomized=False):
+        """Truncate the bond dimension to the given one.
+
+        We sweep from right to left over the left canonical tensors
+        doing an SVD at each bond and keeping the D largest singular
+        values, which gives the new right canonical tensors. Then we
+        recompute the left canonical tensors with a sweep of QRs. The
+        truncated state is normalized.
+
+        Args:
+            D (int): new bond dimension of the Mps.
+            randomized (bool, opt): if True, use a randomized SVD whose
+                cost scales with D instead of with the old bond
+                dimension. Useful when D is much smaller than self.D.
+
+        Returns:
+            (float): discarded weight, i.e., the sum of the squares of
+                the discarded singular values of all bonds.
+        """
+        if D >= self.D:
+            # New bond dimension is not smaller than the actual one.
+            return 0.
+
+        norm2 = np.linalg.norm(self.A[-1])**2
+        B, discarded = _right_canonical(self.A, D, randomized)
+        B[0] = B[0]/np.linalg.norm(B[0])
+        packed = self.is_packed()
+        self.B = B
+        self.D = D
+        if packed:
+            self.pack()
+        return discarded/norm2
 
-    def enlarge_D(self, new_D):
+    def enlarge_D(self, new_D, contiguous=False, only_changed=False):
         """Enlarge the bond dimension to a new one.
 
         To enlarge D we add 0's to the tensors of the Mps until we
@@ -207,31 +693,25 @@ class Mps(object):
 
         Args:
             new_D (int): new bond dimension of the Mps.
+            contiguous (bool, opt): if True, the new tensors of each of
+                'A' and 'B' are packed in a single buffer. Packed
+                tensors stay packed.
+            only_changed (bool, opt): if True, the tensors whose shape
+                does not change are kept instead of copied.
         """
         if new_D <= self.D:
             # New bond dimension is smaller than actual bond dimension.
             return
 
-        new_A = []
-        new_B = []
-        for i in range(self.L):
-            shape_A = np.shape(self.A[i])
-            shape_B = np.shape(self.B[i])
-            ti1 = min(i, self.L-i)
-            ti2 = min(i+1, self.L-i-1)
-            new_shape_A = (2**ti1 if np.log2(new_D) > ti1 else new_D,
-                           self.d,
-                           2**ti2 if np.log2(new_D) > ti2 else new_D)
-            new_shape_B = (2**ti1 if np.log2(new_D) > ti1 else new_D,
-                           self.d,
-                           2**ti2 if np.log2(new_D) > ti2 else new_D)
-            new_A = np.zeros(new_shape_A, dtype=np.float64)
-            new_B = np.zeros(new_shape_B, dtype=np.float64)
-            # Write the elts of the old A and B tensors into the new
-            # ones and take them out of the lists 'A' and 'B'.
-            new_A[:shape_A[0], :, :shape_A[2]] = self.A.pop(i)
-            new_B[:shape_B[0], :, :shape_B[2]] = self.B.pop(i)
-            self.A.insert(i, new_A)
-            self.B.insert(i, new_B)
+        # Bond dimension of each bond, the bond i being the one at the
+        # left of site i. It is 2**t at t sites from the edges, or
+        # new_D if that is smaller.
+        contiguous = contiguous or self.is_packed()
+        bits = int(new_D).bit_length()
+        bonds = [new_D if t >= bits else min(2**t, new_D)
+                 for t in (min(i, self.L-i) for i in range(self.L+1))]
+        self._set_tensors(
+            _pad_tensors(self.A, bonds, contiguous, only_changed),
+            _pad_tensors(self.B, bonds, contiguous, only_changed))
         self.D = new_D
         return
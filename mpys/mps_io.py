@@ -0,0 +1,120 @@
+"""Files of MPS.
+
+A file holds a header and then the tensors of 'A' and 'B', one after
+the other in C order, as in a 'PackedTensors' buffer:
+
+    MAGIC | header length (8 bytes, little endian) | JSON header |
+    padding up to a multiple of ALIGNMENT | tensors
+
+The header has the version of the format, L, d, D, the dtype and the
+shapes of the tensors. 'load_mps' maps the tensors with 'np.memmap',
+so opening a file reads only the header, and the pages of a tensor are
+read from disk when a computation touches it.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from mpys.mps import Mps
+from mpys.storage import PackedTensors, packed_offsets
+
+MAGIC = b'MPYS'
+VERSION = 1
+# The tensors start at a multiple of this number of bytes.
+ALIGNMENT = 64
+
+
+def save_mps(psi, path):
+    """Save a state in a file.
+
+    The file is written next to the path and then renamed, so an old
+    file with the same path is only replaced by a complete one.
+
+    Args:
+        psi (Mps): state.
+        path (str): path of the file.
+    """
+    A = list(psi.A)
+    B = list(psi.B)
+    dtype = np.result_type(*A, *B)
+    # The sizes may be NumPy integers, which json cannot write.
+    header = {'version': VERSION, 'L': int(psi.L), 'd': int(psi.d),
+              'D': int(psi.D), 'dtype': dtype.str,
+              'shapes_A': [[int(n) for n in np.shape(T)] for T in A],
+              'shapes_B': [[int(n) for n in np.shape(T)] for T in B]}
+    header = json.dumps(header).encode()
+    start = len(MAGIC) + 8 + len(header)
+    padding = -start % ALIGNMENT
+
+    tmp = '{}.tmp'.format(path)
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        f.write(b' '*padding)
+        for T in A + B:
+            np.ascontiguousarray(T, dtype).tofile(f)
+    os.replace(tmp, path)
+
+
+def load_mps(path, mmap_mode='r'):
+    """Load a state from a file.
+
+    Args:
+        path (str): path of the file.
+        mmap_mode (str, opt): mode of the memory map of the tensors, as
+            in 'np.memmap': 'r' (read-only), 'c' (copy-on-write) or
+            'r+' (modifications are written to the file). If None, the
+            tensors are read into memory.
+
+    Returns:
+        (Mps): the state, whose 'A' and 'B' are 'PackedTensors'.
+    """
+    header, start = read_header(path)
+    dtype = np.dtype(header['dtype'])
+    shapes = [tuple(s) for s in header['shapes_A'] + header['shapes_B']]
+    offsets = packed_offsets(shapes)
+    if mmap_mode is None:
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = np.fromfile(f, dtype, count=offsets[-1])
+    else:
+        data = np.memmap(path, dtype, mmap_mode, offset=start,
+                         shape=(offsets[-1],))
+
+    L = header['L']
+    psi = Mps.__new__(Mps)
+    psi.L = L
+    psi.d = header['d']
+    psi.D = header['D']
+    psi.dtype = dtype
+    psi._set_tensors(
+        PackedTensors.from_buffer(data, shapes[:L], offsets[:L+1]),
+        PackedTensors.from_buffer(data[offsets[L]:], shapes[L:]))
+    return psi
+
+
+def read_header(path):
+    """Read the header of a file of an MPS.
+
+    Args:
+        path (str): path of the file.
+
+    Returns:
+        header (dict): header of the file.
+        start (int): position in bytes of the tensors in the file.
+
+    Raises:
+        ValueError: if the file is not a file of an MPS.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('The file is not a file of an MPS.')
+        n = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(n).decode())
+    if header['version'] > VERSION:
+        raise ValueError('The version of the file is not supported.')
+    start = len(MAGIC) + 8 + n
+    return header, start + (-start % ALIGNMENT)
@@ -1,16 +1,39 @@
-"""Mps operations. Only between MPSs."""
+"""Mps operations, between MPSs and with MPOs in between."""
 
 import numpy as np
+from scipy.sparse import csr_matrix
 
+from mpys.backend import einsum
+from mpys.blocks import BlockTensor, grow_left_blocks
+from mpys.environment import Environment, grow_left
+from mpys.linalg import conj
+from mpys.storage import site_slots
 
-def contract(psi, phi, optimize=True):
+# Site tensors with at least SPARSE_SIZE entries, of which at most a
+# fraction SPARSE_DENSITY is nonzero, are contracted as sparse matrices
+# (see 'benchmarks/bench_sparse_contract.py'). The tensors of the named
+# states are far below SPARSE_SIZE, so they take the dense path unless
+# sparse=True is passed.
+SPARSE_SIZE = 2**18
+SPARSE_DENSITY = 0.01
+
+
+def contract(psi, phi, optimize=True, sparse=None):
     """Compute the expected value of <psi|phi>.
 
+    The tensors of the bra are complex conjugated. Very sparse site
+    tensors, like those of the named states of 'Mps' after enlarging
+    their bond dimension, are contracted as sparse matrices.
+
     Args:
-        psi (Mps): bra state.
-        phi (Mps): ket state.
-        optimize (bool, opt): True if we want the contractions in
-            'np.einsum' to run faster. True may have more memory cost.
+        psi (Mps or BlockMps): bra state.
+        phi (Mps or BlockMps): ket state.
+        optimize (bool, opt): True if we want the contractions to run
+            with a cached optimal path (see 'mpys.paths'). True may
+            have more memory cost.
+        sparse (bool, opt): if True (False), contract all the site
+            tensors as sparse (dense) matrices. By default, detect the
+            sparse tensors.
 
     Returns:
         (float): the expected value of the contracion <psi|phi>.
@@ -19,10 +42,349 @@ def contract(psi, phi, optimize=True):
     if (psi.L != phi.L) or (psi.d != phi.d):
         raise ValueError('The input MPS do not have matching size '
                          + 'or dimension.')
+    if isinstance(psi.A[0], BlockTensor):
+        return _contract_blocks(psi, phi)
 
     # Left tensor that will carry the result of the contraction.
-    L = np.eye(1, dtype=np.float64)
-    for i in range(psi.L):
-        L = np.einsum('mn,mli,nlj->ij', L, psi.A[i], phi.A[i],
-                      optimize=optimize)
+    L = np.eye(1, dtype=np.result_type(psi.A[0], phi.A[0]))
+    # Sparse matrices of the tensors, computed once for repeated ones.
+    matrices = {}
+    for i, n in _uniform_runs(psi.A, phi.A):
+        if _use_transfer_power(psi.A[i], phi.A[i], n):
+            L, log_scale = _transfer_power(L, psi.A[i], phi.A[i], n)
+            L = L*np.exp(log_scale)
+            continue
+        for j in range(i, i+n):
+            L = _grow_left(L, psi.A[j], phi.A[j], optimize, sparse,
+                           matrices)
     return np.trace(L)
+
+
+def _contract_blocks(psi, phi):
+    """Contract two BlockMps block by block.
+
+    The left environment has a block for each charge of the bond, and
+    only the blocks of psi and phi with the same charges are
+    contracted.
+    """
+    if psi.charges != phi.charges:
+        raise ValueError('The input MPS do not have the same charges.')
+    L = {0: np.eye(1, dtype=np.result_type(psi.A[0].dtype, phi.A[0].dtype))}
+    for M, N in zip(psi.A, phi.A):
+        L = grow_left_blocks(L, M, N)
+    return sum(np.trace(E) for E in L.values()) if L else 0.
+
+
+def slog_contract(psi, phi, optimize=True, sparse=None):
+    """Compute the sign and the logarithm of the absolute value of <psi|phi>.
+
+    The left tensor of the contraction is rescaled at every site and
+    the logarithms of the scale factors are accumulated, so the result
+    neither underflows nor overflows for arbitrarily long chains. As in
+    'np.linalg.slogdet', <psi|phi> = sign*exp(logabs).
+
+    Args:
+        psi (Mps): bra state.
+        phi (Mps): ket state.
+        optimize (bool, opt): as in 'contract'.
+        sparse (bool, opt): as in 'contract'.
+
+    Returns:
+        sign (float): sign of <psi|phi>, or 0 if it vanishes. For
+            complex states it is a complex number of absolute value 1.
+        logabs (float): natural logarithm of |<psi|phi>|.
+
+    """
+    if (psi.L != phi.L) or (psi.d != phi.d):
+        raise ValueError('The input MPS do not have matching size '
+                         + 'or dimension.')
+
+    L = np.eye(1, dtype=np.result_type(psi.A[0], phi.A[0]))
+    logabs = 0.
+    matrices = {}
+    for i, n in _uniform_runs(psi.A, phi.A):
+        if _use_transfer_power(psi.A[i], phi.A[i], n):
+            L, log_scale = _transfer_power(L, psi.A[i], phi.A[i], n)
+            logabs += log_scale
+            continue
+        for j in range(i, i+n):
+            L = _grow_left(L, psi.A[j], phi.A[j], optimize, sparse,
+                           matrices)
+            L, log_scale = _rescale(L)
+            logabs += log_scale
+    value = np.trace(L)
+    if value == 0:
+        return 0., -np.inf
+    return value/abs(value), logabs + np.log(abs(value))
+
+
+def _grow_left(L, M, N, optimize, sparse, matrices):
+    """Add a site to the left tensor L[m, n] of a contraction.
+
+    The tensors that are sparse enough are multiplied as sparse
+    matrices, and the others with dense contractions.
+
+    Args:
+        L (ndarray): left tensor.
+        M (ndarray): tensor of the bra, which is complex conjugated.
+        N (ndarray): tensor of the ket.
+        optimize (bool): as in 'contract'.
+        sparse (bool or None): as in 'contract'.
+        matrices (dict): cache of the sparse matrices of the tensors.
+
+    Returns:
+        (ndarray): left tensor of the next site.
+    """
+    Ms = _sparse_matrix(M, True, sparse, matrices)
+    Ns = _sparse_matrix(N, False, sparse, matrices)
+    if Ms is None and Ns is None:
+        return einsum('mn,mli,nlj->ij', L, conj(M), N, optimize=optimize)
+    Dm, d, Di = np.shape(M)
+    Dj = np.shape(N)[2]
+    if Ns is None:
+        X = np.tensordot(L, N, ([1], [0]))
+    else:
+        X = L @ Ns
+    X = np.reshape(X, (Dm*d, Dj))
+    if Ms is None:
+        return np.reshape(conj(M), (Dm*d, Di)).T @ X
+    return Ms @ X
+
+
+def _sparse_matrix(T, bra, sparse, matrices):
+    """Sparse matrix of a site tensor T[i, s, j], or None if dense.
+
+    The matrix of a bra tensor is conj(T)[(i, s), j] transposed, and
+    the one of a ket tensor is T[i, (s, j)].
+    """
+    key = (id(T), bra)
+    if key not in matrices:
+        if sparse is False or (sparse is None and not _is_sparse(T)):
+            M = None
+        else:
+            Dl, d, Dr = np.shape(T)
+            if bra:
+                M = csr_matrix(np.reshape(conj(T), (Dl*d, Dr))).T.tocsr()
+            else:
+                M = csr_matrix(np.reshape(T, (Dl, d*Dr)))
+        # A tensor with a sparse matrix is kept so that its id is not
+        # reused. The dense ones are not kept, so that the tensors read
+        # from disk one by one (see 'DiskTensors') are freed: a reused
+        # id only makes a sparse tensor be contracted as dense.
+        matrices[key] = (T if M is not None else None, M)
+    return matrices[key][1]
+
+
+def _is_sparse(T):
+    """Decide if a site tensor is contracted as a sparse matrix."""
+    size = np.size(T)
+    return (size >= SPARSE_SIZE
+            and np.count_nonzero(T) <= SPARSE_DENSITY*size)
+
+
+def _rescale(T):
+    """Divide a tensor by its largest absolute value.
+
+    Returns:
+        (ndarray, float): the rescaled tensor and the logarithm of the
+            scale factor.
+    """
+    scale = np.max(np.abs(T))
+    if scale == 0:
+        return T, 0.
+    return T/scale, np.log(scale)
+
+
+def _uniform_runs(A, B):
+    """Find the runs of sites where both MPS repeat the same tensors.
+
+    Args:
+        A (list of ndarrays): tensors of the first MPS.
+        B (list of ndarrays): tensors of the second MPS.
+
+    Returns:
+        (list of tuples): (i, n) for each run of n sites, starting at
+            site i, where the tensors of A and B are each the same
+            object.
+    """
+    slots_A = site_slots(A)
+    slots_B = site_slots(B)
+    change = ((slots_A[1:] != slots_A[:-1])
+              | (slots_B[1:] != slots_B[:-1]))
+    starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+    ends = np.concatenate((starts[1:], [len(slots_A)]))
+    return list(zip(starts.tolist(), (ends - starts).tolist()))
+
+
+def _use_transfer_power(M, N, n):
+    """Decide if a run of n equal sites is contracted by squaring.
+
+    Raising the transfer matrix to the power n costs about
+    (D_M*D_N)**3*log2(n) operations, while contracting the sites one by
+    one costs about n*d*D_M*D_N*(D_M + D_N).
+    """
+    Dm, d, _ = np.shape(M)
+    Dn = np.shape(N)[0]
+    if n < 4 or np.shape(M)[2] != Dm or np.shape(N)[2] != Dn:
+        return False
+    return (Dm*Dn)**2*np.log2(n) < n*d*(Dm + Dn)
+
+
+def _transfer_power(L, M, N, n):
+    """Contract n sites with the same tensors by fast exponentiation.
+
+    The squares of the transfer matrix are rescaled to avoid overflows
+    and underflows.
+
+    Args:
+        L (ndarray): left tensor with indices L[m, n].
+        M (ndarray): tensor of the bra at each site of the run.
+        N (ndarray): tensor of the ket at each site of the run.
+        n (int): number of sites of the run.
+
+    Returns:
+        (ndarray, float): left tensor after the run of sites, and the
+            logarithm of the factor that multiplies it.
+    """
+    Dm = np.shape(M)[0]
+    Dn = np.shape(N)[0]
+    T = einsum('mli,nlj->mnij', conj(M), N)
+    T = np.reshape(T, (Dm*Dn, Dm*Dn))
+    T, log_T = _rescale(T)
+    L = np.reshape(L, (1, Dm*Dn))
+    log_L = 0.
+    while n:
+        if n & 1:
+            L, log_scale = _rescale(L @ T)
+            log_L += log_scale + log_T
+        n >>= 1
+        if n:
+            T, log_scale = _rescale(T @ T)
+            log_T = 2*log_T + log_scale
+    return np.reshape(L, (Dm, Dn)), log_L
+
+
+def _stack_sites(tensors):
+    """Stack site tensors along a new leading batch axis.
+
+    Tensors with different shapes are padded with zeros up to the
+    largest shape, which does not change the value of the overlaps.
+
+    Args:
+        tensors (list of ndarrays): site tensors with indices [i, s, j].
+
+    Returns:
+        (ndarray): stacked tensors with indices [k, i, s, j].
+
+    """
+    shapes = {np.shape(T) for T in tensors}
+    if len(shapes) == 1:
+        return np.stack(tensors)
+    shape = tuple(max(dims) for dims in zip(*shapes))
+    S = np.zeros((len(tensors),) + shape,
+                 dtype=np.result_type(*tensors))
+    for k, T in enumerate(tensors):
+        S[k, :T.shape[0], :, :T.shape[2]] = T
+    return S
+
+
+def contract_many(psis, phis=None):
+    """Compute all the overlaps <psi_k|phi_m> in a single sweep.
+
+    The site tensors of all the states are stacked along a batch axis
+    so that each site of the chain is contracted with two batched
+    matrix multiplications instead of one 'np.einsum' per pair.
+
+    Args:
+        psis (list of Mps): bra states.
+        phis (list of Mps, opt): ket states. If None, use the bra
+            states and compute their Gram matrix.
+
+    Returns:
+        (ndarray): matrix G with G[k, m] = <psi_k|phi_m>.
+
+    """
+    if phis is None:
+        phis = psis
+    states = list(psis) + list(phis)
+    L = states[0].L
+    d = states[0].d
+    if any((s.L != L) or (s.d != d) for s in states):
+        raise ValueError('The input MPS do not have matching size '
+                         + 'or dimension.')
+
+    K = len(psis)
+    M = len(phis)
+    # Left tensor that will carry the result of the contraction. Its
+    # indices are E[k, m, a, b] with 'a' ('b') the bond of psi (phi).
+    dtype = np.result_type(*[s.A[0] for s in states])
+    E = np.ones((K, M, 1, 1), dtype=dtype)
+    for i in range(L):
+        P = conj(_stack_sites([psi.A[i] for psi in psis]))
+        Q = _stack_sites([phi.A[i] for phi in phis])
+        a, s, c = P.shape[1:]
+        b, _, e = Q.shape[1:]
+        # Contract the bond index of psi: (k, m*b, a) @ (k, a, s*c).
+        X = np.matmul(np.transpose(E, (0, 1, 3, 2)).reshape(K, M*b, a),
+                      P.reshape(K, a, s*c))
+        X = X.reshape(K, M, b, s, c)
+        # Contract the bond and physical indices of phi:
+        # (m, k*c, b*s) @ (m, b*s, e).
+        X = np.transpose(X, (1, 0, 4, 2, 3)).reshape(M, K*c, b*s)
+        E = np.matmul(X, Q.reshape(M, b*s, e))
+        E = np.transpose(E.reshape(M, K, c, e), (1, 0, 2, 3))
+    return np.trace(E, axis1=2, axis2=3)
+
+
+def expectation(psi, O, phi=None):
+    """Compute the sandwich <psi|O|phi> of an MPO.
+
+    Args:
+        psi (Mps): bra state.
+        O (Mpo): operator.
+        phi (Mps, opt): ket state. By default, psi.
+
+    Returns:
+        (float): the value of <psi|O|phi>.
+
+    """
+    if phi is None:
+        phi = psi
+    if (psi.L != phi.L) or (psi.L != O.L) or (psi.d != phi.d):
+        raise ValueError('The input MPS and MPO do not have matching '
+                         + 'size or dimension.')
+
+    L = np.ones((1, 1, 1), dtype=np.result_type(psi.A[0], phi.A[0]))
+    for M, W, N in zip(psi.A, O.W, phi.A):
+        L = grow_left(L, M, N, W)
+    return L[0, 0, 0]
+
+
+def local_expectations(psi, ops, phi=None):
+    """Compute <psi|O_i|phi> for local operators O_i at every site.
+
+    The left and right environments of <psi|phi> are computed once, so
+    measuring at all the L sites costs a single sweep instead of L
+    contractions of the whole chain.
+
+    Args:
+        psi (Mps): bra state.
+        ops (ndarray or list of ndarrays): operator O[s, t] measured at
+            every site, or list with the operator of each site.
+        phi (Mps, opt): ket state. By default, psi.
+
+    Returns:
+        (ndarray): the values <psi|O_i|phi> of each site i.
+
+    """
+    if phi is None:
+        phi = psi
+    if np.ndim(ops) == 2:
+        ops = [ops]*psi.L
+    env = Environment(psi, phi)
+    values = []
+    for i in range(psi.L):
+        values.append(einsum('mn,msi,st,ntj,ij->', env.left(i),
+                             conj(psi.A[i]), ops[i], phi.A[i],
+                             env.right(i+1)))
+    return np.array(values)
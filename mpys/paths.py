@@ -0,0 +1,171 @@
+"""Cached contraction plans for 'np.einsum'.
+
+Calling 'np.einsum' with 'optimize=True' looks for a good contraction
+path on every call, which for the small tensors of an MPS can cost more
+than the contraction itself. Here the path is computed once for each
+combination of subscripts and operand shapes and compiled into a
+sequence of 'np.tensordot' and plain 'np.einsum' calls that is reused
+in the following calls.
+"""
+
+import collections
+import numpy as np
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses',
+                                                 'currsize'])
+
+# Contractions with a naive cost below this number of operations run as
+# a single unoptimized 'np.einsum' call, which has the least overhead.
+SMALL_CONTRACTION = 2**12
+
+_plans = {}
+_stats = {'hits': 0, 'misses': 0}
+
+
+def einsum(subscripts, *operands, optimize=True):
+    """Evaluate 'np.einsum' reusing a cached contraction plan.
+
+    Args:
+        subscripts (str): subscripts of the contraction, as in
+            'np.einsum'. Ellipses are not supported.
+        operands (ndarrays): tensors to contract.
+        optimize (bool, opt): if False, call 'np.einsum' directly
+            without looking for an optimal contraction path.
+
+    Returns:
+        (ndarray): result of the contraction.
+
+    """
+    if not optimize:
+        return np.einsum(subscripts, *operands)
+    key = (subscripts,) + tuple(np.shape(op) for op in operands)
+    plan = _plans.get(key)
+    if plan is None:
+        _stats['misses'] += 1
+        plan = _compile(subscripts, key[1:])
+        _plans[key] = plan
+    else:
+        _stats['hits'] += 1
+    return _execute(plan, operands)
+
+
+def cache_info():
+    """Return the hits, misses and size of the contraction plan cache."""
+    return CacheInfo(_stats['hits'], _stats['misses'], len(_plans))
+
+
+def cache_clear():
+    """Empty the contraction plan cache and reset its counters."""
+    _plans.clear()
+    _stats['hits'] = 0
+    _stats['misses'] = 0
+
+
+def _parse(subscripts):
+    """Split the subscripts into input and output index strings."""
+    subscripts = subscripts.replace(' ', '')
+    if '.' in subscripts:
+        raise ValueError('Ellipses are not supported in cached '
+                         + 'contractions.')
+    if '->' in subscripts:
+        inputs, output = subscripts.split('->')
+    else:
+        inputs = subscripts
+        counts = collections.Counter(inputs.replace(',', ''))
+        output = ''.join(sorted(c for c in counts if counts[c] == 1))
+    return inputs.split(','), output
+
+
+def _compile(subscripts, shapes):
+    """Compile the contraction into a list of elementary steps.
+
+    Args:
+        subscripts (str): subscripts of the contraction.
+        shapes (tuple of tuples): shapes of the operands.
+
+    Returns:
+        (tuple): steps of the contraction. Each step is a tuple
+            ('positions', 'kind', 'args') where 'positions' are the
+            operands it consumes, 'kind' is 'tensordot', 'einsum' or
+            'transpose', and the result is appended to the operands.
+
+    """
+    inputs, output = _parse(subscripts)
+    dims = {}
+    for sub, shape in zip(inputs, shapes):
+        dims.update(zip(sub, shape))
+    naive_cost = int(np.prod([dims[c] for c in dims]))
+    if naive_cost <= SMALL_CONTRACTION or len(inputs) == 1:
+        return (('all', 'einsum', subscripts),)
+
+    dummies = [np.broadcast_to(np.empty(()), shape) for shape in shapes]
+    # Intermediates larger than the operands are allowed: we look for
+    # the path with the fewest operations.
+    strategy = 'optimal' if len(inputs) <= 5 else 'greedy'
+    path = np.einsum_path(subscripts, *dummies,
+                          optimize=(strategy, 2**62))[0][1:]
+    subs = list(inputs)
+    steps = []
+    for positions in path:
+        positions = tuple(sorted(positions, reverse=True))
+        operands = [subs.pop(p) for p in positions]
+        keep = set(output).union(*subs)
+        if len(operands) == 2:
+            b, a = operands
+            step, result = _pairwise(a, b, keep)
+            steps.append((positions, ) + step)
+        else:
+            result = ''.join(sorted(set(''.join(operands)) & keep))
+            steps.append((positions, 'einsum',
+                          ','.join(reversed(operands)) + '->' + result))
+        subs.append(result)
+    if subs[0] != output:
+        if sorted(subs[0]) == sorted(output):
+            steps.append(((0,), 'transpose',
+                          tuple(subs[0].index(c) for c in output)))
+        else:
+            steps.append(((0,), 'einsum', subs[0] + '->' + output))
+    return tuple(steps)
+
+
+def _pairwise(a, b, keep):
+    """Plan the contraction of two operands.
+
+    Args:
+        a (str): indices of the first operand.
+        b (str): indices of the second operand.
+        keep (set): indices that appear later in the contraction.
+
+    Returns:
+        (tuple, str): the kind and arguments of the step, and the
+            indices of its result.
+
+    """
+    shared = set(a) & set(b)
+    summed = (set(a) | set(b)) - keep
+    repeated = len(set(a)) != len(a) or len(set(b)) != len(b)
+    if (not repeated and not (shared & keep)
+            and summed == shared):
+        axes = ([a.index(c) for c in a if c in shared],
+                [b.index(c) for c in a if c in shared])
+        result = ''.join(c for c in a + b if c not in shared)
+        return ('tensordot', axes), result
+    result = ''.join(c for c in dict.fromkeys(a + b) if c in keep)
+    return ('einsum', a + ',' + b + '->' + result), result
+
+
+def _execute(plan, operands):
+    """Run a compiled contraction plan on the given operands."""
+    operands = list(operands)
+    for positions, kind, args in plan:
+        if positions == 'all':
+            return np.einsum(args, *operands)
+        tensors = [operands.pop(p) for p in positions]
+        if kind == 'tensordot':
+            result = np.tensordot(tensors[1], tensors[0], axes=args)
+        elif kind == 'transpose':
+            result = np.transpose(tensors[0], args)
+        else:
+            result = np.einsum(args, *reversed(tensors))
+        operands.append(result)
+    return operands[0]
@@ -1,7 +1,86 @@
 """Quadratic forms class."""
 
+import numpy as np
+from scipy.sparse.linalg import LinearOperator
 
-class QuadraticForm(object):
-    """Class of quadratic forms."""
+from mpys.backend import einsum
+from mpys.environment import Environment, EnvironmentForm
 
-    pass
+
+class QuadraticForm(EnvironmentForm):
+    """Class of quadratic forms <x|Q|x> of a variable MPS x and an MPO Q.
+
+    The quadratic form keeps the three-layer environments of <x|Q|x>
+    cached, see 'EnvironmentForm'; 'value' computes <x|Q|x>.
+
+    The local matrices are applied to local tensors without building
+    them, see 'matvec' and 'operator'.
+
+    Attributes:
+        Q (list of ndarrays): tensors of the MPO.
+        x (list of ndarrays): tensors of the variable state.
+        L (int): length of the state.
+
+    """
+
+    def __init__(self, Q, x):
+        """Initialize a quadratic form.
+
+        Args:
+            Q (Mpo or list of ndarrays): operator of the form.
+            x (Mps or list of ndarrays): initial variable state. For an
+                Mps we use its right canonical tensors 'B', so that a
+                sweep can start at site 0.
+        """
+        self.Q = list(getattr(Q, 'W', Q))
+        x = list(getattr(x, 'B', x))
+        if len(self.Q) != len(x):
+            raise ValueError('The MPO and the MPS do not have matching '
+                             + 'size.')
+        EnvironmentForm.__init__(self, x, Environment(x, x, self.Q))
+
+    def matvec(self, i, M, sites=1):
+        """Apply the local matrix of the form at site i to a tensor.
+
+        The local matrix is the second derivative of <x|Q|x> with
+        respect to the tensor of x at site i and its complex conjugate,
+        or to the two-site tensor of x at sites i and i+1.
+
+        Args:
+            i (int): site.
+            M (ndarray): local tensor M[m, s, i], or M[m, s, t, i] with
+                two sites.
+            sites (int, opt): 1 or 2, number of sites of the local
+                tensor.
+
+        Returns:
+            (ndarray): the local matrix times M, with the shape of M.
+        """
+        if sites == 1:
+            return einsum('man,astb,ntj,ibj->msi', self._env.left(i),
+                          self.Q[i], M, self._env.right(i+1))
+        elif sites == 2:
+            return einsum('man,astb,buvc,icj,ntvj->msui',
+                          self._env.left(i), self.Q[i], self.Q[i+1],
+                          self._env.right(i+2), M)
+        raise ValueError('The local tensor must have 1 or 2 sites.')
+
+    def operator(self, i, sites=1):
+        """Local matrix at site i as a 'LinearOperator'.
+
+        The operator acts on the flattened local tensors, with the
+        shape given by the current tensors of x.
+        """
+        shape = self.local_shape(i, sites)
+        n = int(np.prod(shape))
+
+        def matvec(v):
+            return np.ravel(self.matvec(i, np.reshape(v, shape), sites))
+
+        dtype = np.result_type(self._env.left(i), self.Q[i], self.x[i])
+        return LinearOperator((n, n), matvec=matvec, dtype=dtype)
+
+    def matrix(self, i, sites=1):
+        """Dense local matrix at site i. Only for small bond dimensions."""
+        op = self.operator(i, sites)
+        return op.matmat(np.eye(op.shape[0], dtype=op.dtype))
@@ -0,0 +1,475 @@
+"""Storage backends for the site tensors of an MPS.
+
+The tensors of an 'Mps' are stored by default in Python lists. The
+classes in this module are drop-in replacements of those lists: they
+can be indexed, iterated and assigned site by site.
+"""
+
+from collections import OrderedDict
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+
+class PackedTensors(object):
+    """Site tensors packed into a single contiguous buffer.
+
+    Indexing returns views of the buffer, so 'T[i]' can be read and
+    modified in place as the tensor of a list.
+
+    Attributes:
+        data (ndarray): 1D buffer with all the tensors, one after the
+            other.
+        shapes (ndarray): shape of each tensor, with shape (L, 3).
+        offsets (ndarray): position of each tensor in the buffer, with
+            shape (L+1,). The tensor i is in data[offsets[i]:
+            offsets[i+1]].
+
+    """
+
+    def __init__(self, tensors, dtype=None):
+        """Pack a list of tensors into a single buffer.
+
+        Args:
+            tensors (list of ndarrays): tensors to pack.
+            dtype (np.dtype, opt): dtype of the buffer. By default, the
+                common dtype of the tensors.
+        """
+        tensors = list(tensors)
+        if dtype is None:
+            dtype = np.result_type(*tensors)
+        shapes = [np.shape(T) for T in tensors]
+        offsets = packed_offsets(shapes)
+        data = np.empty(offsets[-1], dtype=dtype)
+        for i, T in enumerate(tensors):
+            data[offsets[i]:offsets[i+1]] = np.ravel(T)
+        self._set_buffer(data, shapes, offsets)
+
+    @classmethod
+    def from_buffer(cls, data, shapes, offsets=None):
+        """Wrap an existing buffer, e.g. a memory map, without copying.
+
+        Args:
+            data (ndarray): 1D buffer with the tensors.
+            shapes (list of tuples): shape of each tensor.
+            offsets (list of ints, opt): position of each tensor in the
+                buffer. By default, the tensors are one after the other
+                from the start of the buffer.
+
+        Returns:
+            (PackedTensors): tensors stored in 'data'.
+        """
+        if offsets is None:
+            offsets = packed_offsets(shapes)
+        packed = cls.__new__(cls)
+        packed._set_buffer(data, shapes, offsets)
+        return packed
+
+    @classmethod
+    def zeros(cls, shapes, dtype=np.float64):
+        """Create zero tensors with the given shapes in a single buffer."""
+        offsets = packed_offsets(shapes)
+        return cls.from_buffer(np.zeros(offsets[-1], dtype=dtype), shapes,
+                               offsets)
+
+    def _set_buffer(self, data, shapes, offsets):
+        """Store the buffer and create the views of each tensor."""
+        self.data = data
+        self.shapes = np.array(shapes, dtype=np.int64).reshape(-1, 3)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        offsets = self.offsets.tolist()
+        self._views = [data[offsets[i]:offsets[i+1]].reshape(shape)
+                       for i, shape in enumerate(self.shapes.tolist())]
+
+    def __len__(self):
+        return len(self._views)
+
+    def __getitem__(self, i):
+        return self._views[i]
+
+    def __setitem__(self, i, T):
+        if np.shape(T) == np.shape(self._views[i]):
+            self._views[i][...] = T
+        else:
+            # The shape changes, so we have to pack the buffer again.
+            tensors = list(self._views)
+            tensors[i] = T
+            self.__init__(tensors, np.result_type(self.data, T))
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __reversed__(self):
+        return reversed(self._views)
+
+    def __getstate__(self):
+        return {'data': self.data, 'shapes': self.shapes,
+                'offsets': self.offsets}
+
+    def __setstate__(self, state):
+        self._set_buffer(state['data'], state['shapes'], state['offsets'])
+
+    @property
+    def dtype(self):
+        """Dtype of the tensors."""
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        """Size in bytes of the buffer."""
+        return self.data.nbytes
+
+    def tolist(self):
+        """Return the tensors as a list of independent arrays."""
+        return [T.copy() for T in self._views]
+
+
+class SharedTensors(object):
+    """Site tensors where repeated tensors share a single copy.
+
+    Sites that hold the same tensor object, like the bulk sites of a
+    translation invariant state, point to the same slot. The shared
+    tensors are read-only: to modify the tensor of a single site, get
+    a private copy with 'mutable(i)' or assign a new tensor to it.
+
+    Attributes:
+        tensors (list of ndarrays): distinct tensors.
+        slots (ndarray): index in 'tensors' of the tensor of each site.
+
+    """
+
+    def __init__(self, tensors):
+        """Store a list of tensors, keeping one copy of repeated objects.
+
+        Args:
+            tensors (list of ndarrays): tensors of each site.
+        """
+        self.tensors = []
+        self._counts = []
+        slot_of = {}
+        slots = []
+        for T in tensors:
+            if id(T) not in slot_of:
+                slot_of[id(T)] = len(self.tensors)
+                self.tensors.append(T)
+                self._counts.append(0)
+            slots.append(slot_of[id(T)])
+            self._counts[slots[-1]] += 1
+        self.slots = np.array(slots, dtype=np.int64)
+        for k, T in enumerate(self.tensors):
+            if self._counts[k] > 1:
+                self.tensors[k] = _read_only(T)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.tensors[k] for k in self.slots[i]]
+        return self.tensors[self.slots[i]]
+
+    def __setitem__(self, i, T):
+        k = self.slots[i]
+        if self._counts[k] == 1:
+            self.tensors[k] = T
+            return
+        # The slot is shared: the site gets a new one.
+        self._counts[k] -= 1
+        self.slots[i] = len(self.tensors)
+        self.tensors.append(T)
+        self._counts.append(1)
+
+    def __iter__(self):
+        return (self.tensors[k] for k in self.slots)
+
+    def __reversed__(self):
+        return (self.tensors[k] for k in self.slots[::-1])
+
+    def mutable(self, i):
+        """Return a tensor of site i that can be modified in place.
+
+        If the tensor is shared with other sites, it is copied first.
+        """
+        T = self.tensors[self.slots[i]]
+        if self._counts[self.slots[i]] > 1 or not T.flags.writeable:
+            T = np.array(T)
+            self[i] = T
+        return T
+
+    @property
+    def nbytes(self):
+        """Size in bytes of the distinct tensors."""
+        return sum(T.nbytes for T in self.tensors)
+
+    def tolist(self):
+        """Return the tensors as a list, which shares repeated objects."""
+        return list(self)
+
+
+class DiskTensors(object):
+    """Site tensors stored in files, with a window of them in memory.
+
+    Each tensor is stored in a file of its own. The tensors that are
+    read or assigned stay in memory until 'window' other tensors are
+    used after them, and then the least recently used one is dropped,
+    after writing it to its file if it was assigned. A sequential pass
+    over the sites, like 'contract' or the canonicalization sweeps of
+    'Mps', keeps at most 'window' tensors in memory.
+
+    The tensors read from the files are read-only, since modifications
+    in place would be lost when they leave the window: to modify the
+    tensor of a site, assign a new one to it.
+
+    The assigned tensors that are still in the window are written to
+    their files by 'flush', or when the object is deleted. A temporary
+    folder is instead removed with the object. Copies, with 'copy' or
+    'copy.deepcopy', write the tensors to a new temporary folder, and
+    the objects cannot be pickled, since their files belong to them.
+
+    Attributes:
+        folder (str): folder of the files.
+        window (int): maximum number of tensors in memory.
+
+    """
+
+    def __init__(self, tensors, folder=None, window=4):
+        """Store tensors in files.
+
+        Args:
+            tensors (iterable of ndarrays): tensors of each site. They
+                are written one by one, so a generator of tensors is
+                never in memory as a whole.
+            folder (str, opt): folder of the files, which is created if
+                it does not exist. By default, a temporary folder that
+                is removed with the object.
+            window (int, opt): maximum number of tensors in memory.
+        """
+        temporary = folder is None
+        if temporary:
+            folder = tempfile.mkdtemp(prefix='mpys-')
+        else:
+            os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.window = window
+        self._cache = OrderedDict()
+        self._dirty = set()
+        self._dtypes = []
+        self._finalizer = weakref.finalize(self, _save_dirty, folder,
+                                           self._cache, self._dirty)
+        if temporary:
+            self._remove_folder_on_deletion()
+        for i, T in enumerate(tensors):
+            self._dtypes.append(np.asarray(T).dtype)
+            np.save(self._path(i), T)
+
+    @classmethod
+    def empty(cls, L, window=4, dir=None):
+        """Create L sites without tensors in a new temporary folder.
+
+        Args:
+            L (int): number of sites.
+            window (int, opt): maximum number of tensors in memory.
+            dir (str, opt): folder where the temporary folder is
+                created. By default, the one of 'tempfile'.
+        """
+        folder = tempfile.mkdtemp(prefix='mpys-', dir=dir)
+        empty = cls([], folder, window)
+        empty._remove_folder_on_deletion()
+        empty._dtypes = [None]*L
+        return empty
+
+    def empty_like(self):
+        """Create empty sites with the window of these ones, in a new
+        temporary folder next to theirs."""
+        return DiskTensors.empty(len(self), self.window,
+                                 os.path.dirname(self.folder))
+
+    def copy(self):
+        """Copy the tensors to a new temporary folder next to this one."""
+        other = self.empty_like()
+        for i, dtype in enumerate(self._dtypes):
+            if i in self._dirty:
+                np.save(other._path(i), self._cache[i])
+            elif dtype is not None:
+                shutil.copyfile(self._path(i), other._path(i))
+        other._dtypes = list(self._dtypes)
+        return other
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __reduce__(self):
+        raise TypeError('DiskTensors cannot be pickled, since the files '
+                        'of its tensors belong to it.')
+
+    def _remove_folder_on_deletion(self):
+        """Remove the folder with the object, instead of flushing it."""
+        self._finalizer.detach()
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.folder,
+                                           True)
+
+    def _path(self, i):
+        return _site_path(self.folder, i)
+
+    def _index(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError('Site index out of range.')
+        return i % len(self)
+
+    def _keep(self, i, T, dirty):
+        """Put a tensor in the window, dropping the oldest if full."""
+        self._cache[i] = T
+        self._cache.move_to_end(i)
+        if dirty:
+            self._dirty.add(i)
+        while len(self._cache) > self.window:
+            j, U = self._cache.popitem(last=False)
+            if j in self._dirty:
+                np.save(self._path(j), U)
+                self._dirty.discard(j)
+
+    def __len__(self):
+        return len(self._dtypes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(len(self))[i]]
+        i = self._index(i)
+        if i in self._cache:
+            self._cache.move_to_end(i)
+            return self._cache[i]
+        if self._dtypes[i] is None:
+            raise ValueError('The tensor of site {} was not assigned.'
+                             .format(i))
+        T = _read_only(np.load(self._path(i)))
+        self._keep(i, T, dirty=False)
+        return T
+
+    def __setitem__(self, i, T):
+        i = self._index(i)
+        T = np.asarray(T)
+        self._dtypes[i] = T.dtype
+        self._keep(i, T, dirty=True)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __reversed__(self):
+        return (self[i] for i in reversed(range(len(self))))
+
+    def map_file(self, i):
+        """Memory map the file of the tensor of site i.
+
+        Unlike indexing, it does not change the window, so it can be
+        called from other threads, e.g. to read a file before a sweep
+        needs it.
+
+        Returns:
+            (np.memmap or None): read-only map of the tensor, or None
+                if its file is not up to date, since the tensor was
+                assigned and is still in the window.
+        """
+        i = self._index(i)
+        if self._dtypes[i] is None or i in self._dirty:
+            return None
+        return np.load(self._path(i), mmap_mode='r')
+
+    def flush(self):
+        """Write the assigned tensors of the window to their files."""
+        _save_dirty(self.folder, self._cache, self._dirty)
+
+    @property
+    def dtype(self):
+        """Common dtype of the tensors."""
+        return np.result_type(*self._dtypes)
+
+    @property
+    def nbytes(self):
+        """Size in bytes of the tensors in memory."""
+        return sum(T.nbytes for T in self._cache.values())
+
+    def tolist(self):
+        """Return the tensors as a list, loading all of them."""
+        return list(self)
+
+
+def like(tensors):
+    """Container for new tensors of the same kind as the given ones.
+
+    Args:
+        tensors (list of ndarrays or storage object): tensors.
+
+    Returns:
+        (list or DiskTensors): empty 'DiskTensors' with the window of
+            'tensors', if it is one, and otherwise a list of None.
+    """
+    if isinstance(tensors, DiskTensors):
+        return tensors.empty_like()
+    return [None]*len(tensors)
+
+
+def result_type(tensors):
+    """Common dtype of the tensors, without loading 'DiskTensors'."""
+    if isinstance(tensors, (DiskTensors, PackedTensors)):
+        return tensors.dtype
+    return np.result_type(*tensors)
+
+
+def site_slots(tensors):
+    """Label the tensors of each site so that repeated objects match.
+
+    Args:
+        tensors (list of ndarrays or SharedTensors): tensors of an MPS.
+
+    Returns:
+        (ndarray): an integer for each site, equal for sites that hold
+            the same tensor object.
+    """
+    if isinstance(tensors, SharedTensors):
+        return tensors.slots
+    if isinstance(tensors, DiskTensors):
+        # The tensors are read from disk, so their ids are meaningless.
+        return np.arange(len(tensors))
+    return np.array([id(T) for T in tensors], dtype=np.int64)
+
+
+def packed_offsets(shapes):
+    """Offsets of tensors stored one after the other in a 1D buffer.
+
+    Args:
+        shapes (list of tuples): shapes of the tensors.
+
+    Returns:
+        (ndarray): len(shapes)+1 offsets, the tensor k being stored in
+            the buffer between offsets[k] and offsets[k+1].
+    """
+    if len(shapes) == 0:
+        return np.zeros(1, dtype=np.int64)
+    sizes = np.prod(np.reshape(np.array(shapes, dtype=np.int64),
+                               (len(shapes), -1)), axis=1)
+    return np.concatenate(([0], np.cumsum(sizes)))
+
+
+def _save_dirty(folder, cache, dirty):
+    """Write the assigned tensors of the window of a 'DiskTensors'."""
+    for i in sorted(dirty):
+        np.save(_site_path(folder, i), cache[i])
+    dirty.clear()
+
+
+def _site_path(folder, i):
+    """Path of the file of the tensor of site i."""
+    return os.path.join(folder, '{}.npy'.format(i))
+
+
+def _read_only(T):
+    """Return a read-only view of a tensor."""
+    T = np.asarray(T).view()
+    T.flags.writeable = False
+    return T
@@ -0,0 +1,162 @@
+"""Pipelined sweeps over the sites of an MPS.
+
+A sweep runs a step per site, e.g. the update of an environment, and
+each step needs the previous one, so the steps run in order. The work
+around them does not: the tensors of the next sites can be read from
+disk before they are needed, a finished site can be measured while the
+next one is contracted, and a checkpoint can be written while the sweep
+goes on. A 'SweepExecutor' runs the steps in the calling thread and
+this work in a pool of threads. NumPy, BLAS and file I/O release the
+GIL, so the threads run concurrently with the contraction.
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from mpys.storage import DiskTensors
+
+SweepResult = namedtuple('SweepResult', ['steps', 'measurements'])
+
+# Bytes between the entries read by 'touch'.
+PAGE_SIZE = 4096
+
+
+class SweepExecutor(object):
+    """Executor of sweeps that overlaps the steps with the work around.
+
+    Usage:
+        with SweepExecutor() as executor:
+            result = executor.sweep(range(L), step, load=load,
+                                    measure=measure)
+
+    """
+
+    def __init__(self, workers=2, prefetch=2):
+        """Initialize the threads of the executor.
+
+        Args:
+            workers (int, opt): number of threads of the loads and
+                the measurements.
+            prefetch (int, opt): number of sites that are loaded ahead
+                of the current one.
+        """
+        self.prefetch = prefetch
+        self._pool = ThreadPoolExecutor(workers)
+        # Checkpoints are written one at a time, in order.
+        self._writer = ThreadPoolExecutor(1)
+
+    def sweep(self, sites, step, load=None, measure=None, checkpoint=None,
+              every=1):
+        """Run a sweep.
+
+        For each site i, in order, the executor calls step(i), or
+        step(i, load(i)) if load is given. Meanwhile, the threads run
+        load for the next sites, measure(i) for the sites whose step
+        has finished, and checkpoint(i) after every 'every' steps.
+        A new checkpoint waits for the previous one, so they do not
+        pile up if writing is slower than the sweep.
+
+        The functions of the threads must only read what the finished
+        steps wrote, since they run while the next steps change the
+        state.
+
+        Args:
+            sites (iterable of ints): sites of the sweep, in order.
+            step (callable): step of a site.
+            load (callable, opt): function that reads the data of a
+                site that the step needs, e.g. its tensors.
+            measure (callable, opt): measurement of a finished site.
+            checkpoint (callable, opt): function that saves the state
+                after the step of a site.
+            every (int, opt): number of steps between checkpoints.
+
+        Returns:
+            (SweepResult): results of the steps and of the measurements,
+                in the order of the sites.
+
+        Raises:
+            The first exception raised by a step or by a function of the
+            threads, once the pending work has finished.
+        """
+        sites = list(sites)
+        loads = deque()
+        measurements = []
+        steps = []
+        saved = None
+        try:
+            for k, i in enumerate(sites):
+                if load is not None:
+                    # Keep the next 'prefetch' sites loading.
+                    while len(loads) < min(self.prefetch + 1,
+                                           len(sites) - k):
+                        loads.append(self._pool.submit(
+                            load, sites[k + len(loads)]))
+                    steps.append(step(i, loads.popleft().result()))
+                else:
+                    steps.append(step(i))
+                if measure is not None:
+                    measurements.append(self._pool.submit(measure, i))
+                if checkpoint is not None and (k + 1) % every == 0:
+                    if saved is not None:
+                        saved.result()
+                    saved = self._writer.submit(checkpoint, i)
+        finally:
+            # Wait for the pending work even if a step failed.
+            for future in list(loads) + measurements + [saved]:
+                if future is not None:
+                    future.exception()
+        if saved is not None:
+            saved.result()
+        return SweepResult(steps, [m.result() for m in measurements])
+
+    def close(self):
+        """Shut down the threads."""
+        self._pool.shutdown()
+        self._writer.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def touch(T):
+    """Read one entry of each page of a tensor.
+
+    The pages of a memory mapped tensor that are not in memory are read
+    from disk when they are first touched. Calling this function in a
+    thread of a 'SweepExecutor' reads them before the step needs them.
+
+    Args:
+        T (ndarray): tensor, e.g. a view of a 'np.memmap'.
+
+    Returns:
+        (ndarray): T.
+    """
+    flat = np.reshape(T, -1)
+    np.sum(flat[::max(PAGE_SIZE//flat.itemsize, 1)])
+    return T
+
+
+def prefetch(tensors, i):
+    """Read the tensor of site i from disk before a step needs it.
+
+    The tensors mapped from a file, as those of 'load_mps', are
+    touched. The files of 'DiskTensors' are mapped and touched, which
+    leaves them in the page cache of the system without changing the
+    window, so that the step reads them from memory. Both are safe in
+    a thread of a 'SweepExecutor'.
+
+    Args:
+        tensors (list of ndarrays or storage object): tensors of an MPS.
+        i (int): site.
+    """
+    if isinstance(tensors, DiskTensors):
+        T = tensors.map_file(i)
+    else:
+        T = tensors[i]
+    if isinstance(T, np.memmap):
+        touch(T)
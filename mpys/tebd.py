@@ -0,0 +1,267 @@
+"""Time evolution of MPS with the time evolving block decimation (TEBD).
+
+The evolution operator exp(-i H dt) of a nearest-neighbour Hamiltonian
+H = sum_i h(i, i+1) is split with a Trotter decomposition into a layer
+of two-site gates on the even bonds (0, 1), (2, 3), ... and a layer on
+the odd bonds (1, 2), (3, 4), ... The gates of a layer act on different
+sites, so they are independent: the bonds whose tensors have the same
+shapes are updated together with stacked matrix products and a single
+batched SVD, and the batches can run in a pool of threads.
+
+The state is stored in the form of Hastings [Phys. Rev. B 79, 115123
+(2009)], with right canonical tensors B and the Schmidt values S at
+each bond. The gates are applied to B(i) B(i+1) and the Schmidt values
+of the left bond only enter the SVD, so no Schmidt value is ever
+inverted.
+"""
+
+import collections
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy.linalg import expm, svd
+
+from mpys.backend import einsum
+from mpys.linalg import conj, svd_truncate
+from mpys.mps import Mps
+
+TebdInfo = collections.namedtuple('TebdInfo', ['errors', 'times'])
+
+
+def bond_hamiltonians(L, d, terms, onsite=None):
+    """Two-site terms h(i, i+1) of a nearest-neighbour Hamiltonian.
+
+    The Hamiltonian is sum_i sum_k O_k(i) P_k(i+1) + sum_i h(i), as in
+    'mpo.nearest_neighbour_fsa'. The onsite term of each site is split
+    between its two bonds.
+
+    Args:
+        L (int): length of the chain.
+        d (int): physical dimension.
+        terms (list of tuples): pairs of operators (O_k, P_k).
+        onsite (ndarray, opt): onsite term h.
+
+    Returns:
+        (list of ndarrays): the L-1 matrices h(i, i+1), with shape
+            (d**2, d**2).
+    """
+    if L < 2:
+        raise ValueError('TEBD needs at least two sites.')
+    interaction = sum(np.kron(O, P) for O, P in terms)
+    bonds = []
+    for i in range(L-1):
+        h = np.array(interaction, dtype=np.result_type(interaction, float))
+        if onsite is not None:
+            left = 1. if i == 0 else 0.5
+            right = 1. if i == L-2 else 0.5
+            h = (h + left*np.kron(onsite, np.eye(d))
+                 + right*np.kron(np.eye(d), onsite))
+        bonds.append(h)
+    return bonds
+
+
+def tebd(psi, bonds, dt, steps, D, imaginary=False, order=2,
+         workers=None):
+    """Evolve an Mps in real or imaginary time with TEBD.
+
+    Each step applies the gates of the even bonds and of the odd bonds,
+    truncating the bond dimension to D after each gate. The state is
+    replaced by the evolved state, normalized.
+
+    Args:
+        psi (Mps): initial state, which is replaced by the evolved
+            state.
+        bonds (list of ndarrays): two-site terms h(i, i+1) of the
+            Hamiltonian, see 'bond_hamiltonians'.
+        dt (float): time step.
+        steps (int): number of time steps.
+        D (int): maximum bond dimension.
+        imaginary (bool, opt): if True, evolve with exp(-H dt), which
+            projects onto the ground state.
+        order (int, opt): order of the Trotter decomposition, 1 or 2.
+        workers (int, opt): number of threads that update the bonds of
+            a layer. By default the bonds are updated in the calling
+            thread.
+
+    Returns:
+        (TebdInfo): named tuple with the truncation error, i.e., the
+            sum of the relative discarded weights of all the gates, and
+            the wall time in seconds of each step.
+    """
+    L = psi.L
+    if len(bonds) != L-1:
+        raise ValueError('There must be a two-site term for each bond.')
+    if order == 1:
+        layers = [(0, 1.), (1, 1.)]
+    elif order == 2:
+        layers = [(0, 0.5), (1, 1.), (0, 0.5)]
+    else:
+        raise ValueError('The Trotter decomposition must be of order '
+                         + '1 or 2.')
+    gates = {f: _gates(bonds, f*dt, imaginary)
+             for f in set(f for _, f in layers)}
+    B, S = _schmidt_form(psi)
+
+    errors = []
+    times = []
+    pool = ThreadPoolExecutor(workers) if workers else None
+    try:
+        for _ in range(steps):
+            start = time.perf_counter()
+            error = 0.
+            for parity, f in layers:
+                error += _apply_layer(B, S, gates[f],
+                                      range(parity, L-1, 2), D, pool,
+                                      workers or 1)
+            errors.append(error)
+            times.append(time.perf_counter() - start)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    phi = Mps.from_tensors(B)
+    # Take the state of phi, whose left canonical form is not computed
+    # yet.
+    psi._replace(phi)
+    return TebdInfo(errors, times)
+
+
+def _gates(bonds, tau, imaginary):
+    """Two-site gates exp(-i h tau), or exp(-h tau), of each bond.
+
+    The gates are computed once for the bonds that share their matrix.
+    """
+    done = {}
+    gates = []
+    for h in bonds:
+        if id(h) not in done:
+            done[id(h)] = expm(-tau*h if imaginary else -1j*tau*h)
+        gates.append(done[id(h)])
+    return gates
+
+
+def _schmidt_form(psi):
+    """Right canonical tensors and Schmidt values of a normalized Mps.
+
+    Args:
+        psi (Mps): state.
+
+    Returns:
+        B (list of ndarrays): right canonical tensors.
+        S (list of ndarrays): Schmidt values of each bond, the bond i
+            being the one at the left of site i.
+    """
+    A = psi.A
+    L = psi.L
+    B = [None]*L
+    S = [None]*(L+1)
+    S[0] = np.ones(1)
+    S[L] = np.ones(1)
+    C = A[-1]
+    for i in reversed(range(1, L)):
+        shape = np.shape(C)
+        M = np.reshape(C, (shape[0], shape[1]*shape[2]))
+        U, s, Vh, _ = svd_truncate(M, min(np.shape(M)))
+        B[i] = np.reshape(Vh, (len(s), shape[1], shape[2]))
+        S[i] = s/np.linalg.norm(s)
+        C = einsum('isj,jk->isk', A[i-1], U*s)
+    B[0] = C/np.linalg.norm(C)
+    return B, S
+
+
+def _apply_layer(B, S, gates, sites, D, pool=None, workers=1):
+    """Apply the gates of a layer of non-overlapping bonds.
+
+    The bonds are grouped by the shapes of their tensors, and each group
+    is split in at most 'workers' batches.
+
+    Args:
+        B (list of ndarrays): right canonical tensors, updated in place.
+        S (list of ndarrays): Schmidt values, updated in place.
+        gates (list of ndarrays): gate of each bond.
+        sites (iterable of ints): left site of each bond of the layer.
+        D (int): maximum bond dimension.
+        pool (ThreadPoolExecutor, opt): pool that updates the batches.
+        workers (int, opt): number of threads of the pool.
+
+    Returns:
+        (float): sum of the relative discarded weights of the gates.
+    """
+    groups = {}
+    for i in sites:
+        groups.setdefault((np.shape(B[i]), np.shape(B[i+1])), []).append(i)
+    batches = []
+    for group in groups.values():
+        size = -(-len(group)//workers)
+        batches += [group[k:k+size] for k in range(0, len(group), size)]
+
+    def update(batch):
+        return _update_bonds([B[i] for i in batch], [B[i+1] for i in batch],
+                             [S[i] for i in batch], [gates[i] for i in batch],
+                             D)
+
+    if pool is None:
+        results = [update(batch) for batch in batches]
+    else:
+        results = list(pool.map(update, batches))
+    discarded = 0.
+    for batch, (left, schmidt, right, eps) in zip(batches, results):
+        for k, i in enumerate(batch):
+            B[i] = left[k]
+            S[i+1] = schmidt[k]
+            B[i+1] = right[k]
+        discarded += eps
+    return discarded
+
+
+def _update_bonds(left, right, schmidt, gates, D):
+    """Apply two-site gates to a batch of bonds with same shapes.
+
+    With phi = G B(i) B(i+1) and the SVD S(i) phi = X Y Z, the new
+    tensors are B(i+1) = Z and B(i) = phi Z^dagger, and Y are the new
+    Schmidt values.
+
+    Args:
+        left (list of ndarrays): tensors B(i) of each bond.
+        right (list of ndarrays): tensors B(i+1) of each bond.
+        schmidt (list of ndarrays): Schmidt values S(i) of each bond.
+        gates (list of ndarrays): gates of each bond.
+        D (int): maximum bond dimension.
+
+    Returns:
+        (list of ndarrays, list of ndarrays, list of ndarrays, float):
+            new tensors B(i), Schmidt values S(i+1) and tensors B(i+1)
+            of each bond, and sum of the relative discarded weights.
+    """
+    n = len(left)
+    Dl, d, Dm = np.shape(left[0])
+    Dr = np.shape(right[0])[2]
+    phi = np.matmul(np.reshape(left, (n, Dl*d, Dm)),
+                    np.reshape(right, (n, Dm, d*Dr)))
+    phi = np.matmul(np.stack(gates)[:, None],
+                    np.reshape(phi, (n, Dl, d*d, Dr)))
+    theta = np.reshape(np.stack(schmidt)[:, :, None, None]*phi,
+                       (n, Dl*d, d*Dr))
+    Y, Z = _batched_svd(theta)
+    k = min(D, np.shape(Y)[1])
+    norm2 = np.sum(Y**2, axis=1)
+    discarded = np.sum(Y[:, k:]**2, axis=1)/norm2
+    norm = np.sqrt(norm2 - np.sum(Y[:, k:]**2, axis=1))
+    Y = Y[:, :k]/norm[:, None]
+    Z = Z[:, :k, :]
+    new_left = np.matmul(np.reshape(phi, (n, Dl*d, d*Dr)),
+                         np.swapaxes(conj(Z), 1, 2))/norm[:, None, None]
+    return (list(np.reshape(new_left, (n, Dl, d, k))), list(Y),
+            list(np.reshape(Z, (n, k, d, Dr))), float(np.sum(discarded)))
+
+
+def _batched_svd(M):
+    """Singular values and right singular vectors of stacked matrices."""
+    try:
+        _, S, Vh = np.linalg.svd(M, full_matrices=False)
+    except np.linalg.LinAlgError:
+        # The default driver may not converge.
+        S, Vh = zip(*(svd(m, full_matrices=False,
+                          lapack_driver='gesvd')[1:] for m in M))
+        S, Vh = np.stack(S), np.stack(Vh)
+    return S, Vh
@@ -0,0 +1,121 @@
+"""Uniform MPS class, for translation invariant states in the
+thermodynamic limit."""
+
+import numpy as np
+from scipy.sparse.linalg import LinearOperator
+
+from mpys.backend import eigs, einsum
+from mpys.mps import Mps
+
+
+class UMps(object):
+    """Class for uniform matrix product states (uMPS).
+
+    A uMPS is defined by a single bulk tensor M repeated at every site
+    of an infinite chain. Its properties follow from the dominant
+    eigenvalues of the transfer matrix, so their cost does not depend
+    on the length of the chain.
+
+    Attributes:
+        d (int): physical dimension.
+        D (int): bond dimension.
+        M (ndarray): bulk tensor with indices M[i, s, j].
+
+    """
+
+    def __init__(self, name=None, M=None):
+        """Initialize a uMPS object.
+
+        Args:
+            name (str, opt): name of the state that we initialize. It
+                can be one of the translation invariant states of 'Mps':
+                'GHZ', 'AKLT' and 'mixed'.
+            M (ndarray, opt): bulk tensor, if no name is given.
+        """
+        if M is not None:
+            self.M = np.asarray(M)
+        elif name in ('GHZ', 'AKLT', 'mixed'):
+            # The bulk tensor of the finite state.
+            self.M = Mps(3, name).A[1]
+        else:
+            raise NameError('The name of the state was not found.')
+        self.D, self.d, _ = np.shape(self.M)
+
+    def transfer_operator(self, other=None):
+        """Transfer matrix <self|other> acting on left fixed points.
+
+        Args:
+            other (UMps, opt): ket state. By default, the state itself.
+
+        Returns:
+            (LinearOperator): map L -> sum_s conj(M_s)^T L N_s, with L
+                flattened into a vector.
+        """
+        if other is None:
+            other = self
+        if self.d != other.d:
+            raise ValueError('The input uMPS do not have matching '
+                             + 'dimension.')
+        M = np.conj(self.M)
+        N = other.M
+        shape = (self.D, other.D)
+
+        def matvec(v):
+            L = np.reshape(v, shape)
+            L = einsum('mn,mli,nlj->ij', L, M, N)
+            return np.ravel(L)
+
+        n = self.D*other.D
+        dtype = np.result_type(M, N)
+        return LinearOperator((n, n), matvec=matvec, dtype=dtype)
+
+    def dominant_eigenvalues(self, other=None, k=2):
+        """Eigenvalues of largest magnitude of the transfer matrix.
+
+        Args:
+            other (UMps, opt): ket state. By default, the state itself.
+            k (int, opt): number of eigenvalues.
+
+        Returns:
+            (ndarray): the k eigenvalues sorted by decreasing magnitude.
+                If the transfer matrix has less than k eigenvalues, all
+                of them.
+        """
+        T = self.transfer_operator(other)
+        vals = eigs(T, k=k, which='LM', return_eigenvectors=False)
+        return vals[np.argsort(-np.abs(vals))][:k]
+
+    def norm(self):
+        """Compute the norm per site of the state."""
+        return abs(self.dominant_eigenvalues(k=1)[0])
+
+    def normalize(self):
+        """Rescale the bulk tensor so that the norm per site is 1."""
+        self.M = self.M/np.sqrt(self.norm())
+
+    def overlap(self, other):
+        """Compute the overlap per site |<self|other>|**(1/L) for L->inf.
+
+        Args:
+            other (UMps): ket state.
+
+        Returns:
+            (float): overlap per site of the normalized states.
+        """
+        lam = abs(self.dominant_eigenvalues(other, k=1)[0])
+        return lam/np.sqrt(self.norm()*other.norm())
+
+    def correlation_length(self):
+        """Compute the correlation length from the transfer matrix.
+
+        Returns:
+            (float): -1/log|lambda_2/lambda_1|, which is infinite if
+                the dominant eigenvalue is degenerate and 0 for product
+                states.
+        """
+        vals = np.abs(self.dominant_eigenvalues(k=2))
+        if len(vals) < 2 or vals[1] == 0:
+            return 0.
+        if np.isclose(vals[0], vals[1]):
+            return np.inf
+        return -1/np.log(vals[1]/vals[0])
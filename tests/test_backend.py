@@ -0,0 +1,158 @@
+"""Tests for the backends of the numerical primitives."""
+
+import os
+import sys
+import unittest
+from unittest import mock
+import numpy as np
+
+sys.path.append('..')
+from mpys import backend
+from mpys.backend import (BLAS_VARIABLES, Backend, blas_threads, get_backend,
+                          use_backend)
+from mpys.dmrg import dmrg
+from mpys.mpo import Mpo
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+from mpys.umps import UMps
+
+
+class BackendTestCase(unittest.TestCase):
+    """Test the primitives of the backend for each size of tensors."""
+
+    def test_einsum(self):
+        """Test the contractions of tiny and large tensors."""
+        B = Backend()
+        for D in [2, 20]:
+            L = np.random.rand(D, D)
+            A = np.random.rand(D, 3, D)
+            self.assertTrue(np.allclose(B.einsum('mn,msi,nsj->ij', L, A, A),
+                                        np.einsum('mn,msi,nsj->ij', L, A, A)))
+        self.assertEqual(B.calls(), (1, 1))
+
+    def test_einsum_without_c_einsum(self):
+        """Test the fast path when NumPy has no private 'c_einsum'."""
+        modules = {'numpy._core.multiarray': None,
+                   'numpy.core.multiarray': None}
+        with mock.patch.dict(sys.modules, modules):
+            c_einsum = backend._load_c_einsum()
+        self.assertIs(c_einsum, np.einsum)
+        L = np.random.rand(2, 2)
+        A = np.random.rand(2, 3, 2)
+        with mock.patch.object(backend, 'c_einsum', c_einsum):
+            B = Backend()
+            self.assertTrue(np.allclose(B.einsum('mn,msi,nsj->ij', L, A, A),
+                                        np.einsum('mn,msi,nsj->ij', L, A, A)))
+        self.assertEqual(B.calls(), (1, 0))
+
+    def test_decompositions(self):
+        """Test QR, RQ, SVD and eigh of small and large matrices."""
+        B = Backend()
+        for m, n in [(6, 3), (3, 6), (60, 30), (30, 60)]:
+            M = np.random.rand(m, n) + 1j*np.random.rand(m, n)
+            k = min(m, n)
+            Q, R = B.qr(M)
+            self.assertEqual(Q.shape, (m, k))
+            self.assertTrue(np.allclose(Q @ R, M))
+            self.assertTrue(np.allclose(Q.conj().T @ Q, np.eye(k)))
+            R, Q = B.rq(M)
+            self.assertEqual(Q.shape, (k, n))
+            self.assertTrue(np.allclose(R @ Q, M))
+            self.assertTrue(np.allclose(Q @ Q.conj().T, np.eye(k)))
+            # R is upper triangular from its bottom right corner.
+            self.assertTrue(np.allclose(np.tril(R, k-m-1), 0))
+            U, S, Vh = B.svd(M)
+            self.assertTrue(np.allclose((U*S) @ Vh, M))
+            H = M @ M.conj().T
+            vals, vecs = B.eigh(H)
+            self.assertTrue(np.all(np.diff(vals) >= -1e-10))
+            self.assertTrue(np.allclose(H @ vecs, vecs*vals))
+
+    def test_eigensolvers(self):
+        """Test the iterative eigensolvers and their dense path."""
+        B = Backend()
+        rng = np.random.default_rng(1)
+        M = rng.random((40, 40))
+        H = M + M.T
+        vals, vecs = B.eigsh(H, k=2, which='SA')
+        self.assertTrue(np.allclose(vals, np.linalg.eigvalsh(H)[:2]))
+        self.assertTrue(np.allclose(H @ vecs, vecs*vals))
+        exact = np.linalg.eigvals(M)
+        exact = exact[np.argsort(-np.abs(exact))]
+        for n in [3, 40]:
+            vals, vecs = B.eigs(M[:n, :n], k=2)
+            self.assertTrue(np.allclose(M[:n, :n] @ vecs, vecs*vals))
+        vals = B.eigs(M, k=2, return_eigenvectors=False)
+        self.assertTrue(np.allclose(sorted(np.abs(vals)),
+                                    sorted(np.abs(exact[:2]))))
+
+    def test_eigensolvers_of_the_library(self):
+        """Test that DMRG and uniform states use the current backend."""
+        B = _CountingBackend()
+        with use_backend(B):
+            dmrg(Mpo(10, 'Heisenberg'), Mps(10, 'random'), D=8, sweeps=1)
+            self.assertAlmostEqual(UMps('AKLT').norm(), 1)
+        self.assertGreater(B.eigen_calls['eigsh'], 0)
+        self.assertGreater(B.eigen_calls['eigs'], 0)
+
+    def test_current_backend(self):
+        """Test that the library uses the current backend."""
+        default = get_backend()
+        psi = Mps(6, 'AKLT')
+        with use_backend(Backend(small_tensor=0)) as B:
+            self.assertIs(get_backend(), B)
+            self.assertAlmostEqual(contract(psi, psi), 1)
+            self.assertAlmostEqual(Mps.random(8, 6).norm(), 1)
+            self.assertGreater(B.calls().large, 0)
+            self.assertEqual(B.calls().small, 0)
+        self.assertIs(get_backend(), default)
+        with self.assertRaises(NameError):
+            Backend('tensorflow')
+        if backend.opt_einsum is None:
+            with self.assertRaises(ImportError):
+                Backend('opt_einsum')
+
+
+class BlasThreadsTestCase(unittest.TestCase):
+    """Test the limits of the BLAS threads."""
+
+    def test_environment_is_restored(self):
+        """Test that the environment variables are restored."""
+        old = {var: os.environ.get(var) for var in BLAS_VARIABLES}
+        with blas_threads(3):
+            for var in BLAS_VARIABLES:
+                self.assertEqual(os.environ[var], '3')
+        self.assertEqual(old, {var: os.environ.get(var)
+                               for var in BLAS_VARIABLES})
+
+    def test_backend_environment_is_restored(self):
+        """Test that 'use_backend' restores the environment variables."""
+        old = {var: os.environ.get(var) for var in BLAS_VARIABLES}
+        with use_backend(Backend(threads=2)):
+            with use_backend(Backend(threads=3)):
+                for var in BLAS_VARIABLES:
+                    self.assertEqual(os.environ[var], '3')
+            for var in BLAS_VARIABLES:
+                self.assertEqual(os.environ[var], '2')
+        self.assertEqual(old, {var: os.environ.get(var)
+                               for var in BLAS_VARIABLES})
+
+
+class _CountingBackend(Backend):
+    """Backend that counts the calls of its eigensolvers."""
+
+    def __init__(self):
+        Backend.__init__(self)
+        self.eigen_calls = {'eigsh': 0, 'eigs': 0}
+
+    def eigsh(self, A, k=1, **kwargs):
+        self.eigen_calls['eigsh'] += 1
+        return Backend.eigsh(self, A, k, **kwargs)
+
+    def eigs(self, A, k=1, **kwargs):
+        self.eigen_calls['eigs'] += 1
+        return Backend.eigs(self, A, k, **kwargs)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Tests for the MPS with conserved charges."""
+
+import copy
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.block_mps import BlockMps
+from mpys.dmrg import dmrg
+from mpys.mpo import Mpo
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+class BlockMpsCreationTestCase(unittest.TestCase):
+    """Test the creation of BlockMps from dense states."""
+
+    def test_named_states(self):
+        """Test the states of 'Mps' that conserve a charge."""
+        for name, L, symmetry in [('pairs', 8, 'U1'), ('pairs', 8, 'Z2'),
+                                  ('GHZ', 6, 'Z2')]:
+            psi = Mps(L, name)
+            phi = BlockMps(psi, symmetry)
+            self.assertEqual(phi.D, psi.D)
+            self.assertAlmostEqual(contract(phi, phi), 1)
+            self.assertAlmostEqual(contract(phi.to_mps(), psi), 1)
+            self.assertTrue(sum(T.nbytes for T in phi.A)
+                            < sum(np.asarray(A).nbytes for A in psi.A))
+
+    def test_exceptions(self):
+        """Test states that do not conserve the charge."""
+        with self.assertRaises(ValueError):
+            BlockMps(Mps(7, 'GHZ'), 'Z2')
+        with self.assertRaises(ValueError):
+            BlockMps(Mps(6, 'mixed'), 'U1')
+        with self.assertRaises(NameError):
+            BlockMps(Mps(6, 'pairs'), 'SU2')
+
+    def test_overlaps(self):
+        """Test the block contraction against the dense one."""
+        psi = BlockMps(Mps(8, 'pairs'), 'Z2')
+        phi = BlockMps(Mps(8, 'GHZ'), 'Z2')
+        self.assertAlmostEqual(contract(psi, phi), 0)
+        chi = BlockMps(Mps(8, 'GHZ', dtype=np.complex128), 'Z2')
+        self.assertAlmostEqual(contract(phi, chi), 1)
+
+
+class BlockMpsGroundStateTestCase(unittest.TestCase):
+    """Test a ground state with degenerate singular values."""
+
+    def setUp(self):
+        """Find the ground state of the Heisenberg chain."""
+        self.psi = Mps(10, 'random')
+        dmrg(Mpo(10, 'Heisenberg'), self.psi, D=16, sweeps=4)
+
+    def test_conversion(self):
+        """Test the conversion of a state whose bonds mix charges."""
+        for symmetry in ['U1', 'Z2']:
+            phi = BlockMps(self.psi, symmetry, tol=1e-7)
+            self.assertAlmostEqual(abs(contract(phi.to_mps(), self.psi)), 1)
+        # The magnetization splits the bonds in several sectors.
+        phi = BlockMps(self.psi, 'U1', tol=1e-7)
+        self.assertTrue(sum(T.nbytes for T in phi.A)
+                        < sum(np.asarray(A).nbytes for A in self.psi.A)/2)
+
+    def test_truncation(self):
+        """Test that the truncation by sectors matches the dense one."""
+        phi = BlockMps(self.psi, 'U1', tol=1e-7)
+        psi = copy.deepcopy(self.psi)
+        self.assertEqual(phi.truncate_D(20), 0)
+        # Without degenerate singular values at the cut, which make the
+        # truncation ambiguous.
+        self.assertAlmostEqual(phi.truncate_D(8), psi.truncate_D(8))
+        self.assertEqual(phi.D, 8)
+        self.assertAlmostEqual(phi.norm(), 1)
+        self.assertAlmostEqual(abs(contract(phi.to_mps(), self.psi)),
+                               abs(contract(psi, self.psi)))
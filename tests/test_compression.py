@@ -0,0 +1,105 @@
+"""Tests for the sums of MPS and their compression."""
+
+import copy
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.compression import compress, direct_sum, linear_combination
+from mpys.mps import Mps
+from mpys.mps_io import load_mps, save_mps
+from mpys.mps_ops import contract
+from mpys.storage import DiskTensors
+from mpys.sweep import SweepExecutor
+
+
+class LinearCombinationTestCase(unittest.TestCase):
+    """Test the linear combinations of MPS."""
+
+    def test_linear_combination(self):
+        """Test the overlaps of a linear combination."""
+        psis = [Mps(8, 'random'), Mps(8, 'GHZ'), Mps(8, 'mixed')]
+        c = [0.5, -1., 2j]
+        phi = linear_combination(psis, c)
+        self.assertEqual(phi.D, 5)
+        for psi in psis + [Mps(8, 'pairs')]:
+            self.assertAlmostEqual(contract(psi, phi),
+                                   sum(ck*contract(psi, psik)
+                                       for ck, psik in zip(c, psis)))
+        self.assertEqual(len(direct_sum([Mps(1, 'GHZ')]*2)), 1)
+        with self.assertRaises(ValueError):
+            direct_sum([Mps(8, 'GHZ'), Mps(7, 'GHZ')])
+
+    def test_exact_compression(self):
+        """Test that a fit with enough bond dimension is exact."""
+        psis = [Mps(10, 'random', d=3), Mps(10, 'AKLT'),
+                Mps(10, 'random', d=3)]
+        phi = linear_combination(psis, [1., 2., 3.])
+        chi = linear_combination(psis, [1., 2., 3.], D=phi.D)
+        self.assertAlmostEqual(contract(phi, chi)/contract(phi, phi), 1)
+        self.assertAlmostEqual(contract(chi, chi)/contract(phi, phi), 1)
+
+
+class CompressionTestCase(unittest.TestCase):
+    """Test the variational compression."""
+
+    def test_compression_against_svd(self):
+        """Test that the fit is not worse than the SVD truncation."""
+        L = 20
+        tensors = direct_sum([Mps(L, 'random', d=3) for _ in range(6)])
+        psi = Mps.from_tensors(tensors)
+        svd = Mps.from_tensors(tensors, D=4)
+        phi, errors = compress(tensors, 4, x0=svd, normalize=True)
+        self.assertTrue(phi.D <= 4)
+        self.assertTrue(errors[-1] > 0)
+        # The sweeps start from the SVD truncation and only improve it.
+        self.assertTrue(abs(contract(psi, phi))
+                        >= abs(contract(psi, svd)) - 1e-12)
+        self.assertTrue(all(e2 <= e1 + 1e-12
+                            for e1, e2 in zip(errors, errors[1:])))
+        self.assertAlmostEqual(errors[-1], 1 - abs(contract(psi, phi))**2)
+        self.assertAlmostEqual(phi.norm(), 1)
+
+    def test_convergence_control(self):
+        """Test that the sweeps stop at the tolerance."""
+        tensors = direct_sum([Mps(12, 'random') for _ in range(3)])
+        _, errors = compress(tensors, 2, sweeps=3, tol=0)
+        self.assertEqual(len(errors), 3)
+        _, errors = compress(tensors, 6, sweeps=10, tol=1e-8)
+        self.assertTrue(len(errors) < 10)
+        self.assertAlmostEqual(errors[-1], 0)
+
+    def test_seed(self):
+        """Test that the seed makes the random initial guess
+        reproducible."""
+        tensors = direct_sum([Mps(10, 'random') for _ in range(2)])
+        phi, e1 = compress(tensors, 2, sweeps=2, tol=0, seed=7)
+        chi, e2 = compress(tensors, 2, sweeps=2, tol=0,
+                           seed=np.random.default_rng(7))
+        self.assertEqual(e1, e2)
+        self.assertTrue(all(np.array_equal(A, B)
+                            for A, B in zip(phi.A, chi.A)))
+
+    def test_states_on_disk(self):
+        """Test the sweeps of an executor that reads the state ahead."""
+        psi = Mps.random(16, 12, seed=2)
+        phi, errors = compress(psi, 4, seed=5)
+        on_disk = copy.deepcopy(psi)
+        on_disk.to_disk(window=3)
+        self.assertIsInstance(on_disk.A, DiskTensors)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'psi.mps')
+            save_mps(psi, path)
+            mapped = load_mps(path)
+            for chi in [on_disk, mapped]:
+                with SweepExecutor(prefetch=3) as executor:
+                    fit, fit_errors = compress(chi, 4, seed=5,
+                                               executor=executor)
+                self.assertTrue(np.allclose(fit_errors, errors))
+                self.assertAlmostEqual(abs(contract(fit, phi)),
+                                       phi.norm())
+            self.assertLessEqual(on_disk.A.nbytes, 3*12*2*12*8)
+            del mapped, chi
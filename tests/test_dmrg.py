@@ -0,0 +1,40 @@
+"""Tests for the DMRG algorithm."""
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.dmrg import dmrg
+from mpys.mpo import Mpo
+from mpys.mps import Mps
+from mpys.mps_ops import expectation
+
+
+class DMRGTestCase(unittest.TestCase):
+    """Test the ground states found by DMRG."""
+
+    def test_ground_state_energies(self):
+        """Test DMRG against the exact diagonalization of small chains."""
+        for H, d in [(Mpo(8, 'Heisenberg', h=0.1), 2),
+                     (Mpo(8, 'Ising', h=0.7), 2),
+                     (Mpo(6, 'AKLT'), 3)]:
+            psi = Mps(H.L, 'random', d=d)
+            energies = dmrg(H, psi, D=16)
+            E0 = np.linalg.eigvalsh(H.to_matrix())[0]
+            self.assertAlmostEqual(energies[-1], E0)
+            self.assertAlmostEqual(expectation(psi, H), E0)
+            self.assertAlmostEqual(psi.norm(), 1)
+
+    def test_truncated_ground_state(self):
+        """Test DMRG with a bond dimension smaller than the exact one."""
+        H = Mpo(20, 'Heisenberg')
+        psi = Mps(20, 'random')
+        energies = dmrg(H, psi, D=8, sweeps=4)
+        self.assertTrue(psi.D <= 8)
+        # Ground state energy of the open chain of 20 spins 1/2.
+        self.assertAlmostEqual(energies[-1], -8.6824733, places=3)
+        self.assertAlmostEqual(expectation(psi, H), energies[-1])
+        # The energy only increases by the small truncation errors.
+        self.assertTrue(all(E2 <= E1 + 1e-5
+                            for E1, E2 in zip(energies, energies[1:])))
@@ -0,0 +1,46 @@
+"""Tests for the environments of MPS contractions."""
+
+import sys
+import unittest
+from unittest import mock
+import numpy as np
+
+sys.path.append('..')
+from mpys import environment
+from mpys.environment import Environment
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+class EnvironmentTestCase(unittest.TestCase):
+    """Test the cached environments of two states."""
+
+    def test_overlap(self):
+        """Test that the overlap matches 'contract'."""
+        psi = Mps(7, 'GHZ')
+        phi = Mps(7, 'mixed')
+        env = Environment(psi, phi)
+        self.assertAlmostEqual(env.overlap(), contract(psi, phi))
+        self.assertAlmostEqual(np.trace(env.left(7)), contract(psi, phi))
+        self.assertAlmostEqual(np.trace(env.right(0)), contract(psi, phi))
+        with self.assertRaises(ValueError):
+            Environment(psi, Mps(6, 'mixed'))
+
+    def test_incremental_overlap(self):
+        """Test that the overlaps of a sweep contract O(1) sites."""
+        L = 12
+        psi = Mps(L, 'random')
+        phi = Mps(L, 'random')
+        phi.A = list(phi.A)
+        env = Environment(psi, phi)
+        env.overlap()
+        # Sweep to the right and back to the left.
+        for i in list(range(L)) + list(reversed(range(L))) + [0, 0]:
+            phi.A[i] = np.random.rand(*np.shape(phi.A[i]))
+            env.update(i)
+            with mock.patch.object(environment, 'grow_left',
+                                   wraps=environment.grow_left) as gl, \
+                    mock.patch.object(environment, 'grow_right',
+                                      wraps=environment.grow_right) as gr:
+                self.assertAlmostEqual(env.overlap(), contract(psi, phi))
+                self.assertTrue(gl.call_count + gr.call_count <= 2)
@@ -0,0 +1,116 @@
+"""Tests for the parallel evaluation of MPS jobs."""
+
+import os
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys import jobs
+from mpys.backend import BLAS_VARIABLES
+from mpys.jobs import JobRunner
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+class JobRunnerTestCase(unittest.TestCase):
+    """Test the jobs evaluated by a pool of processes."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.runner = JobRunner(workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.runner.close()
+
+    def test_contractions(self):
+        """Test contractions of shared states against the serial ones."""
+        states = [Mps(6, 'random', d=3) for _ in range(4)]
+        states.append(Mps(6, 'random', d=3, dtype=np.complex128))
+        pairs = [(psi, phi) for psi in states for phi in states]
+        results = self.runner.map(contract, *zip(*pairs), chunksize=4)
+        for (psi, phi), result in zip(pairs, results):
+            self.assertAlmostEqual(result, contract(psi, phi))
+        future = self.runner.submit(contract, states[0], phi=states[1])
+        self.assertAlmostEqual(future.result(), contract(*states[:2]))
+
+    def test_constructions(self):
+        """Test the states built by the workers."""
+        names = ['GHZ', 'AKLT', 'pairs', 'mixed']
+        states = self.runner.map(Mps, [8]*len(names), names)
+        for name, psi in zip(names, states):
+            self.assertEqual(psi.L, 8)
+            self.assertAlmostEqual(contract(psi, Mps(8, name)), 1)
+        norms = self.runner.map(Mps.norm, states)
+        self.assertTrue(np.allclose(norms, 1))
+
+    def test_read_only_states(self):
+        """Test that the workers cannot modify the shared states."""
+        psi = Mps(4, 'random')
+        future = self.runner.submit(_zero, psi)
+        with self.assertRaises(ValueError):
+            future.result()
+        self.assertAlmostEqual(psi.norm(), 1)
+
+    def test_states_are_sent_again(self):
+        """Test that a modified state reaches the later jobs."""
+        psi = Mps(5, 'GHZ')
+        self.assertAlmostEqual(self.runner.submit(Mps.norm, psi).result(), 1)
+        psi.A[0] = 2*psi.A[0]
+        self.assertAlmostEqual(self.runner.submit(Mps.norm, psi).result(), 4)
+        handle = self.runner.share(psi)
+        psi.A[0] = 3*psi.A[0]
+        self.assertAlmostEqual(self.runner.submit(Mps.norm, handle).result(),
+                               4)
+
+    def test_segments_are_detached(self):
+        """Test that the workers detach the segments of finished jobs."""
+        states = [Mps(5, 'GHZ') for _ in range(3)]*4
+        counts = self.runner.map(_attached_segments, states)
+        self.assertEqual(counts, [1]*len(states))
+
+    def test_blas_threads(self):
+        """Test that the workers start with their BLAS threads set."""
+        old = {var: os.environ.get(var) for var in BLAS_VARIABLES}
+        with JobRunner(workers=2, threads=3) as runner:
+            self.assertEqual(old, {var: os.environ.get(var)
+                                   for var in BLAS_VARIABLES})
+            futures = [runner.submit(_blas_threads) for _ in range(4)]
+            for future in futures:
+                environ, threads = future.result()
+                if environ is not None:
+                    self.assertEqual([environ.get(var.encode())
+                                      for var in BLAS_VARIABLES],
+                                     [b'3']*len(BLAS_VARIABLES))
+                self.assertTrue(all(n == 3 for n in threads))
+
+
+def _zero(psi):
+    """Try to modify a state in place."""
+    psi.A[0][...] = 0
+
+
+def _attached_segments(psi):
+    """Count the segments attached by a worker."""
+    return len(jobs._attached)
+
+
+def _blas_threads():
+    """Environment with which a worker started, if the system gives it,
+    and threads of its BLAS libraries, if 'threadpoolctl' is installed.
+    """
+    environ = None
+    if os.path.exists('/proc/self/environ'):
+        with open('/proc/self/environ', 'rb') as f:
+            environ = dict(item.split(b'=', 1)
+                           for item in f.read().split(b'\0') if b'=' in item)
+    threads = []
+    if jobs.threadpoolctl is not None:
+        threads = [info['num_threads']
+                   for info in jobs.threadpoolctl.threadpool_info()]
+    return environ, threads
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+"""Tests for the linear algebra routines."""
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.linalg import svd_truncate
+
+
+class SvdTruncateTestCase(unittest.TestCase):
+    """Test the truncated SVD."""
+
+    def test_exact_truncation(self):
+        """Test the discarded weight of the exact truncated SVD."""
+        M = np.random.rand(20, 30)
+        U, S, Vh, discarded = svd_truncate(M, 5)
+        self.assertEqual(np.shape(U), (20, 5))
+        self.assertEqual(np.shape(Vh), (5, 30))
+        S_all = np.linalg.svd(M, compute_uv=False)
+        self.assertTrue(np.allclose(S, S_all[:5]))
+        self.assertAlmostEqual(discarded, np.sum(S_all[5:]**2))
+
+    def test_randomized_truncation(self):
+        """Test the randomized SVD on a matrix of low rank."""
+        rng = np.random.default_rng(0)
+        M = rng.random((200, 4)) @ rng.random((4, 300))
+        U, S, Vh, discarded = svd_truncate(M, 4, randomized=True, rng=rng)
+        self.assertEqual(np.shape(U), (200, 4))
+        self.assertTrue(np.allclose((U*S) @ Vh, M))
+        self.assertTrue(np.allclose(U.T @ U, np.eye(4)))
+        self.assertAlmostEqual(discarded/np.linalg.norm(M)**2, 0)
@@ -0,0 +1,39 @@
+"""Tests for the linear forms."""
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.linear_form import LinearForm
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+class LinearFormTestCase(unittest.TestCase):
+    """Test the values and local vectors of linear forms."""
+
+    def test_value_and_vectors(self):
+        """Test that the local vectors give back the overlap."""
+        b = Mps(7, 'random', dtype=np.complex128)
+        x = Mps(7, 'random')
+        F = LinearForm(b, x)
+        self.assertAlmostEqual(F.value(), contract(x, b))
+        self.assertAlmostEqual(np.vdot(x.B[0], F.vector(0)), contract(x, b))
+        theta = np.einsum('isj,jtk->istk', x.B[0], x.B[1])
+        self.assertAlmostEqual(np.vdot(theta, F.vector(0, sites=2)),
+                               contract(x, b))
+        with self.assertRaises(ValueError):
+            F.vector(0, sites=3)
+
+    def test_updates(self):
+        """Test the local vectors after changing all the sites of x."""
+        b = Mps(8, 'random')
+        F = LinearForm(b, Mps(8, 'GHZ'))
+        for i in range(8):
+            F.update(i, b.A[i])
+        self.assertAlmostEqual(F.value(), 1)
+        # With x = b in left canonical form, the local vector of the
+        # last site is the tensor of b.
+        self.assertTrue(np.allclose(F.vector(7), b.A[7]))
+        self.assertAlmostEqual(np.vdot(b.A[3], F.vector(3)), 1)
@@ -0,0 +1,93 @@
+"""Tests for the MPO class."""
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.mpo import Mpo, spin_operators
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+
+
+def to_vector(tensors):
+    """Compute the dense vector of an MPS."""
+    v = np.ones((1, 1))
+    for M in tensors:
+        v = np.reshape(np.einsum('ai,isj->asj', v, M), (-1, np.shape(M)[2]))
+    return v[:, 0]
+
+
+class MPOCreationTestCase(unittest.TestCase):
+    """Tests for MPO creation routines."""
+
+    def test_creation_Ising(self):
+        """Test the creation of the Ising Hamiltonian."""
+        H = Mpo(3, 'Ising', J=2., h=0.5)
+        self.assertEqual(H.D, 3)
+        X = np.array([[0, 1], [1, 0]])
+        Z = np.diag([1, -1])
+        I = np.eye(2)
+        H_exact = (-2*(np.kron(np.kron(Z, Z), I) + np.kron(I, np.kron(Z, Z)))
+                   - 0.5*(np.kron(np.kron(X, I), I)
+                          + np.kron(np.kron(I, X), I)
+                          + np.kron(np.kron(I, I), X)))
+        self.assertTrue(np.allclose(H.to_matrix(), H_exact))
+
+    def test_creation_Heisenberg(self):
+        """Test the spectrum of the Heisenberg Hamiltonian."""
+        E = np.linalg.eigvalsh(Mpo(2, 'Heisenberg').to_matrix())
+        self.assertTrue(np.allclose(E, [-3/4, 1/4, 1/4, 1/4]))
+
+    def test_creation_AKLT(self):
+        """Test the ground states of the AKLT Hamiltonian."""
+        L = 5
+        E = np.linalg.eigvalsh(Mpo(L, 'AKLT').to_matrix())
+        # Four degenerate ground states with energy -2/3 per bond.
+        self.assertTrue(np.allclose(E[:4], -2/3*(L-1)))
+        self.assertTrue(E[4] > E[0] + 0.1)
+        Sz, Sp, Sm = spin_operators(3)
+        self.assertTrue(np.allclose(Sp @ Sm - Sm @ Sp, 2*Sz))
+
+    def test_creation_from_fsa(self):
+        """Test an MPO built from a finite state automaton."""
+        Sz, _, _ = spin_operators(2)
+        # Total magnetization.
+        M = Mpo.from_fsa(4, 2, 2, [(0, 0, np.eye(2)), (0, 1, Sz),
+                                   (1, 1, np.eye(2))])
+        self.assertTrue(np.allclose(np.diag(M.to_matrix())[[0, 15]],
+                                    [-2, 2]))
+
+
+class MPOApplicationTestCase(unittest.TestCase):
+    """Tests for the application of MPOs to MPS."""
+
+    def test_exact_application(self):
+        """Test the exact application of an MPO."""
+        for name, d in [('Heisenberg', 2), ('AKLT', 3)]:
+            H = Mpo(6, name)
+            psi = Mps(6, 'random', d=d)
+            phi = H.apply(psi)
+            v = H.to_matrix() @ to_vector(psi.A)
+            self.assertTrue(np.allclose(to_vector(phi.A), v))
+            self.assertTrue(np.allclose(to_vector(phi.B), v))
+            self.assertAlmostEqual(contract(psi, phi),
+                                   to_vector(psi.A) @ v)
+
+    def test_zipup_application(self):
+        """Test the application of an MPO with truncations."""
+        np.random.seed(1)
+        H = Mpo(10, 'Heisenberg', h=0.3)
+        psi = H.apply(Mps(10, 'random'), D=4)
+        v = H.to_matrix() @ to_vector(psi.A)
+        # Without truncation it is exact.
+        phi = H.apply(psi, method='zipup')
+        self.assertTrue(np.allclose(to_vector(phi.A), v))
+        # With truncation it is close to the exact truncated result.
+        phi = H.apply(psi, D=4, method='zipup', normalize=True)
+        chi = H.apply(psi, D=4, normalize=True)
+        self.assertEqual(phi.D, 4)
+        self.assertAlmostEqual(phi.norm(), 1)
+        self.assertTrue(abs(contract(chi, phi)) > 0.99)
+        with self.assertRaises(ValueError):
+            H.apply(psi, method='variational')
@@ -1,11 +1,14 @@
 """Tests for the MPS class."""
 
+import copy
 import sys
 import unittest
 import numpy as np
 
 sys.path.append('..')
+from mpys.environment import Environment
 from mpys.mps import Mps
+from mpys.mps_ops import contract
 
 
 def check_left_canonical(psi):
@@ -336,3 +339,183 @@ class MpsModificationBondDimension(unittest.TestCase):
         tmp[0, 0, 0] = 1
         tmp[1, 2, 0] = 1
         self.assertTrue(np.allclose(psi.B[6], tmp))
+
+    def test_truncation_of_enlarged_GHZ_state(self):
+        """Test that truncating an enlarged GHZ state recovers it."""
+        psi = Mps(7, 'GHZ')
+        psi.enlarge_D(5)
+        discarded = psi.truncate_D(2)
+        self.assertEqual(psi.D, 2)
+        self.assertAlmostEqual(discarded, 0)
+        for A in psi.A:
+            self.assertTrue(max(np.shape(A)) <= 2)
+        self.assertTrue(check_left_canonical(psi))
+        self.assertTrue(check_right_canonical(psi))
+        self.assertAlmostEqual(psi.norm(), 1)
+        self.assertAlmostEqual(abs(contract(psi, Mps(7, 'GHZ'))), 1)
+
+    def test_truncation_of_bond_dimension_in_random_state(self):
+        """Test the truncation of D in a random state."""
+        psi = Mps(8, 'random', d=3)
+        phi = copy.deepcopy(psi)
+        discarded = phi.truncate_D(1)
+        self.assertEqual(phi.D, 1)
+        self.assertTrue(0 < discarded < 1)
+        self.assertTrue(check_left_canonical(phi))
+        self.assertTrue(check_right_canonical(phi))
+        self.assertAlmostEqual(phi.norm(), 1)
+        self.assertTrue(contract(psi, phi)**2 >= 1 - 2*discarded)
+
+    def test_enlargement_modes(self):
+        """Test the contiguous and only-changed enlargement modes."""
+        psi = Mps(9, 'AKLT')
+        psi.enlarge_D(6)
+        for kwargs in [{'contiguous': True}, {'only_changed': True}]:
+            phi = Mps(9, 'AKLT')
+            A0 = phi.A[0]
+            phi.enlarge_D(6, **kwargs)
+            self.assertEqual(phi.D, 6)
+            for i in range(9):
+                self.assertTrue(np.array_equal(phi.A[i], psi.A[i]))
+                self.assertTrue(np.array_equal(phi.B[i], psi.B[i]))
+            self.assertAlmostEqual(phi.norm(), 1)
+            if kwargs.get('only_changed'):
+                # The shape of the tensor at site 0 does not change.
+                self.assertIs(phi.A[0], A0)
+            else:
+                self.assertTrue(phi.is_packed())
+        # Distinct tensors of the same shape are packed together.
+        psi = Mps.random(12, 4, seed=3)
+        phi = Mps.random(12, 4, seed=3)
+        psi.enlarge_D(7)
+        phi.enlarge_D(7, contiguous=True)
+        for i in range(12):
+            self.assertTrue(np.array_equal(phi.A[i], psi.A[i]))
+
+
+class MpsDtypeTestCase(unittest.TestCase):
+    """Test MPS with real and complex dtypes of single and double
+    precision."""
+
+    def test_dtypes(self):
+        """Test the creation and modification of MPS of each dtype."""
+        for dtype in [np.float32, np.float64, np.complex64, np.complex128]:
+            for name in ['GHZ', 'AKLT', 'random', 'pairs', 'mixed']:
+                psi = Mps(6, name, dtype=dtype)
+                self.assertEqual(psi.dtype, dtype)
+                for A, B in zip(psi.A, psi.B):
+                    self.assertEqual(A.dtype, dtype)
+                    self.assertEqual(B.dtype, dtype)
+                self.assertAlmostEqual(psi.norm(), 1, places=5)
+            psi.enlarge_D(3)
+            self.assertEqual(psi.A[2].dtype, dtype)
+            psi = Mps(6, 'random', d=3, dtype=dtype)
+            psi.truncate_D(1)
+            self.assertEqual(psi.A[2].dtype, dtype)
+            self.assertEqual(psi.B[2].dtype, dtype)
+            self.assertAlmostEqual(psi.norm(), 1, places=5)
+
+    def test_canonical_complex_state(self):
+        """Test the canonical forms of a complex random state."""
+        psi = Mps(7, 'random', d=3, dtype=np.complex128)
+        self.assertTrue(np.iscomplexobj(psi.A[3]))
+        for A in psi.A:
+            L = np.einsum('mni,mnj->ij', A.conj(), A)
+            self.assertTrue(np.allclose(L, np.eye(np.shape(A)[2])))
+        for B in psi.B:
+            R = np.einsum('imn,jmn->ij', B.conj(), B)
+            self.assertTrue(np.allclose(R, np.eye(np.shape(B)[0])))
+
+
+class MpsCanonicalFormsTestCase(unittest.TestCase):
+    """Test the lazy canonical forms and the mixed canonical form."""
+
+    def test_lazy_canonical_forms(self):
+        """Test that each form is computed when it is first used."""
+        psi = Mps(8, 'random', d=3)
+        self.assertIsNone(psi._B)
+        self.assertTrue(check_right_canonical(psi))
+        self.assertIsNotNone(psi._B)
+        phi = Mps.from_tensors([np.random.rand(1 if i == 0 else 4, 2,
+                                               1 if i == 7 else 4)
+                                for i in range(8)])
+        self.assertIsNone(phi._A)
+        self.assertTrue(check_left_canonical(phi))
+        self.assertAlmostEqual(phi.norm(), 1)
+
+    def test_mixed_canonical_form(self):
+        """Test the mixed canonical forms and the moves of the center."""
+        shapes = [(1 if i == 0 else 6, 3, 1 if i == 7 else 6)
+                  for i in range(8)]
+        psi = Mps.from_tensors([np.random.rand(*s) + 1j*np.random.rand(*s)
+                                for s in shapes])
+        for k in [2, 5, 4, 7, 0]:
+            M = psi.mixed(k)
+            self.assertEqual(psi.center, k)
+            self.assertAlmostEqual(Environment(M, psi.A).overlap(), 1)
+            for A in M[:k]:
+                L = np.einsum('mni,mnj->ij', A.conj(), A)
+                self.assertTrue(np.allclose(L, np.eye(np.shape(A)[2])))
+            for B in M[k+1:]:
+                R = np.einsum('imn,jmn->ij', B.conj(), B)
+                self.assertTrue(np.allclose(R, np.eye(np.shape(B)[0])))
+            self.assertAlmostEqual(np.linalg.norm(M[k]), 1)
+
+    def test_forms_from_mixed_canonical_form(self):
+        """Test that the forms are computed by moving the center."""
+        psi = Mps(6, 'random')
+        A = list(psi.A)
+        M = psi.mixed(4)
+        self.assertTrue(check_right_canonical(psi))
+        # The cached mixed canonical form keeps its center.
+        self.assertEqual(psi.center, 4)
+        self.assertTrue(all(T is U for T, U in zip(psi.mixed(4), M)))
+        self.assertAlmostEqual(Environment(psi.B, A).overlap(), 1)
+        # Assigning a form drops the mixed canonical form.
+        psi.B = list(psi.B)
+        self.assertIsNone(psi.center)
+
+    def test_assigning_a_form_drops_the_other(self):
+        """Test that the other form is computed from the assigned one."""
+        psi = Mps(6, 'GHZ')
+        phi = Mps(6, 'random')
+        psi.B
+        psi.A = phi.A
+        self.assertTrue(check_right_canonical(psi))
+        self.assertAlmostEqual(abs(Environment(psi.B, phi.B).overlap()), 1)
+        psi.B = Mps(6, 'mixed').B
+        self.assertAlmostEqual(abs(contract(psi, Mps(6, 'mixed'))), 1)
+
+
+class MpsRandomTestCase(unittest.TestCase):
+    """Test the random states with arbitrary bond dimension."""
+
+    def test_random_states(self):
+        """Test the shapes, dtypes and canonical forms."""
+        for dtype in [np.float32, np.float64, np.complex64, np.complex128]:
+            psi = Mps.random(12, 20, d=3, dtype=dtype, seed=1)
+            self.assertEqual(psi.D, 20)
+            self.assertEqual([np.shape(A)[2] for A in psi.A],
+                             [3, 9, 20, 20, 20, 20, 20, 20, 20, 9, 3, 1])
+            for A in psi.A:
+                self.assertEqual(A.dtype, dtype)
+                L = np.einsum('mni,mnj->ij', A.conj(), A)
+                self.assertTrue(np.allclose(L, np.eye(np.shape(A)[2]),
+                                            atol=1e-5))
+            self.assertAlmostEqual(psi.norm(), 1, places=5)
+
+    def test_seed(self):
+        """Test that the seed makes the state reproducible."""
+        psi = Mps.random(10, 8, seed=7)
+        phi = Mps.random(10, 8, seed=np.random.default_rng(7))
+        chi = Mps.random(10, 8, seed=8)
+        for A, B in zip(psi.A, phi.A):
+            self.assertTrue(np.array_equal(A, B))
+        self.assertAlmostEqual(contract(psi, phi), 1)
+        self.assertLess(abs(contract(psi, chi)), 0.9)
+        # The named random state follows 'np.random.seed'.
+        np.random.seed(2)
+        psi = Mps(6, 'random')
+        np.random.seed(2)
+        for A, B in zip(psi.A, Mps(6, 'random').A):
+            self.assertTrue(np.array_equal(A, B))
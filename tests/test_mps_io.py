@@ -0,0 +1,76 @@
+"""Tests for the files of MPS."""
+
+import os
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.mps import Mps
+from mpys.mps_io import load_mps, read_header, save_mps
+from mpys.mps_ops import contract
+
+
+class MpsFilesTestCase(unittest.TestCase):
+    """Test saving and loading states."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'psi.mps')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_and_load(self):
+        """Test that the loaded states are the saved ones."""
+        for psi in [Mps(7, 'AKLT'), Mps(6, 'random', d=3),
+                    Mps(5, 'random', dtype=np.complex64)]:
+            psi.enlarge_D(4)
+            save_mps(psi, self.path)
+            for mode in ['r', 'c', None]:
+                phi = load_mps(self.path, mode)
+                self.assertEqual((phi.L, phi.d, phi.D, phi.dtype),
+                                 (psi.L, psi.d, psi.D, psi.dtype))
+                for T, S in zip(list(psi.A) + list(psi.B),
+                                list(phi.A) + list(phi.B)):
+                    self.assertTrue(np.array_equal(T, S))
+                self.assertAlmostEqual(contract(psi, phi), 1, places=5)
+                del phi
+
+    def test_memory_map(self):
+        """Test that the tensors are mapped from the file."""
+        save_mps(Mps(6, 'random'), self.path)
+        header, start = read_header(self.path)
+        self.assertEqual(start % 64, 0)
+        self.assertEqual(header['L'], 6)
+        psi = load_mps(self.path)
+        self.assertIsInstance(psi.A.data, np.memmap)
+        with self.assertRaises(ValueError):
+            psi.A[0][...] = 0
+        # Copy-on-write modifications do not change the file.
+        phi = load_mps(self.path, 'c')
+        phi.B[0][...] = 0
+        self.assertAlmostEqual(load_mps(self.path).norm(), 1)
+        del psi, phi
+
+    def test_numpy_sizes(self):
+        """Test states whose sizes are NumPy integers."""
+        psi = Mps(np.int64(4), 'GHZ')
+        psi.D = np.int64(psi.D)
+        save_mps(psi, self.path)
+        phi = load_mps(self.path)
+        self.assertEqual((phi.L, phi.D), (4, psi.D))
+        self.assertAlmostEqual(contract(psi, phi), 1)
+        del phi
+
+    def test_wrong_file(self):
+        """Test that other files are rejected."""
+        with open(self.path, 'wb') as f:
+            f.write(b'not an mps')
+        with self.assertRaises(ValueError):
+            load_mps(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,26 @@
 """Tests for the MPS operation functions."""
 
+import copy
 import sys
 import unittest
 import numpy as np
 
 sys.path.append('..')
+from mpys import paths
+from mpys.backend import Backend, use_backend
+from mpys.environment import Environment
+from mpys.mpo import Mpo
 from mpys.mps import Mps
-from mpys.mps_ops import contract
+from mpys.mps_ops import (_transfer_power, contract, contract_many,
+                          expectation, local_expectations, slog_contract)
+
+
+def to_vector(psi):
+    """Compute the dense vector of an Mps."""
+    v = np.ones((1, 1))
+    for M in psi.A:
+        v = np.reshape(np.einsum('ai,isj->asj', v, M), (-1, np.shape(M)[2]))
+    return v[:, 0]
 
 
 class MPSContractionTestCase(unittest.TestCase):
@@ -32,3 +46,217 @@ class MPSContractionTestCase(unittest.TestCase):
         self.assertAlmostEqual(contract(Mps(7, 'GHZ'), Mps(7, 'mixed')), 1/8)
         self.assertAlmostEqual(contract(Mps(4, 'GHZ'), Mps(4, 'mixed')),
                                1/np.sqrt(8))
+
+    def test_contraction_of_uniform_states(self):
+        """Test the contraction of long states with repeated tensors."""
+        for L in [5, 40, 301]:
+            psi = Mps(L, 'GHZ')
+            phi = Mps(L, 'mixed')
+            self.assertAlmostEqual(contract(psi, psi), 1)
+            self.assertAlmostEqual(contract(psi, phi)/2**((1-L)/2), 1)
+            # Remove the sharing of the tensors.
+            psi.A = [np.array(A) for A in psi.A]
+            self.assertAlmostEqual(contract(psi, phi)/2**((1-L)/2), 1)
+        psi = Mps(30, 'AKLT')
+        self.assertAlmostEqual(contract(psi, psi), 1)
+        psi.enlarge_D(4)
+        self.assertAlmostEqual(contract(psi, psi), 1)
+
+    def test_transfer_power(self):
+        """Test the power of the transfer matrix site by site."""
+        rng = np.random.default_rng(0)
+        M = rng.standard_normal((3, 2, 3))
+        N = rng.standard_normal((2, 2, 2))
+        L0 = rng.standard_normal((3, 2))
+        for n in [1, 6, 11]:
+            L = L0
+            for _ in range(n):
+                L = np.einsum('mn,mli,nlj->ij', L, M, N)
+            T, log_scale = _transfer_power(L0, M, N, n)
+            self.assertTrue(np.allclose(T*np.exp(log_scale), L))
+
+
+class MPSSparseContractionTestCase(unittest.TestCase):
+    """Test the contraction of sparse tensors."""
+
+    def test_sparse_contraction(self):
+        """Test that the sparse path matches the dense one."""
+        psi = Mps(12, 'pairs')
+        phi = Mps(12, 'mixed')
+        psi.enlarge_D(8)
+        chi = Mps(12, 'random', dtype=np.complex128)
+        for bra, ket in [(psi, psi), (psi, phi), (chi, psi), (psi, chi)]:
+            value = contract(bra, ket, sparse=False)
+            self.assertAlmostEqual(contract(bra, ket, sparse=True), value)
+            sign, logabs = slog_contract(bra, ket, sparse=True)
+            self.assertAlmostEqual(sign*np.exp(logabs), value)
+
+    def test_contraction_of_large_sparse_tensors(self):
+        """Test a state whose tensors are detected as sparse."""
+        psi = Mps(4, 'GHZ')
+        psi.A = list(psi.A)
+        psi.A[1] = np.zeros((2, 2, 2**16))
+        psi.A[1][0, 0, 0] = psi.A[1][1, 1, 1] = 1
+        psi.A[2] = np.zeros((2**16, 2, 2))
+        psi.A[2][0, 0, 0] = psi.A[2][1, 1, 1] = 1
+        for ket in [Mps(4, 'GHZ'), Mps(4, 'mixed')]:
+            value = contract(psi, ket, sparse=False)
+            self.assertAlmostEqual(contract(psi, ket), value)
+            self.assertAlmostEqual(contract(ket, psi), np.conj(value))
+            self.assertAlmostEqual(contract(psi, ket, sparse=True), value)
+            sign, logabs = slog_contract(psi, ket)
+            self.assertAlmostEqual(sign*np.exp(logabs), value)
+        self.assertAlmostEqual(contract(psi, Mps(4, 'GHZ')), 1)
+
+
+class MPSBatchedContractionTestCase(unittest.TestCase):
+    """Test the batched contraction of many MPS."""
+
+    def test_contract_many_matches_contract(self):
+        """Test that the Gram matrix matches pairwise contractions."""
+        L = 6
+        psis = [Mps(L, 'GHZ'), Mps(L, 'pairs'), Mps(L, 'mixed'),
+                Mps(L, 'random')]
+        phis = [Mps(L, 'random'), Mps(L, 'mixed')]
+        phis[1].enlarge_D(3)
+        G = contract_many(psis, phis)
+        self.assertEqual(G.shape, (4, 2))
+        for k, psi in enumerate(psis):
+            for m, phi in enumerate(phis):
+                self.assertAlmostEqual(G[k, m], contract(psi, phi))
+        # Gram matrix of a single ensemble.
+        G = contract_many(psis)
+        self.assertTrue(np.allclose(G, G.T))
+        self.assertTrue(np.allclose(np.diag(G), 1))
+
+    def test_exceptions_of_contract_many(self):
+        """Test that states of different length are rejected."""
+        with self.assertRaises(ValueError):
+            contract_many([Mps(4, 'GHZ')], [Mps(5, 'GHZ')])
+
+
+class ContractionPathCacheTestCase(unittest.TestCase):
+    """Test the cache of contraction paths."""
+
+    def test_cached_einsum(self):
+        """Test that cached contractions match 'np.einsum'."""
+        paths.cache_clear()
+        L = np.random.rand(10, 12)
+        A = np.random.rand(10, 3, 20)
+        B = np.random.rand(12, 3, 15)
+        for _ in range(3):
+            self.assertTrue(np.allclose(
+                paths.einsum('mn,mli,nlj->ij', L, A, B),
+                np.einsum('mn,mli,nlj->ij', L, A, B)))
+        C = np.random.rand(20, 4)
+        self.assertTrue(np.allclose(paths.einsum('abc,cd->dba', A, C),
+                                    np.einsum('abc,cd->dba', A, C)))
+        self.assertEqual(paths.cache_info(), (2, 2, 2))
+
+    def test_contract_reuses_paths(self):
+        """Test that 'contract' reuses the paths of repeated sites."""
+        psi = Mps(10, 'random')
+        paths.cache_clear()
+        # Without the fast path of the tiny tensors.
+        with use_backend(Backend(small_tensor=0)):
+            contract(psi, psi)
+            info = paths.cache_info()
+            # The first, bulk and last sites have different shapes.
+            self.assertEqual(info.misses, 3)
+            self.assertEqual(info.hits, 7)
+            contract(psi, psi)
+            self.assertEqual(paths.cache_info().misses, 3)
+
+
+class MPSLogContractionTestCase(unittest.TestCase):
+    """Test the contraction in logarithmic scale."""
+
+    def test_slog_contract(self):
+        """Test that slog_contract matches contract for short chains."""
+        for psi, phi in [(Mps(7, 'GHZ'), Mps(7, 'mixed')),
+                         (Mps(8, 'pairs'), Mps(8, 'mixed')),
+                         (Mps(9, 'random'), Mps(9, 'random'))]:
+            sign, logabs = slog_contract(psi, phi)
+            self.assertAlmostEqual(sign*np.exp(logabs), contract(psi, phi))
+        self.assertEqual(slog_contract(Mps(6, 'GHZ'), Mps(6, 'pairs')),
+                         (0, -np.inf))
+
+    def test_slog_contract_of_long_chains(self):
+        """Test chains whose overlap underflows in float64."""
+        for L in [3001, 5000]:
+            psi = Mps(L, 'GHZ')
+            phi = Mps(L, 'mixed')
+            self.assertEqual(contract(psi, phi), 0)
+            sign, logabs = slog_contract(psi, phi)
+            self.assertEqual(sign, 1)
+            self.assertAlmostEqual(logabs, (1-L)/2*np.log(2))
+            # The same chains without repeated tensors.
+            psi.A = [np.array(A) for A in psi.A]
+            sign, logabs = slog_contract(psi, phi)
+            self.assertEqual(sign, 1)
+            self.assertAlmostEqual(logabs, (1-L)/2*np.log(2))
+        sign, logabs = slog_contract(Mps(2000, 'AKLT'), Mps(2000, 'AKLT'))
+        self.assertAlmostEqual(sign, 1)
+        self.assertAlmostEqual(logabs, 0)
+
+
+class MPSComplexContractionTestCase(unittest.TestCase):
+    """Test the contraction of complex and single precision MPS."""
+
+    def test_conjugation_of_the_bra(self):
+        """Test that the tensors of the bra are conjugated."""
+        psi = Mps(6, 'random', dtype=np.complex128)
+        phi = copy.deepcopy(psi)
+        phi.A = list(phi.A)
+        phi.A[2] = 1j*phi.A[2]
+        self.assertAlmostEqual(contract(psi, psi), 1)
+        self.assertAlmostEqual(contract(psi, phi), 1j)
+        self.assertAlmostEqual(contract(phi, psi), -1j)
+        sign, logabs = slog_contract(psi, phi)
+        self.assertAlmostEqual(sign, 1j)
+        self.assertAlmostEqual(logabs, 0)
+        G = contract_many([psi, phi])
+        self.assertTrue(np.allclose(G, [[1, 1j], [-1j, 1]]))
+
+    def test_single_precision(self):
+        """Test that single precision states contract in single
+        precision."""
+        psi = Mps(40, 'AKLT', dtype=np.float32)
+        phi = Mps(40, 'random', d=3, dtype=np.complex64)
+        self.assertEqual(contract(psi, psi).dtype, np.float32)
+        self.assertAlmostEqual(contract(psi, psi), 1, places=5)
+        self.assertEqual(contract(psi, phi).dtype, np.complex64)
+
+
+class MPOSandwichTestCase(unittest.TestCase):
+    """Test the contractions <psi|O|phi> with MPOs."""
+
+    def test_expectation(self):
+        """Test the energy of states against dense matrices."""
+        H = Mpo(6, 'AKLT')
+        psi = Mps(6, 'random', d=3)
+        phi = Mps(6, 'AKLT')
+        H_dense = H.to_matrix()
+        self.assertAlmostEqual(expectation(psi, H),
+                               to_vector(psi) @ H_dense @ to_vector(psi))
+        self.assertAlmostEqual(expectation(psi, H, phi),
+                               to_vector(psi) @ H_dense @ to_vector(phi))
+        # The sandwich with cached environments.
+        env = Environment(psi, phi, H)
+        self.assertAlmostEqual(env.overlap(), expectation(psi, H, phi))
+        phi.A[3] = np.random.rand(2, 3, 2)
+        env.update(3)
+        self.assertAlmostEqual(env.overlap(), expectation(psi, H, phi))
+
+    def test_local_expectations(self):
+        """Test the magnetization of each site."""
+        psi = Mps(7, 'random', dtype=np.complex128)
+        Sz = np.diag([-1/2, 1/2])
+        v = to_vector(psi)
+        for i, m in enumerate(local_expectations(psi, Sz)):
+            O = np.kron(np.kron(np.eye(2**i), Sz), np.eye(2**(6-i)))
+            self.assertAlmostEqual(m, np.conj(v) @ O @ v)
+        X = np.array([[0, 1], [1, 0]])
+        self.assertTrue(np.allclose(
+            local_expectations(Mps(5, 'mixed'), [X, Sz, X, Sz, X]),
+            [1, 0, 1, 0, 1]))
@@ -0,0 +1,57 @@
+"""Tests for the quadratic forms."""
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.mpo import Mpo
+from mpys.mps import Mps
+from mpys.mps_ops import expectation
+from mpys.quadratic_form import QuadraticForm
+
+
+class QuadraticFormTestCase(unittest.TestCase):
+    """Test the values and local matrices of quadratic forms."""
+
+    def test_value(self):
+        """Test that the value matches 'expectation'."""
+        H = Mpo(7, 'Heisenberg', h=0.2)
+        psi = Mps(7, 'random', dtype=np.complex128)
+        Q = QuadraticForm(H, psi)
+        self.assertAlmostEqual(Q.value(), expectation(psi, H))
+        with self.assertRaises(ValueError):
+            QuadraticForm(Mpo(6, 'Heisenberg'), psi)
+
+    def test_local_matrices(self):
+        """Test that the local matrices give back the value."""
+        H = Mpo(6, 'AKLT')
+        psi = Mps(6, 'random', d=3)
+        Q = QuadraticForm(H, psi)
+        E = expectation(psi, H)
+        # Right canonical tensors: the site 0 carries the state.
+        M = Q.x[0]
+        self.assertAlmostEqual(np.vdot(M, Q.matvec(0, M)), E)
+        theta = np.einsum('isj,jtk->istk', Q.x[0], Q.x[1])
+        self.assertAlmostEqual(np.vdot(theta, Q.matvec(0, theta, sites=2)),
+                               E)
+        Heff = Q.matrix(0, sites=2)
+        self.assertTrue(np.allclose(Heff, Heff.T))
+        self.assertAlmostEqual(np.ravel(theta) @ Heff @ np.ravel(theta), E)
+        with self.assertRaises(ValueError):
+            Q.matvec(0, M, sites=3)
+
+    def test_incremental_updates(self):
+        """Test the local matrices along a sweep that moves the center."""
+        H = Mpo(6, 'Ising', h=0.5)
+        psi = Mps(6, 'random')
+        E = expectation(psi, H)
+        Q = QuadraticForm(H, psi)
+        for i in range(5):
+            Dl, d, Dr = np.shape(Q.x[i])
+            A, R = np.linalg.qr(np.reshape(Q.x[i], (Dl*d, Dr)))
+            C = np.einsum('ij,jsk->isk', R, Q.x[i+1])
+            Q.update(i, np.reshape(A, (Dl, d, -1)))
+            Q.update(i+1, C)
+            self.assertAlmostEqual(np.vdot(C, Q.matvec(i+1, C)), E)
+            self.assertAlmostEqual(Q.value(), E)
@@ -0,0 +1,196 @@
+"""Tests for the storage backends of the MPS tensors."""
+
+import copy
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.mps import Mps
+from mpys.mps_ops import contract
+from mpys.storage import DiskTensors, PackedTensors, SharedTensors
+
+
+class PackedTensorsTestCase(unittest.TestCase):
+    """Test the contiguous storage of the tensors."""
+
+    def test_views_of_packed_tensors(self):
+        """Test that the tensors are views of the buffer."""
+        tensors = [np.random.rand(1, 2, 2), np.random.rand(2, 2, 3),
+                   np.random.rand(3, 2, 1)]
+        T = PackedTensors(tensors)
+        self.assertEqual(len(T), 3)
+        self.assertEqual(T.data.size, 4 + 12 + 6)
+        self.assertTrue(np.array_equal(T.offsets, [0, 4, 16, 22]))
+        for Ti, tensor in zip(T, tensors):
+            self.assertTrue(np.array_equal(Ti, tensor))
+        # Modifications of the views are written into the buffer.
+        T[1][0, 0, 0] = 7
+        self.assertEqual(T.data[4], 7)
+        T[2] = np.ones((3, 2, 1))
+        self.assertTrue(np.all(T.data[16:] == 1))
+        # Assigning a tensor with a new shape packs the buffer again.
+        T[2] = np.ones((3, 2, 2))
+        self.assertEqual(T.data.size, 4 + 12 + 12)
+        self.assertEqual(np.shape(T[2]), (3, 2, 2))
+        self.assertTrue(np.array_equal(T[0], tensors[0]))
+
+    def test_packed_mps(self):
+        """Test that a packed Mps works as an unpacked one."""
+        psi = Mps(6, 'random', d=3)
+        phi = copy.deepcopy(psi)
+        phi.pack()
+        self.assertTrue(phi.is_packed())
+        self.assertAlmostEqual(contract(psi, phi), 1)
+        self.assertAlmostEqual(phi.norm(), 1)
+        # The copies keep the tensors packed.
+        chi = copy.deepcopy(phi)
+        chi.A[0][...] = 0
+        self.assertAlmostEqual(phi.norm(), 1)
+        self.assertAlmostEqual(chi.norm(), 0)
+        # Modifications of the bond dimension keep the tensors packed.
+        phi.enlarge_D(4)
+        self.assertTrue(phi.is_packed())
+        phi.truncate_D(1)
+        self.assertTrue(phi.is_packed())
+        self.assertAlmostEqual(phi.norm(), 1)
+        phi.unpack()
+        self.assertIsInstance(phi.A, list)
+
+
+class SharedTensorsTestCase(unittest.TestCase):
+    """Test the copy-on-write storage of repeated tensors."""
+
+    def test_copy_on_write(self):
+        """Test that the modification of a site does not affect others."""
+        psi = Mps(8, 'AKLT')
+        self.assertIsInstance(psi.A, SharedTensors)
+        self.assertEqual(len(psi.A.tensors), 3)
+        self.assertIs(psi.A[1], psi.A[6])
+        with self.assertRaises(ValueError):
+            psi.A[3][0, 0, 0] = 1
+        M = psi.A.mutable(3)
+        M[0, 0, 0] = 1
+        self.assertEqual(psi.A[3][0, 0, 0], 1)
+        self.assertEqual(psi.A[2][0, 0, 0], 0)
+        self.assertEqual(len(psi.A.tensors), 4)
+        self.assertIs(psi.A.mutable(3), M)
+        psi.A[4] = np.zeros((2, 3, 2))
+        self.assertEqual(psi.A[5][1, 0, 0], -np.sqrt(2/3))
+        self.assertEqual(len(psi.A.tensors), 5)
+
+    def test_enlargement_keeps_sharing(self):
+        """Test that enlarge_D pads each repeated tensor once."""
+        psi = Mps(50, 'GHZ')
+        psi.enlarge_D(4)
+        self.assertIsInstance(psi.A, SharedTensors)
+        self.assertIs(psi.A[10], psi.A[40])
+        # Sites 1 and 48 have shape (2, 2, 4), and the bulk (4, 2, 4).
+        self.assertEqual(len(psi.A.tensors), 5)
+        self.assertAlmostEqual(psi.norm(), 1)
+
+
+class DiskTensorsTestCase(unittest.TestCase):
+    """Test the tensors stored in files."""
+
+    def test_window_of_tensors(self):
+        """Test that only a window of tensors stays in memory."""
+        tensors = [np.random.rand(3, 2, 3) for _ in range(10)]
+        with tempfile.TemporaryDirectory() as folder:
+            T = DiskTensors(iter(tensors), folder, window=3)
+            self.assertEqual(len(T), 10)
+            self.assertEqual(len(os.listdir(folder)), 10)
+            for Ti, tensor in zip(T, tensors):
+                self.assertTrue(np.array_equal(Ti, tensor))
+            self.assertTrue(np.array_equal(T[-1], tensors[-1]))
+            self.assertEqual(T.nbytes, 3*tensors[0].nbytes)
+            with self.assertRaises(ValueError):
+                T[0][...] = 0
+            with self.assertRaises(IndexError):
+                T[10]
+            # The assigned tensors are written when they leave the
+            # window.
+            T[0] = np.zeros((3, 2, 4))
+            for Ti in reversed(T):
+                pass
+            self.assertEqual(np.shape(np.load(os.path.join(folder,
+                                                           '0.npy'))),
+                             (3, 2, 4))
+            self.assertTrue(np.all(T[0] == 0))
+            # Only the files with the current tensors are mapped, and
+            # the window does not change.
+            self.assertTrue(np.array_equal(T.map_file(5), tensors[5]))
+            T[1] = np.ones((4, 2, 3))
+            self.assertIsNone(T.map_file(1))
+            self.assertNotIn(5, T._cache)
+            T.flush()
+
+    def test_temporary_folder(self):
+        """Test that the temporary folder is removed with the object."""
+        T = DiskTensors([np.ones((1, 2, 1))])
+        folder = T.folder
+        self.assertTrue(os.path.isdir(folder))
+        del T
+        self.assertFalse(os.path.isdir(folder))
+
+    def test_flush_on_deletion(self):
+        """Test that the tensors of a given folder are written when the
+        object is deleted."""
+        with tempfile.TemporaryDirectory() as folder:
+            T = DiskTensors([np.ones((1, 2, 1))]*3, folder)
+            T[1] = np.zeros((1, 2, 1))
+            del T
+            self.assertTrue(np.all(np.load(os.path.join(folder,
+                                                        '1.npy')) == 0))
+
+    def test_unassigned_sites(self):
+        """Test the error of a site whose tensor was never assigned."""
+        T = DiskTensors.empty(3)
+        T[0] = np.ones((1, 2, 1))
+        self.assertEqual(T[0].shape, (1, 2, 1))
+        with self.assertRaises(ValueError):
+            T[1]
+
+    def test_copies(self):
+        """Test that copies have files of their own."""
+        psi = Mps.random(8, 4, seed=1)
+        psi.to_disk(window=2)
+        psi.A[3] = 2*psi.A[3]
+        phi = copy.deepcopy(psi)
+        self.assertNotEqual(phi.A.folder, psi.A.folder)
+        self.assertAlmostEqual(phi.norm(), 4)
+        phi.A[3] = 5*phi.A[3]
+        # Evict site 3, writing it to the files of phi.
+        for _ in phi.A:
+            pass
+        self.assertAlmostEqual(psi.norm(), 4)
+        self.assertAlmostEqual(phi.norm(), 100)
+        chi = copy.copy(psi.A)
+        folder = psi.A.folder
+        del psi
+        self.assertFalse(os.path.isdir(folder))
+        self.assertEqual(np.shape(chi[3]), (4, 2, 4))
+        with self.assertRaises(TypeError):
+            pickle.dumps(phi)
+
+    def test_mps_on_disk(self):
+        """Test the sweeps of a state whose tensors are on disk."""
+        psi = Mps.random(30, 16, seed=1)
+        phi = copy.deepcopy(psi)
+        phi.to_disk(window=3)
+        self.assertIsInstance(phi.A, DiskTensors)
+        self.assertAlmostEqual(contract(psi, phi), 1)
+        self.assertAlmostEqual(phi.norm(), 1)
+        # The canonical forms are computed on disk.
+        self.assertIsInstance(phi.B, DiskTensors)
+        self.assertLessEqual(phi.B.nbytes, 3*16*2*16*8)
+        psi.truncate_D(6)
+        phi.truncate_D(6)
+        self.assertIsInstance(phi.A, DiskTensors)
+        self.assertAlmostEqual(contract(psi, phi), 1)
+        phi.enlarge_D(20)
+        self.assertIsInstance(phi.B, DiskTensors)
+        self.assertAlmostEqual(contract(psi, phi), 1)
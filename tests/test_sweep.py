@@ -0,0 +1,75 @@
+"""Tests for the pipelined sweeps."""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.environment import grow_left
+from mpys.mps import Mps
+from mpys.mps_io import load_mps, save_mps
+from mpys.sweep import SweepExecutor, touch
+
+
+class SweepExecutorTestCase(unittest.TestCase):
+    """Test the sweeps with loads, measurements and checkpoints."""
+
+    def test_streaming_contraction(self):
+        """Test the norm of a state read from disk during a sweep."""
+        psi = Mps.random(20, 8, seed=3)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'psi.mps')
+            save_mps(psi, path)
+            phi = load_mps(path)
+            envs = [np.ones((1, 1))]
+            saved = []
+
+            def step(i, A):
+                envs.append(grow_left(envs[-1], A, A))
+                return np.shape(A)
+
+            def measure(i):
+                return np.trace(envs[i+1])
+
+            def checkpoint(i):
+                saved.append((i, envs[i+1].copy()))
+
+            with SweepExecutor(workers=2, prefetch=3) as executor:
+                result = executor.sweep(
+                    range(20), step, load=lambda i: touch(phi.A[i]),
+                    measure=measure, checkpoint=checkpoint, every=5)
+            del phi
+        self.assertEqual(result.steps, [np.shape(A) for A in psi.A])
+        self.assertAlmostEqual(envs[-1][0, 0], 1)
+        self.assertEqual(len(result.measurements), 20)
+        self.assertAlmostEqual(result.measurements[-1], 1)
+        self.assertEqual([i for i, _ in saved], [4, 9, 14, 19])
+
+    def test_overlap_and_errors(self):
+        """Test that the threads run alongside the steps."""
+        started = threading.Event()
+
+        def step(i):
+            # The measurement of site 0 runs while site 1 is stepped.
+            if i == 1:
+                self.assertTrue(started.wait(5))
+            return i
+
+        def measure(i):
+            started.set()
+            if i == 2:
+                raise ValueError('measurement failed')
+            return i
+
+        with SweepExecutor() as executor:
+            result = executor.sweep(range(2), step, measure=measure)
+            self.assertEqual(result, ([0, 1], [0, 1]))
+            with self.assertRaises(ValueError):
+                executor.sweep(range(4), step, measure=measure)
+
+
+if __name__ == '__main__':
+    unittest.main()
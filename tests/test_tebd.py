@@ -0,0 +1,80 @@
+"""Tests for the TEBD time evolution."""
+
+import sys
+import unittest
+import numpy as np
+from scipy.linalg import expm
+
+sys.path.append('..')
+from mpys.mpo import Mpo, nearest_neighbour_terms
+from mpys.mps import Mps
+from mpys.mps_ops import contract, expectation
+from mpys.tebd import bond_hamiltonians, tebd
+
+
+def to_vector(psi):
+    """Compute the dense vector of an Mps."""
+    v = np.ones((1, 1))
+    for M in psi.A:
+        v = np.reshape(np.einsum('ai,isj->asj', v, M), (-1, np.shape(M)[2]))
+    return v[:, 0]
+
+
+class TEBDTestCase(unittest.TestCase):
+    """Test the time evolution with TEBD."""
+
+    def test_bond_hamiltonians(self):
+        """Test that the two-site terms add up to the MPO."""
+        for name in ['Ising', 'Heisenberg', 'AKLT']:
+            bonds = bond_hamiltonians(5, *nearest_neighbour_terms(name,
+                                                                  h=0.3))
+            d = int(np.sqrt(np.shape(bonds[0])[0]))
+            H = sum(np.kron(np.kron(np.eye(d**i), h), np.eye(d**(3-i)))
+                    for i, h in enumerate(bonds))
+            self.assertTrue(np.allclose(H, Mpo(5, name, h=0.3).to_matrix()))
+
+    def test_real_time_evolution(self):
+        """Test the evolution against the exact one of a small chain."""
+        L = 6
+        bonds = bond_hamiltonians(L, *nearest_neighbour_terms('Heisenberg',
+                                                              h=0.3))
+        H = Mpo(L, 'Heisenberg', h=0.3).to_matrix()
+        np.random.seed(1)
+        psi = Mps(L, 'random')
+        v = expm(-0.5j*H) @ to_vector(psi)
+        for order, places in [(1, 5), (2, 9)]:
+            for workers in [None, 3]:
+                phi = Mps.from_tensors(list(psi.A))
+                info = tebd(phi, bonds, 0.02, 25, D=8, order=order,
+                            workers=workers)
+                self.assertEqual(phi.dtype, np.complex128)
+                self.assertAlmostEqual(abs(np.vdot(v, to_vector(phi))), 1,
+                                       places=places)
+                self.assertEqual(len(info.errors), 25)
+                self.assertEqual(len(info.times), 25)
+                self.assertTrue(np.allclose(info.errors, 0))
+
+    def test_imaginary_time_evolution(self):
+        """Test the projection onto the ground state."""
+        H = Mpo(10, 'Heisenberg')
+        bonds = bond_hamiltonians(10, *nearest_neighbour_terms('Heisenberg'))
+        E0 = np.linalg.eigvalsh(H.to_matrix())[0]
+        np.random.seed(1)
+        psi = Mps(10, 'random')
+        tebd(psi, bonds, 0.05, 200, D=16, imaginary=True)
+        self.assertEqual(psi.dtype, np.float64)
+        self.assertAlmostEqual(contract(psi, psi), 1)
+        self.assertAlmostEqual(expectation(psi, H), E0, places=2)
+        # With a small bond dimension the gates are truncated.
+        psi = Mps(10, 'random')
+        info = tebd(psi, bonds, 0.05, 20, D=4, imaginary=True, workers=2)
+        self.assertEqual(psi.D, 4)
+        self.assertTrue(all(e > 0 for e in info.errors))
+
+    def test_exceptions_of_tebd(self):
+        """Test the exceptions of the tebd function."""
+        bonds = bond_hamiltonians(4, *nearest_neighbour_terms('Ising'))
+        with self.assertRaises(ValueError):
+            tebd(Mps(5, 'GHZ'), bonds, 0.1, 1, D=2)
+        with self.assertRaises(ValueError):
+            tebd(Mps(4, 'GHZ'), bonds, 0.1, 1, D=2, order=3)
@@ -0,0 +1,48 @@
+"""Tests for the uniform MPS class."""
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('..')
+from mpys.umps import UMps
+
+
+class UMpsTestCase(unittest.TestCase):
+    """Test the properties of uniform MPS."""
+
+    def test_creation(self):
+        """Test the creation of uniform states."""
+        psi = UMps('AKLT')
+        self.assertEqual(psi.d, 3)
+        self.assertEqual(psi.D, 2)
+        with self.assertRaises(NameError):
+            UMps('pairs')
+
+    def test_norm_and_overlap(self):
+        """Test the norm and overlap per site."""
+        for name in ['GHZ', 'AKLT', 'mixed']:
+            self.assertAlmostEqual(UMps(name).norm(), 1)
+        self.assertAlmostEqual(UMps('GHZ').overlap(UMps('mixed')),
+                               np.sqrt(1/2))
+        psi = UMps(M=3*UMps('AKLT').M)
+        self.assertAlmostEqual(psi.norm(), 9)
+        psi.normalize()
+        self.assertAlmostEqual(psi.norm(), 1)
+        self.assertAlmostEqual(psi.overlap(UMps('AKLT')), 1)
+
+    def test_correlation_length(self):
+        """Test the correlation length of the AKLT and GHZ states."""
+        self.assertAlmostEqual(UMps('AKLT').correlation_length(),
+                               1/np.log(3))
+        self.assertEqual(UMps('GHZ').correlation_length(), np.inf)
+        self.assertEqual(UMps('mixed').correlation_length(), 0)
+        # A random state with a larger bond dimension, which uses the
+        # iterative eigensolver.
+        rng = np.random.default_rng(0)
+        psi = UMps(M=rng.random((6, 2, 6)))
+        T = psi.transfer_operator().matmat(np.eye(36))
+        vals = np.sort(np.abs(np.linalg.eigvals(T)))[::-1]
+        self.assertAlmostEqual(psi.norm(), vals[0])
+        self.assertAlmostEqual(psi.correlation_length(),
+                               -1/np.log(vals[1]/vals[0]))